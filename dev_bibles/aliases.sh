@@ -5,13 +5,15 @@
 
 alias bibles='~/dev_bibles/bible-search --list'
 alias bible-stats='~/dev_bibles/bible-search --stats'
-alias bible='~/dev_bibles/bible-search'
+alias bible='~/dev_bibles/bible'
 
 alias bible-mistakes='~/dev_bibles/bible-search --mistakes'
 alias bible-patterns='~/dev_bibles/bible-search --patterns'
 alias bible-personal='~/dev_bibles/bible-search --personal'
 alias bible-master='~/dev_bibles/bible-search --master'
 
+alias bible-daemon='~/dev_bibles/bible daemon'
+
 alias bible-sync='~/dev_bibles/bible-sync'
 alias bible-import='~/dev_bibles/bible-sync --import'
 alias bible-discover='~/dev_bibles/bible-sync --discover'
@@ -87,6 +89,14 @@ bible-help() {
     echo "  bible-status             Show sync status"
     echo "  bible-sync --help        Full sync help"
     echo ""
+    echo "One command (only loads what the subcommand needs):"
+    echo "  bible search <query>     Same as: bible <query>"
+    echo "  bible stats [file]       Lessons per Bible, or per type in a file"
+    echo "  bible sync [project]     Import project Bibles"
+    echo "  bible validate [file]    Check a bible.jsonl"
+    echo "  bible extract git|pr     Build KB cards (repository checkout)"
+    echo "  bible-daemon start|stop  Keep the index in memory for instant searches"
+    echo ""
     echo "Stats & Info:"
     echo "  bible-stats              Show all Bible stats"
     echo "  bibles                   List all projects"
@@ -0,0 +1,7 @@
+"""
+biblelib - Python tooling behind the dev_bibles library
+
+Shared by bible-search, bible-sync, validate.py and the tooling/ scripts.
+Everything here is stdlib-only so the library keeps working wherever the
+shell scripts do.
+"""
@@ -0,0 +1,87 @@
+"""
+Chunked JSONL Processing
+Splits a JSONL file into newline-aligned byte ranges and runs a worker over
+them in separate processes, so validation parses on every core.
+
+Each Chunk knows the number of its first line, counted once up front with
+a newline count over the file's mapping (biblelib.jsonl), so workers
+report exact line numbers without seeing the rest of the file. Results come back in file order, which lets
+callers merge per-chunk state (such as ID sets) as if they had read the
+file serially.
+
+Usage:
+    def work(task):
+        path, chunk = task
+        return [record.line for record in iter_records(path, chunk) if b"TODO" in record.data]
+
+    for blank_lines in map_chunks(work, path, jobs=4):
+        ...
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, NamedTuple, Tuple
+
+from .jsonl import JsonlMap, Record
+
+MIN_CHUNK = 1 << 20   # bytes; smaller files are not worth a process
+CHUNKS_PER_JOB = 4    # more chunks than workers, so a slow chunk does not stall the pool
+
+
+class Chunk(NamedTuple):
+    start: int       # byte offset of the first line
+    end: int         # byte offset just past the last line
+    first_line: int  # 1-based line number of the first line
+
+
+def split(path: str, parts: int, min_chunk: int = MIN_CHUNK) -> List[Chunk]:
+    """Cut `path` into at most `parts` ranges, each starting at the beginning of a line"""
+    with JsonlMap(path) as bible:
+        size = bible.size
+        parts = max(1, min(parts, size // max(min_chunk, 1)))
+        bounds = [0]
+        for i in range(1, parts):
+            cut = bible.next_line(max(size * i // parts, bounds[-1]))  # finish the line the cut fell into
+            if cut >= size:
+                break
+            if cut > bounds[-1]:
+                bounds.append(cut)
+        bounds.append(size)
+
+        chunks = []
+        line = 1
+        for start, end in zip(bounds, bounds[1:]):
+            chunks.append(Chunk(start, end, line))
+            line += bible.count_newlines(start, end)
+    return chunks
+
+
+def iter_records(path: str, chunk: Chunk) -> Iterator[Record]:
+    """The non-blank records of one chunk, numbered as in the whole file"""
+    with JsonlMap(path) as bible:
+        yield from bible.records(chunk.start, chunk.end, chunk.first_line)
+
+
+def iter_lines(path: str, chunk: Chunk) -> Iterator[Tuple[int, str]]:
+    """(line number, text) for the non-blank lines of one chunk, for workers that parse them all"""
+    with JsonlMap(path) as bible:
+        yield from bible.lines(chunk.start, chunk.end, chunk.first_line)
+
+
+def map_chunks(worker: Callable, path: str, jobs: int) -> Iterator:
+    """Run `worker((path, chunk))` for every chunk of `path` on `jobs` processes; results in file order.
+
+    Closing the iterator early (e.g. after enough errors) cancels the chunks
+    that have not started yet.
+    """
+    chunks = split(path, jobs * CHUNKS_PER_JOB)
+    if jobs <= 1 or len(chunks) == 1:
+        for chunk in chunks:
+            yield worker((path, chunk))
+        return
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        futures = [pool.submit(worker, (path, chunk)) for chunk in chunks]
+        for future in futures:
+            yield future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
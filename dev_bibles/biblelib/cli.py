@@ -0,0 +1,171 @@
+"""
+Bible Command Line
+One entry point (`dev_bibles/bible`) for the library's tools:
+    bible search <query> [project]   biblelib.search (also `bible <query>`)
+    bible stats [FILE]               lessons per bible, or per type in FILE
+    bible sync [projects]            biblelib.sync; `sync discover|status|refresh`
+                                     go to biblelib.discovery
+    bible daemon start|stop|status   biblelib.daemon, the optional query server
+    bible validate [kb|cards] ...    validate.py, or tooling/validators/*
+    bible extract git|pr ...         tooling/extractors/git2kb.py / pr2kb.py
+
+Startup is what an interactive command pays on every call, so nothing is
+imported here beyond `sys`: the subcommand is picked by hand (no argparse
+at this level) and only then is its module run, with runpy, exactly as
+`python3 -m <module>` or `python3 <script>` would run it, so its regexes
+and option parser are built only for the command that needs them.
+`bible search` never loads the snapshot, sync or extractor code, and
+when the query daemon is running it imports no search code at all. The
+repository tools (validate, extract) need the repository checkout this
+package lives in.
+
+Usage:
+    bible auth                                  # same as: bible search auth
+    bible search "auth AND security NOT frontend"
+    bible stats
+    bible stats bible.jsonl
+    bible sync pushfundz
+    bible validate bible.jsonl
+    bible extract pr --repo owner/name --limit 50
+"""
+
+import sys
+
+HELP = """Bible - search, validate, extract and sync your project Bibles
+
+Usage: bible <command> [args...]
+
+Commands:
+  search <query> [project]     Search all Bibles (the default: `bible auth`)
+  stats [FILE]                 Lessons per Bible, or per type in FILE
+  sync [projects...]           Import project Bibles into the library
+  sync discover|status|refresh Find projects with Bibles
+  daemon start|stop|status     Keep the index in memory for instant searches
+  validate [FILE...]           Check a bible.jsonl (validate.py)
+  validate kb|cards [args...]  Knowledge base / PR card validators
+  extract git|pr [args...]     Build KB cards from git history / merged PRs
+
+`bible <command> --help` shows a command's own options."""
+
+RED = '\033[0;31m'
+NC = '\033[0m'
+
+
+def fail(message: str):
+    print(f"{RED}{message}{NC}", file=sys.stderr)
+    sys.exit(2)
+
+
+def run_module(module: str, prog: str, args):
+    """Run `module` as `python3 -m` would, importing it only now"""
+    import runpy
+    sys.argv = [prog] + list(args)
+    runpy.run_module(module, run_name="__main__")
+
+
+def run_script(relative: str, prog: str, args):
+    """Run a repository script (e.g. tooling/extractors/pr2kb.py) as `python3 <script>` would"""
+    import pathlib
+    import runpy
+    script = pathlib.Path(__file__).resolve().parents[2] / relative
+    if not script.is_file():
+        fail(f"Error: {relative} not found; `{prog}` needs the repository checkout dev_bibles came from")
+    sys.argv = [str(script)] + list(args)
+    sys.path[0] = str(script.parent)
+    runpy.run_path(str(script), run_name="__main__")
+
+
+# bible-search's own flags, for `bible` used the way the old alias to it was
+LEGACY_FLAGS = {
+    "--mistakes": ["--type", "MISTAKE"],
+    "--patterns": ["--type", "PATTERN"],
+    "-t": ["--text"],
+}
+
+
+def search(args):
+    if args[:1] == ["--list"]:  # only the shell wrapper lists projects
+        import os
+        wrapper = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bible-search")
+        os.execv(wrapper, [wrapper] + args)
+    if args and args[0] in LEGACY_FLAGS:
+        args = LEGACY_FLAGS[args[0]] + args[1:]
+    from .client import forward  # a running query daemon answers before biblelib.search is even imported
+    status = forward(args, "bible search")
+    if status is not None:
+        sys.exit(status)
+    from .search import main
+    sys.argv = ["bible search"] + args
+    main(daemon=False)
+
+
+def stats(args):
+    if args and not args[0].startswith("-"):
+        run_module("biblelib.jsonl", "bible stats", ["stats"] + args)
+    else:
+        run_module("biblelib.search", "bible stats", ["--stats"] + args)
+
+
+def sync(args):
+    if args and args[0] in ("discover", "status", "refresh"):
+        run_module("biblelib.discovery", "bible sync", args)
+    else:
+        run_module("biblelib.sync", "bible sync", args)
+
+
+def daemon(args):
+    run_module("biblelib.daemon", "bible daemon", args)
+
+
+VALIDATORS = {
+    "kb": "tooling/validators/validate_kb.py",
+    "cards": "tooling/validators/validate_cards.py",
+}
+EXTRACTORS = {
+    "git": "tooling/extractors/git2kb.py",
+    "pr": "tooling/extractors/pr2kb.py",
+}
+
+
+def validate(args):
+    if args and args[0] in VALIDATORS:
+        run_script(VALIDATORS[args[0]], f"bible validate {args[0]}", args[1:])
+    else:
+        run_script("validate.py", "bible validate", args)
+
+
+def extract(args):
+    if not args or args[0] not in EXTRACTORS:
+        fail(f"Usage: bible extract {{{'|'.join(EXTRACTORS)}}} [args...]")
+    run_script(EXTRACTORS[args[0]], f"bible extract {args[0]}", args[1:])
+
+
+COMMANDS = {
+    "search": search,
+    "stats": stats,
+    "sync": sync,
+    "daemon": daemon,
+    "validate": validate,
+    "extract": extract,
+}
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else list(argv)
+    if not args or args[0] in ("-h", "--help", "help"):
+        print(HELP)
+        return
+    command = COMMANDS.get(args[0])
+    if command is None:  # `bible auth`, `bible --master auth`: a search
+        search(args)
+    else:
+        command(args[1:])
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:  # e.g. piped into `head`
+        sys.exit(0)
+    except KeyboardInterrupt:
+        sys.exit(130)
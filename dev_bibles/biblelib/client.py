@@ -0,0 +1,71 @@
+"""
+Query Daemon Client
+The client half of biblelib.daemon. It runs first on every `bible search`,
+so it only uses the interpreter's cheapest modules (no argparse, pathlib
+or typing, and `socket` only once a daemon's socket is found): the raw
+command line is handed to the daemon, which parses and answers it exactly
+as biblelib.search would, and only if no daemon answers is the search
+module imported to run it in-process.
+
+The library a command line is for is found the way biblelib.search finds
+it: `--library`, else BIBLE_LIBRARY, else the directory dev_bibles is in.
+The daemon re-checks that after parsing, so an abbreviated option it did
+not spot here is still searched in the right place.
+
+Usage:
+    from biblelib.client import forward
+    status = forward(sys.argv[1:], "bible search")
+    if status is None:
+        ...  # no daemon: search in-process
+"""
+
+import json
+import os
+import sys
+
+SOCKET_NAME = ".bible-daemon.sock"  # in the library, while biblelib.daemon serves it
+TIMEOUT = 5.0  # seconds to wait for the daemon before searching in-process instead
+
+
+def library_dir(argv) -> str:
+    """The library directory a search command line is for"""
+    for i, arg in enumerate(argv):
+        if arg == "--":
+            break
+        if arg == "--library" and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith("--library="):
+            return arg.split("=", 1)[1]
+    return os.environ.get("BIBLE_LIBRARY", os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+
+def ask(library: str, request: dict):
+    """The library's daemon's reply to `request` (a dict with an int `status`), or None"""
+    path = os.path.join(library, SOCKET_NAME)
+    if not os.path.exists(path):
+        return None
+    import socket  # only paid for when a daemon may be listening
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(TIMEOUT)
+            conn.connect(path)
+            conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            conn.shutdown(socket.SHUT_WR)
+            data = b"".join(iter(lambda: conn.recv(1 << 16), b""))
+        reply = json.loads(data)
+    except (OSError, ValueError):  # stale socket, daemon gone or too slow
+        return None
+    return reply if isinstance(reply, dict) and isinstance(reply.get("status"), int) else None
+
+
+def forward(argv, prog: str):
+    """Have the daemon run a search command line; its exit status, or None to search in-process"""
+    if "--no-daemon" in argv or os.environ.get("BIBLE_NO_DAEMON"):
+        return None
+    library = os.path.realpath(library_dir(argv))
+    reply = ask(library, {"library": library, "cwd": os.getcwd(), "prog": prog, "argv": list(argv)})
+    if reply is None:
+        return None
+    sys.stderr.write(reply.get("stderr", ""))
+    sys.stdout.write(reply.get("stdout", ""))
+    return reply["status"]
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Bible Query Daemon
+Optional background server for one library: it keeps the sidecar index
+open (the sqlite connection and its page cache, the bibles mmapped), the
+tag, type and project posting lists and every lesson's location in
+memory, as well as the MAX_LESSONS most recently parsed lessons, and
+answers searches over a Unix domain socket in the library,
+`<library>/.bible-daemon.sock`. Tag and boolean queries are answered
+without touching sqlite; full-text search still goes to its FTS5 index.
+
+`bible search`, bible-search and `python3 -m biblelib.search` hand their
+whole command line to it through biblelib.client when that socket is
+there and print the reply, so all their flags behave the same with or
+without the daemon, only without importing the search engine, opening
+sqlite and reading lessons on every call. If it is not running, the
+search just runs in-process. Nothing listens on the network; the socket
+is only accessible to its owner.
+
+The bibles are watched by polling, as there is no file watching in the
+standard library: before each request the known bibles are stat'ed, so a
+lesson is found as soon as it is written, and every WATCH_INTERVAL
+seconds (while idle, or after a request once that long has passed) the
+library is rediscovered, so a newly synced bible is searched within a
+second. When a size or mtime changed the index is refreshed (an appended
+bible has only its new lines indexed, see biblelib.store) and the
+postings, parsed lessons and file mappings are dropped.
+
+Protocol: one JSON line per connection, answered with one JSON document:
+    {"library": "/abs/lib", "cwd": ..., "prog": ..., "argv": [...]}
+                            -> {"status": 0, "stdout": "...", "stderr": ""}
+    {"op": "ping"}          -> {"status": 0, "pid": ..., "uptime": ..., ...}
+    {"op": "stop"}          -> {"status": 0, "pid": ...}, then it exits
+A search for another library, or one that failed unexpectedly, gets
+{"status": null}: the client searches in-process instead.
+
+Usage:
+    python3 -m biblelib.daemon start          # serve ~/dev_bibles in the background
+    python3 -m biblelib.daemon status
+    python3 -m biblelib.daemon stop
+    python3 -m biblelib.daemon run            # in the foreground (Ctrl-C stops it)
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .library import LIBRARY_DIR, Source, discover_sources
+from .client import SOCKET_NAME, ask
+from .search import CYAN, GREEN, NC, RED, YELLOW, SearchError, answer, parse_args
+from .store import BibleStore, Ref
+
+LOG_NAME = ".bible-daemon.log"
+WATCH_INTERVAL = 1.0  # seconds between looks for new and removed bibles
+MAX_LESSONS = 20000  # parsed lessons kept, least recently used dropped first
+CLIENT_TIMEOUT = 2.0  # seconds a client gets to send its request
+MAX_REQUEST = 1 << 20  # bytes
+START_TIMEOUT = 10.0  # seconds `start` waits for the daemon to answer
+
+
+class CachingStore(BibleStore):
+    """A BibleStore that keeps its postings, recent lessons and bibles mapped in memory until `forget()`"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lessons: "OrderedDict[Tuple[str, int, int], Dict]" = OrderedDict()
+        self._rows: Optional[Dict[int, Ref]] = None  # rowid -> Ref, loaded on first use
+        self._postings: Dict[Tuple[str, str], Set[int]] = {}
+
+    def load(self, ref: Ref) -> Dict:
+        key = (ref.path, ref.offset, ref.length)
+        lesson = self.lessons.get(key)
+        if lesson is None:
+            lesson = self.lessons[key] = super().load(ref)
+            if len(self.lessons) > MAX_LESSONS:
+                self.lessons.popitem(last=False)
+        else:
+            self.lessons.move_to_end(key)
+        return lesson
+
+    def forget(self):
+        """Drop postings, parsed lessons and mappings; needed after any bible changed, since another
+        process may have indexed the change already and then `refresh()` does not remap it"""
+        self.lessons.clear()
+        self._rows = None
+        self._postings = {}
+        for path in list(self._maps):
+            self._drop_handle(path)
+
+    def _index(self) -> Dict[int, Ref]:
+        """Every lesson's Ref, and the tag/type/project postings, read from sqlite once"""
+        if self._rows is None:
+            self._rows = {ref.rowid: ref for ref in map(Ref._make, self.db.execute(self._REF_SQL))}
+            postings: Dict[Tuple[str, str], Set[int]] = {}
+            for ref in self._rows.values():
+                postings.setdefault(("type", ref.type), set()).add(ref.rowid)
+                postings.setdefault(("project", ref.source), set()).add(ref.rowid)
+            for tag, rowid in self.db.execute("SELECT tag, lesson FROM tags"):
+                postings.setdefault(("tag", tag), set()).add(rowid)
+            self._postings = postings
+        return self._rows
+
+    def _posting(self, term) -> Set[int]:
+        self._index()
+        return self._postings.get((term.field, term.value), set())
+
+    def posting(self, term) -> Set[int]:
+        return set(self._posting(term))  # a copy: biblelib.query narrows its result in place
+
+    def posting_size(self, term) -> int:
+        return len(self._posting(term))
+
+    def restrict(self, term, candidates: Set[int]) -> Set[int]:
+        return candidates & self._posting(term)
+
+    def universe(self) -> Set[int]:
+        return set(self._index())
+
+    def refs(self, rowids: Iterable[int]) -> List[Ref]:
+        rows = self._index()
+        refs = [rows[rowid] for rowid in rowids if rowid in rows]
+        order = {s.name: i for i, s in enumerate(self.sources)}
+        refs.sort(key=lambda r: (order.get(r.source, len(order)), r.offset))
+        return refs
+
+
+def stamp(sources: List[Source]) -> Dict[str, Tuple[int, int]]:
+    """(size, mtime) of every bible, to tell whether any of them changed"""
+    stamps = {}
+    for source in sources:
+        try:
+            st = os.stat(source.path)
+        except FileNotFoundError:
+            continue
+        stamps[str(source.path)] = (st.st_size, st.st_mtime_ns)
+    return stamps
+
+
+class Daemon:
+    """Answers search requests for one library from an index it keeps open"""
+
+    def __init__(self, library_dir: pathlib.Path):
+        self.library_dir = pathlib.Path(library_dir).resolve()
+        self.store = CachingStore(self.library_dir, [])
+        self.stamps: Optional[Dict[str, Tuple[int, int]]] = None  # None: never refreshed
+        self.discovered = 0.0  # time.monotonic() of the last rediscovery
+        self.started = time.time()
+        self.served = 0
+        self.running = True
+        self.refresh()
+
+    def refresh(self, rediscover: bool = True):
+        """Pick up changed bibles, and with `rediscover` new and removed ones too.
+
+        Without it this is one stat per known bible when nothing changed,
+        cheap enough for every request; rediscovering lists the library.
+        """
+        sources = self.store.sources
+        if not rediscover:
+            stamps = stamp(sources)
+            rediscover = len(stamps) != len(sources)  # a known bible is gone: look again now
+        if rediscover:
+            sources = discover_sources(self.library_dir)
+            stamps = stamp(sources)
+            self.discovered = time.monotonic()
+        if sources == self.store.sources and stamps == self.stamps:
+            return
+        self.store.sources = sources
+        self.store.refresh()
+        self.store.forget()
+        self.stamps = stamps
+
+    def search(self, request: Dict) -> Dict:
+        """Run one search command line, capturing what it would print and its exit status"""
+        if request.get("library") != str(self.library_dir) or not isinstance(request.get("argv"), list):
+            return {"status": None}
+        self.refresh(rediscover=False)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        status = 0
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                # The client's library comes first, so a --library in argv (even abbreviated) overrides it.
+                args = parse_args(["--library", request["library"]] + request["argv"], request.get("prog"))
+                library_dir = pathlib.Path(request.get("cwd", "/"), args.library).resolve()
+                if args.no_daemon or library_dir != self.library_dir:
+                    return {"status": None}
+                args.library = self.library_dir
+                out = answer(args, self.store.sources, self.store)
+                stdout.write("\n".join(out) + "\n")
+            except SearchError as e:
+                print(f"{RED}{e}{NC}")
+                status = 1
+            except SystemExit as e:  # argparse: --help, usage errors
+                status = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+        self.served += 1
+        return {"status": status, "stdout": stdout.getvalue(), "stderr": stderr.getvalue()}
+
+    def status(self) -> Dict:
+        return {
+            "status": 0,
+            "pid": os.getpid(),
+            "library": str(self.library_dir),
+            "uptime": time.time() - self.started,
+            "bibles": len(self.store.sources),
+            "served": self.served,
+            "cached": len(self.store.lessons),
+        }
+
+    def handle(self, conn: socket.socket):
+        conn.settimeout(CLIENT_TIMEOUT)
+        try:
+            with conn.makefile("rb") as f:
+                request = json.loads(f.readline(MAX_REQUEST))
+        except (OSError, ValueError):
+            return
+        if not isinstance(request, dict):
+            return
+        op = request.get("op", "search")
+        try:
+            if op == "search":
+                reply = self.search(request)
+            elif op == "ping":
+                reply = self.status()
+            elif op == "stop":
+                reply = {"status": 0, "pid": os.getpid()}
+                self.running = False
+            else:
+                reply = {"status": None}
+        except Exception:  # a bug here must not take the daemon down: the client searches itself
+            traceback.print_exc()
+            reply = {"status": None}
+        try:
+            conn.sendall(json.dumps(reply).encode("utf-8"))
+        except OSError:
+            pass  # the client gave up waiting
+
+    def serve(self, path: pathlib.Path):
+        """Accept requests one at a time until stopped or the socket file is removed"""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)  # the socket is created rw for its owner only
+        try:
+            listener.bind(str(path))
+        finally:
+            os.umask(umask)
+        inode = path.stat().st_ino
+        listener.listen(16)
+        listener.settimeout(WATCH_INTERVAL)
+        print(f"Serving {self.library_dir} on {path} (pid {os.getpid()})", flush=True)
+        try:
+            while self.running:
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    if not path.exists():
+                        break  # someone removed the socket: nobody can reach us any more
+                    self.refresh()
+                    continue
+                with conn:
+                    self.handle(conn)
+                if time.monotonic() - self.discovered >= WATCH_INTERVAL:  # busy: the timer may never fire
+                    self.refresh()
+        finally:
+            listener.close()
+            with contextlib.suppress(FileNotFoundError):
+                if path.stat().st_ino == inode:
+                    path.unlink()
+            self.store.close()
+
+
+def run(library_dir: pathlib.Path) -> int:
+    """Serve `library_dir` in this process"""
+    path = library_dir / SOCKET_NAME
+    reply = ask(library_dir, {"op": "ping"})
+    if reply is not None:
+        print(f"{YELLOW}A query daemon is already running (pid {reply.get('pid')}){NC}", file=sys.stderr)
+        return 1
+    path.unlink(missing_ok=True)  # left behind by a daemon that was killed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # clean up the socket on `kill`
+    try:
+        Daemon(library_dir).serve(path)
+    except OSError as e:  # e.g. a library path too long for a Unix socket
+        print(f"{RED}Cannot serve {path}: {e}{NC}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def start(library_dir: pathlib.Path) -> int:
+    """Run the daemon in a detached process and wait until it answers"""
+    reply = ask(library_dir, {"op": "ping"})
+    if reply is not None:
+        print(f"{YELLOW}Query daemon already running (pid {reply.get('pid')}){NC}")
+        return 0
+    env = dict(os.environ)
+    package_root = str(pathlib.Path(__file__).resolve().parents[1])
+    env["PYTHONPATH"] = package_root + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    log_path = library_dir / LOG_NAME
+    with open(log_path, "ab") as log:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "biblelib.daemon", "--library", str(library_dir), "run"],
+            env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True,
+        )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline and proc.poll() is None:
+        reply = ask(library_dir, {"op": "ping"})
+        if reply is not None:
+            print(f"{GREEN}✓ Query daemon running (pid {reply['pid']}){NC}: searches of {library_dir} go to it")
+            return 0
+        time.sleep(0.05)
+    print(f"{RED}Query daemon did not start; see {log_path}{NC}", file=sys.stderr)
+    return 1
+
+
+def stop(library_dir: pathlib.Path) -> int:
+    reply = ask(library_dir, {"op": "stop"})
+    if reply is None:
+        (library_dir / SOCKET_NAME).unlink(missing_ok=True)
+        print(f"{YELLOW}No query daemon running{NC}")
+        return 0
+    print(f"{GREEN}✓ Stopped query daemon (pid {reply.get('pid')}){NC}")
+    return 0
+
+
+def show_status(library_dir: pathlib.Path) -> int:
+    reply = ask(library_dir, {"op": "ping"})
+    if reply is None:
+        print(f"{YELLOW}No query daemon running{NC} (searches run in-process)")
+        return 1
+    print(f"{CYAN}=== Query Daemon ==={NC}")
+    print(f"  pid:      {reply['pid']}")
+    print(f"  library:  {reply['library']}")
+    print(f"  uptime:   {reply['uptime']:.0f}s")
+    print(f"  bibles:   {reply['bibles']}")
+    print(f"  searches: {reply['served']}")
+    print(f"  cached:   {reply['cached']} lessons")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a library's index in memory and answer searches over a socket")
+    parser.add_argument("command", choices=("start", "stop", "status", "run"))
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    args = parser.parse_args()
+    library_dir = args.library.resolve()
+
+    if args.command == "run":
+        sys.exit(run(library_dir))
+    elif args.command == "start":
+        sys.exit(start(library_dir))
+    elif args.command == "stop":
+        sys.exit(stop(library_dir))
+    else:
+        sys.exit(show_status(library_dir))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
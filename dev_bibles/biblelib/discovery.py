@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Project Discovery
+Finds the projects under ~/repos that keep a bible (`dev_bible/bible.jsonl`),
+behind `bible-sync --discover`, `--status` and `--import`.
+
+Directories are scanned concurrently on a bounded thread pool, so slow
+network mounts are waited on in parallel, and nested layouts are searched
+up to MAX_DEPTH levels down (a project's own sub-directories are not).
+Results are cached in `<library>/.bible-projects.json`:
+    - a directory whose mtime is unchanged is not listed again; its
+      cached sub-directories are visited (stat only)
+    - a bible whose size and mtime are unchanged is not counted again
+`status` prints straight from the cache and refreshes it in a detached
+background process, so it answers at once; the next call sees the result.
+
+Usage:
+    python3 -m biblelib.discovery discover      # scan and list projects
+    python3 -m biblelib.discovery status        # library vs. repos, from cache
+    python3 -m biblelib.discovery refresh       # rescan and update the cache
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking
+    fcntl = None
+
+from .jsonl import count_lines
+from .library import BIBLE_FILE, LIBRARY_DIR, MASTER
+
+CACHE_NAME = ".bible-projects.json"
+REPOS_DIR = pathlib.Path(os.environ.get("BIBLE_REPOS", pathlib.Path.home() / "repos"))
+BIBLE_DIR = "dev_bible"
+MAX_DEPTH = 3       # directory levels below the repos directory searched for projects
+MAX_WORKERS = 16    # directories listed at once
+SKIP_DIRS = {"node_modules", "__pycache__", "venv", "dist", "build", "target"}
+
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+CYAN = '\033[0;36m'
+RED = '\033[0;31m'
+NC = '\033[0m'
+
+
+class Project(NamedTuple):
+    name: str            # relative path with "/" -> "-": `pushfundz`, `work-api`
+    path: pathlib.Path   # the project directory
+    bible: pathlib.Path
+    lines: int
+
+
+def project_name(rel: str) -> str:
+    return rel.replace("/", "-")
+
+
+class Scanner:
+    """One concurrent pass over a repos directory, reusing what the cache still vouches for"""
+
+    def __init__(self, repos_dir: pathlib.Path, cache: Dict):
+        self.repos_dir = repos_dir
+        self.old_dirs = cache.get("dirs", {})
+        self.old_bibles = cache.get("bibles", {})
+        self.dirs: Dict[str, Dict] = {}
+        self.bibles: Dict[str, Dict] = {}
+
+    def _visit(self, rel: str) -> Tuple[List[str], Optional[Project]]:
+        """List one directory (unless cached); returns (sub-directories to visit, its project)"""
+        path = self.repos_dir / rel if rel else self.repos_dir
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return [], None
+        cached = self.old_dirs.get(rel)
+        if cached is not None and cached["mtime_ns"] == mtime_ns:
+            children, has_bible = cached["children"], cached["bible"]
+        else:
+            children, has_bible = [], False
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name == BIBLE_DIR:
+                            has_bible = entry.is_dir()
+                        elif not entry.name.startswith(".") and entry.name not in SKIP_DIRS and entry.is_dir():
+                            children.append(entry.name)
+            except OSError:
+                pass
+            children.sort()
+        self.dirs[rel] = {"mtime_ns": mtime_ns, "children": children, "bible": has_bible}
+
+        if rel and has_bible:
+            project = self._project(rel, path)
+            if project is not None:
+                return [], project  # a project's own directories are not searched
+        depth = rel.count("/") + 1 if rel else 0
+        if depth >= MAX_DEPTH:
+            return [], None
+        return [f"{rel}/{child}" if rel else child for child in children], None
+
+    def _project(self, rel: str, path: pathlib.Path) -> Optional[Project]:
+        bible = path / BIBLE_DIR / BIBLE_FILE
+        try:
+            st = os.stat(bible)
+        except OSError:
+            return None
+        cached = self.old_bibles.get(rel)
+        if cached is not None and (cached["size"], cached["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            lines = cached["lines"]
+        else:
+            lines = count_lines(bible)
+        self.bibles[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "lines": lines}
+        return Project(project_name(rel), path, bible, lines)
+
+    def run(self, workers: int = MAX_WORKERS) -> List[Project]:
+        projects = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(self._visit, "")}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    children, project = future.result()
+                    if project is not None:
+                        projects.append(project)
+                    pending.update(pool.submit(self._visit, child) for child in children)
+        return sorted(projects)
+
+    def cache(self) -> Dict:
+        return {"version": 1, "repos": str(self.repos_dir), "dirs": self.dirs, "bibles": self.bibles}
+
+
+def load_cache(library_dir: pathlib.Path, repos_dir: pathlib.Path) -> Dict:
+    """The cached scan of `repos_dir` (empty if there is none, or it was of another directory)"""
+    try:
+        with open(library_dir / CACHE_NAME, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return cache if isinstance(cache, dict) and cache.get("repos") == str(repos_dir) else {}
+
+
+def save_cache(library_dir: pathlib.Path, cache: Dict):
+    path = library_dir / CACHE_NAME
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)  # a read-only library just goes uncached
+
+
+def scan(repos_dir: pathlib.Path = REPOS_DIR, library_dir: pathlib.Path = LIBRARY_DIR,
+         workers: int = MAX_WORKERS) -> List[Project]:
+    """Every project with a bible under `repos_dir`, by relative path; updates the cache"""
+    scanner = Scanner(repos_dir, load_cache(library_dir, repos_dir))
+    projects = scanner.run(workers)
+    save_cache(library_dir, scanner.cache())
+    return projects
+
+
+def cached_projects(repos_dir: pathlib.Path, library_dir: pathlib.Path) -> Optional[List[Project]]:
+    """Projects as of the last scan, without touching `repos_dir`; None if never scanned"""
+    cache = load_cache(library_dir, repos_dir)
+    if not cache:
+        return None
+    projects = []
+    for rel, bible in cache["bibles"].items():
+        path = repos_dir / rel
+        projects.append(Project(project_name(rel), path, path / BIBLE_DIR / BIBLE_FILE, bible["lines"]))
+    return sorted(projects)
+
+
+def refresh_in_background(repos_dir: pathlib.Path, library_dir: pathlib.Path):
+    """Rescan in a detached process; the caller does not wait for it"""
+    env = dict(os.environ)
+    package_root = str(pathlib.Path(__file__).resolve().parents[1])
+    env["PYTHONPATH"] = package_root + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    subprocess.Popen(
+        [sys.executable, "-m", "biblelib.discovery", "--library", str(library_dir), "--repos", str(repos_dir),
+         "refresh"],
+        env=env, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def refresh(repos_dir: pathlib.Path, library_dir: pathlib.Path, workers: int):
+    """`scan`, unless another refresh of this library is already running"""
+    lock_file = open(library_dir / (CACHE_NAME + ".lock"), "w")
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+        scan(repos_dir, library_dir, workers)
+    finally:
+        lock_file.close()  # closing the descriptor drops the flock
+
+
+def print_discover(projects: List[Project]):
+    print(f"{CYAN}=== Discovering Projects with Bibles ==={NC}")
+    print()
+    for project in projects:
+        print(f"{GREEN}✓{NC} {project.name}")
+        print(f"  Path: {project.path}")
+        print(f"  Lessons: {project.lines}")
+        print()
+    if not projects:
+        print(f"{YELLOW}No projects with dev_bible/ found{NC}")
+        print()
+        print("To add a Bible to a project:")
+        print("  cp -r /home/ubuntu/dev_bible /path/to/your-project/")
+    else:
+        print(f"{CYAN}Found {len(projects)} project(s) with Bibles{NC}")
+        print()
+        print("Run: bible-sync --import")
+
+
+def print_status(library_dir: pathlib.Path, projects: List[Project]):
+    print(f"{CYAN}=== Bible Library Status ==={NC}")
+    print()
+    master = library_dir / MASTER / BIBLE_FILE
+    if master.is_file():
+        print(f"{GREEN}✓{NC} Master Bible: {count_lines(master)} lessons")
+    else:
+        print(f"{RED}✗{NC} Master Bible not found")
+
+    print()
+    print(f"{YELLOW}Project Bibles in Library:{NC}")
+    imported = 0
+    total = 0
+    for project_dir in sorted(library_dir.iterdir()) if library_dir.is_dir() else []:
+        bible = project_dir / BIBLE_FILE
+        if project_dir.name != MASTER and project_dir.is_dir() and bible.is_file():
+            count = count_lines(bible)
+            print(f"  {GREEN}✓{NC} {project_dir.name}: {count} lessons")
+            imported += 1
+            total += count
+    if not imported:
+        print(f"  {YELLOW}No projects imported yet{NC}")
+        print()
+        print("Run: bible-sync --discover")
+    else:
+        print()
+        print(f"{CYAN}Total: {imported} projects, {total} lessons{NC}")
+
+    print()
+    print(f"{YELLOW}Projects with Bibles (not yet imported):{NC}")
+    unsynced = [p for p in projects if not (library_dir / p.name / BIBLE_FILE).is_file()]
+    for project in unsynced:
+        print(f"  {YELLOW}⊙{NC} {project.name}: {project.lines} lessons (not imported)")
+    if not unsynced:
+        print(f"  {GREEN}All projects synced{NC}")
+    else:
+        print()
+        print("Run: bible-sync --import")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find project bibles under the repos directory")
+    parser.add_argument("command", choices=("discover", "status", "refresh"))
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    parser.add_argument("--repos", type=pathlib.Path, default=REPOS_DIR, help="Directory holding the projects")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"Directories listed at once (default: {MAX_WORKERS})")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        refresh(args.repos, args.library, args.workers)
+    elif args.command == "discover":
+        print_discover(scan(args.repos, args.library, args.workers))
+    else:
+        projects = cached_projects(args.repos, args.library)
+        if projects is None:
+            projects = scan(args.repos, args.library, args.workers)
+        else:
+            refresh_in_background(args.repos, args.library)
+        print_status(args.library, projects)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:
+        sys.exit(0)
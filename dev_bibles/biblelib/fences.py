@@ -0,0 +1,53 @@
+"""
+Fenced Card Blocks
+Finds the knowledge cards in a PR body: the lines of its ```json and
+```jsonl fenced blocks. Shared by tooling/extractors/pr2kb.py and
+tooling/validators/validate_cards.py.
+
+The body is scanned forward only: a search for the next opener (a line
+ending in ```json / ```jsonl), then one for the line that closes it (a
+line starting with ```), and the lines in between are yielded, so the
+work is linear in the body whatever it holds. A regex with a lazy `(.*?)`
+under DOTALL instead rescans to the end of the text for every opener that
+is never closed. A block left open runs to the end of the body, as GitHub
+renders it. Only the first MAX_SCAN characters of a body are looked at,
+so a bot's multi-megabyte log costs no more than that.
+
+Usage:
+    from biblelib.fences import card_lines
+    for line in card_lines(pr_body):
+        card = json.loads(line)
+"""
+
+import re
+from typing import Iterator, Optional
+
+MAX_SCAN = 1 << 20  # characters of a body scanned for cards
+
+RE_OPENER = re.compile(r'```jsonl?[ \t\r\f\v]*$', re.I | re.M)
+RE_CLOSER = re.compile(r'^[ \t]*```', re.M)
+COMMENTS = ("//", "#")
+
+
+def card_lines(text: str, limit: Optional[int] = MAX_SCAN) -> Iterator[str]:
+    """Stripped, non-blank, non-comment lines inside the body's ```json / ```jsonl blocks"""
+    end = len(text) if limit is None else min(len(text), limit)
+    pos = 0
+    while True:
+        opener = RE_OPENER.search(text, pos, end)
+        if opener is None:
+            return
+        start = opener.end() + 1  # past the opener's newline
+        closer = RE_CLOSER.search(text, start, end)
+        for line in text[start:closer.start() if closer else end].split("\n"):
+            line = line.strip()
+            if line and not line.startswith(COMMENTS):
+                yield line
+        if closer is None:
+            return
+        pos = closer.end()
+
+
+def truncated(text: str, limit: int = MAX_SCAN) -> bool:
+    """True if `card_lines` leaves part of `text` unscanned"""
+    return len(text) > limit
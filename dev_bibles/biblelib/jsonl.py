@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Memory-Mapped JSONL Reader
+Zero-copy access to bible.jsonl files for every Python consumer.
+
+The file is mmapped once. Record boundaries are found by the mapping's own
+C newline scan (mmap.find), and records are handed out as memoryview
+slices with their byte offset and line number, so nothing is copied or
+decoded until a caller asks for it. Counting lines is a newline count
+over the mapping, and a record looked up by offset is parsed from its own
+bytes only.
+
+Slices point into the mapping: copy them with bytes() if they must outlive
+the reader.
+
+Usage:
+    with JsonlMap(path) as bible:
+        print(bible.count_lines())
+        for record in bible.records():
+            if b'"MISTAKE"' in record.data:
+                lesson = record.load()
+
+    python3 -m biblelib.jsonl count bible.jsonl other.jsonl   # like wc -l
+    python3 -m biblelib.jsonl stats bible.jsonl               # lessons per type
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+COUNT_BLOCK = 1 << 22  # bytes counted per step by count_newlines
+TEXT_BLOCK = 1 << 22   # bytes decoded per step by lines()
+WHITESPACE = b" \t\r\n\f\v"
+
+RE_TYPE = re.compile(rb'"type"\s*:\s*"([^"\\]*)"')
+
+# Types in the order the Makefile's `stats` target prints them
+STATS_LABELS = (
+    ("MISTAKE", "Mistakes"),
+    ("PATTERN", "Patterns"),
+    ("PRINCIPLE", "Principles"),
+    ("RUNBOOK", "Runbooks"),
+    ("DECISION", "Decisions"),
+)
+
+
+class Record(NamedTuple):
+    line: int          # 1-based line number
+    offset: int        # byte offset of the record's first non-blank byte
+    data: memoryview   # the record, surrounding whitespace stripped
+
+    def load(self):
+        """Parse the record (the only place its bytes are copied)"""
+        return json.loads(self.text())
+
+    def text(self) -> str:
+        """The record decoded as UTF-8 (json.loads is faster on str than on bytes)"""
+        return str(self.data, "utf-8")
+
+
+class JsonlMap:
+    """A read-only mapping of one JSONL file"""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file; an empty buffer behaves the same
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.buffer = memoryview(self._mm) if self._mm is not None else memoryview(b"")
+
+    def close(self):
+        self.buffer.release()
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:  # a caller still holds a slice; unmapped when it is dropped
+                pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def records(self, start: int = 0, end: Optional[int] = None, first_line: int = 1) -> Iterator[Record]:
+        """Every non-blank line in [start, end) as a Record; `start` must begin a line.
+
+        Lines are found with mmap.find and trimmed by indexing the mapping,
+        so the only object made per record is its memoryview slice.
+        """
+        if self._mm is None:
+            return
+        find = self._mm.find
+        buffer = self.buffer
+        end = self.size if end is None else end
+        pos = start
+        line = first_line
+        while pos < end:
+            last = find(b"\n", pos, end)  # C-level scan to the next newline
+            if last < 0:
+                last = end
+            first = pos
+            pos = last + 1
+            if buffer[first] in WHITESPACE:  # the loops only run for indented or blank lines
+                while first < last and buffer[first] in WHITESPACE:
+                    first += 1
+            if last > first and buffer[last - 1] in WHITESPACE:  # and for CRLF or trailing blanks
+                while last > first and buffer[last - 1] in WHITESPACE:
+                    last -= 1
+            if first < last:
+                yield Record(line, first, buffer[first:last])
+            line += 1
+
+    def lines(self, start: int = 0, end: Optional[int] = None, first_line: int = 1) -> Iterator[Tuple[int, str]]:
+        """(line number, stripped text) for every non-blank line in [start, end).
+
+        For consumers that parse every record: the mapping is decoded and
+        split a newline-aligned block at a time, in C, which beats decoding
+        records one by one while keeping memory bounded by TEXT_BLOCK.
+        """
+        end = self.size if end is None else end
+        pos = start
+        line = first_line
+        while pos < end:
+            stop = min(self.next_line(min(pos + TEXT_BLOCK, end) - 1), end)
+            texts = str(self.buffer[pos:stop], "utf-8").split("\n")
+            if texts[-1] == "":
+                texts.pop()  # the block ended with a newline
+            for text in texts:
+                text = text.strip()
+                if text:
+                    yield line, text
+                line += 1
+            pos = stop
+
+    def next_line(self, pos: int) -> int:
+        """Offset of the line after the one containing `pos` (the file size if there is none)"""
+        nl = self._mm.find(b"\n", pos) if self._mm is not None else -1
+        return self.size if nl < 0 else nl + 1
+
+    def count_newlines(self, start: int = 0, end: Optional[int] = None) -> int:
+        """Newlines in [start, end): what `wc -l` reports for the whole file"""
+        end = self.size if end is None else end
+        count = 0
+        for block in range(start, end, COUNT_BLOCK):
+            count += self.buffer[block:min(block + COUNT_BLOCK, end)].tobytes().count(b"\n")
+        return count
+
+    def count_lines(self) -> int:
+        """Lines as file iteration sees them: an unterminated last line counts too"""
+        count = self.count_newlines()
+        if self.size and self._mm[self.size - 1] != ord("\n"):
+            count += 1
+        return count
+
+    def read_at(self, offset: int) -> bytes:
+        """The raw record starting at `offset`, up to (not including) its newline"""
+        end = self.next_line(offset)
+        return self._mm[offset:end].rstrip(WHITESPACE)
+
+    def load_at(self, offset: int):
+        """Parse the record starting at `offset` without touching the rest of the file"""
+        return json.loads(self.read_at(offset).decode("utf-8"))
+
+    def count_types(self) -> Dict[str, int]:
+        """Lessons per `"type"` value, found without decoding the records (like `grep -c`)"""
+        counts: Counter = Counter()
+        search = RE_TYPE.search
+        for record in self.records():
+            m = search(self._mm, record.offset, record.offset + len(record.data))
+            if m:
+                counts[m.group(1).decode("utf-8", "replace")] += 1
+        return counts
+
+
+def count_lines(path) -> int:
+    """Newline count of a file, as `wc -l` reports it"""
+    with JsonlMap(path) as bible:
+        return bible.count_newlines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count and summarize JSONL bibles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    count = sub.add_parser("count", help="Line count per file (like wc -l)")
+    count.add_argument("files", nargs="+")
+    stats = sub.add_parser("stats", help="Lessons per type in one pass (the Makefile's stats)")
+    stats.add_argument("file")
+    args = parser.parse_args()
+
+    if args.command == "count":
+        for path in args.files:
+            print(f"{count_lines(path):>7} {path}")
+        return
+
+    with JsonlMap(args.file) as bible:
+        types = bible.count_types()
+        print(f"Total lessons: {bible.count_newlines()}")
+    for lesson_type, label in STATS_LABELS:
+        print(f"{label + ':':<14} {types.get(lesson_type, 0)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except BrokenPipeError:
+        sys.exit(0)
@@ -0,0 +1,74 @@
+"""
+Library Layout
+Finds the bible.jsonl files that make up a dev_bibles library.
+
+A library is a directory (normally ~/dev_bibles) holding `_master/` and one
+sub-directory per imported project, each with a bible.jsonl. Bibles that
+live elsewhere can be registered in the library's index.json; its paths
+are relative to the library's parent directory.
+"""
+
+import json
+import os
+import pathlib
+from typing import List, NamedTuple
+
+LIBRARY_DIR = pathlib.Path(os.environ.get("BIBLE_LIBRARY", pathlib.Path(__file__).resolve().parents[1]))
+MASTER = "_master"
+BIBLE_FILE = "bible.jsonl"
+
+
+class Source(NamedTuple):
+    """One bible file: `name` is the project it belongs to (`_master` for the master bible)"""
+    name: str
+    path: pathlib.Path
+
+
+def registered_bibles(library_dir: pathlib.Path) -> List[Source]:
+    """Bible files listed in the library's index.json (non-JSONL entries are skipped)"""
+    index_file = library_dir / "index.json"
+    try:
+        with index_file.open("r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+    sources = []
+    for key, entry in entries.items():
+        rel = entry.get("path", "") if isinstance(entry, dict) else ""
+        if not rel.endswith(".jsonl"):
+            continue
+        path = (library_dir.parent / rel).resolve()
+        if path.parent.parent == library_dir.resolve():
+            name = path.parent.name
+        else:
+            name = key.split(":", 1)[-1]
+        sources.append(Source(name, path))
+    return sources
+
+
+def project_bibles(library_dir: pathlib.Path) -> List[Source]:
+    """`<library>/<project>/bible.jsonl` files, the layout bible-sync imports into"""
+    sources = []
+    for project_dir in sorted(library_dir.iterdir()) if library_dir.is_dir() else []:
+        bible_file = project_dir / BIBLE_FILE
+        if project_dir.is_dir() and bible_file.is_file():
+            sources.append(Source(project_dir.name, bible_file.resolve()))
+    return sources
+
+
+def discover_sources(library_dir: pathlib.Path = LIBRARY_DIR) -> List[Source]:
+    """All bibles of a library, master first, then projects by name; missing files are skipped"""
+    library_dir = pathlib.Path(library_dir)
+    seen = {}
+    for source in project_bibles(library_dir) + registered_bibles(library_dir):
+        if source.path not in seen and source.path.is_file():
+            seen[source.path] = source
+    names = set()
+    sources = []
+    for source in sorted(seen.values(), key=lambda s: (s.name != MASTER, s.name)):
+        if source.name in names:  # keep names unique for project scoping
+            source = Source(f"{source.name}@{source.path.parent}", source.path)
+        names.add(source.name)
+        sources.append(source)
+    return sources
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Bible Merge
+Reconciles every bible of a library into one deduplicated, id-sorted file.
+
+The same lesson is often copied into several bibles (`_master`, each
+project, the root template). A merge streams all of them once, in library
+order (master first), and keeps one record per lesson:
+    - records sharing an id are duplicates if their content matches, and a
+      conflict otherwise; conflicts are settled by the --policy
+    - records with different ids but the same normalized content (the
+      lesson minus its id, whitespace collapsed, case folded, tags sorted)
+      are duplicates too: the first id is kept
+    - with --near, lessons that only nearly match (biblelib.neardup) are
+      folded into one canonical card, picked by the same policy, which
+      takes on the tags of the cards folded into it
+Only ids, 16-byte content fingerprints and each winner's location are held
+in memory, never the lessons. The output is then written in id order by
+reading each winner back from its bible's mapping.
+
+Usage:
+    python3 -m biblelib.merge                           # -> <library>/merged.jsonl
+    python3 -m biblelib.merge --policy longest -o all.jsonl
+    python3 -m biblelib.merge --policy error            # list conflicts, exit 1
+    python3 -m biblelib.merge --near 0.8                # also fold near-duplicates
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import pathlib
+import re
+import sys
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .jsonl import JsonlMap
+from .library import LIBRARY_DIR, Source, discover_sources
+
+MERGED_NAME = "merged.jsonl"
+
+# How a conflict (same id, different content) is settled
+FIRST = "first"      # the earliest in library order wins (master, then projects by name)
+LAST = "last"        # the latest wins
+LONGEST = "longest"  # the longest record wins (ties: the earliest)
+ERROR = "error"      # nothing is written; conflicts are listed
+POLICIES = (FIRST, LAST, LONGEST, ERROR)
+
+RE_SPACE = re.compile(r"\s+")
+
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+CYAN = '\033[0;36m'
+RED = '\033[0;31m'
+NC = '\033[0m'
+
+
+class Location(NamedTuple):
+    source: int   # index into the merge's sources
+    line: int
+    offset: int
+    length: int
+
+    def pack(self) -> int:
+        """One int instead of a tuple of four: what the per-id table holds"""
+        return (((self.source << 40 | self.line) << 48 | self.offset) << 32) | self.length
+
+    @classmethod
+    def unpack(cls, packed: int) -> "Location":
+        return cls(packed >> 120, packed >> 80 & (1 << 40) - 1, packed >> 32 & (1 << 48) - 1, packed & (1 << 32) - 1)
+
+
+class MergeStats:
+    def __init__(self):
+        self.records = 0
+        self.unparsable = 0
+        self.same_id = 0        # same id, same content
+        self.same_content = 0   # different id, same content
+        self.conflicts: List[Tuple[str, Location, Location]] = []  # id, kept, other
+        self.folded: List[Tuple[str, List[str]]] = []  # canonical id, ids folded into it
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return RE_SPACE.sub(" ", value).strip().casefold()
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def fingerprint(lesson: Dict) -> bytes:
+    """Digest of a lesson's content, ignoring its id, whitespace, case and tag order"""
+    content = {k: v for k, v in lesson.items() if k != "id"}
+    content = _normalize(content)
+    if isinstance(content.get("tags"), list):
+        content["tags"] = sorted(set(t for t in content["tags"] if isinstance(t, str)))
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+
+def _wins(policy: str, new: Location, old: Location) -> bool:
+    if policy == LAST:
+        return True
+    if policy == LONGEST:
+        return new.length > old.length
+    return False
+
+
+class Merger:
+    """One pass over the sources; memory holds ids, fingerprints and locations only"""
+
+    def __init__(self, sources: List[Source], policy: str = FIRST):
+        self.sources = sources
+        self.policy = policy
+        self.by_id: Dict[str, Tuple[bytes, int]] = {}  # id -> (fingerprint, packed Location)
+        self.by_content: Dict[bytes, str] = {}  # fingerprint -> id holding it
+        self.anonymous: Dict[bytes, int] = {}  # lessons without an id: fingerprint -> packed Location
+        self.retagged: Dict[str, List[str]] = {}  # canonical id -> tags after folding, if they grew
+        self.stats = MergeStats()
+
+    def run(self) -> MergeStats:
+        for index, source in enumerate(self.sources):
+            with JsonlMap(source.path) as bible:
+                for record in bible.records():
+                    self._add(index, record)
+        return self.stats
+
+    def _add(self, index: int, record):
+        self.stats.records += 1
+        where = Location(index, record.line, record.offset, len(record.data))
+        try:
+            lesson = record.load()
+        except (ValueError, UnicodeDecodeError):
+            lesson = None
+        if not isinstance(lesson, dict):
+            self.stats.unparsable += 1
+            return
+        fp = fingerprint(lesson)
+        lesson_id = lesson.get("id")
+        if not isinstance(lesson_id, str) or not lesson_id:
+            if fp in self.anonymous:
+                self.stats.same_content += 1
+            else:
+                self.anonymous[fp] = where.pack()
+            return
+
+        kept = self.by_id.get(lesson_id)
+        if kept is not None:
+            kept_fp, kept_where = kept[0], Location.unpack(kept[1])
+            if kept_fp == fp:
+                self.stats.same_id += 1
+                return
+            self.stats.conflicts.append((lesson_id, kept_where, where))
+            if _wins(self.policy, where, kept_where):
+                if self.by_content.get(kept_fp) == lesson_id:
+                    del self.by_content[kept_fp]
+                self.by_id[lesson_id] = (fp, where.pack())
+                self.by_content.setdefault(fp, lesson_id)
+            return
+
+        if fp in self.by_content:
+            self.stats.same_content += 1
+            return
+        self.by_id[lesson_id] = (fp, where.pack())
+        self.by_content[fp] = lesson_id
+
+    def kept(self, lesson_id: str) -> Location:
+        return Location.unpack(self.by_id[lesson_id][1])
+
+    def fold(self, threshold: float) -> int:
+        """Fold near-duplicate winners into one canonical card each; returns the cards dropped
+
+        Needs a MinHash signature per kept lesson in memory while it runs.
+        """
+        from .neardup import NearDuplicates, lesson_text, signature
+
+        index = NearDuplicates(threshold)
+        ids: List[str] = []
+        with self._maps() as maps:
+            for lesson_id in sorted(self.by_id, key=lambda i: self.by_id[i][1]):  # library order
+                sig = signature(lesson_text(self._load(maps, lesson_id)))
+                if sig is not None:
+                    index.add(sig)
+                    ids.append(lesson_id)
+
+            dropped = 0
+            for cluster in index.clusters():
+                members = [ids[i] for i in cluster]
+                canonical = self._canonical(members)
+                others = [m for m in members if m != canonical]
+                tags = self._load(maps, canonical).get("tags")
+                if isinstance(tags, list):
+                    merged = list(tags)
+                    for other in others:
+                        extra = self._load(maps, other).get("tags")
+                        if isinstance(extra, list):
+                            merged.extend(t for t in extra if isinstance(t, str) and t not in merged)
+                    if len(merged) > len(tags):
+                        self.retagged[canonical] = merged
+                for other in others:
+                    del self.by_id[other]
+                self.stats.folded.append((canonical, others))
+                dropped += len(others)
+        return dropped
+
+    def _canonical(self, members: List[str]) -> str:
+        """The cluster member the policy prefers, as it would in an id conflict"""
+        if self.policy == LAST:
+            return max(members, key=lambda m: self.by_id[m][1])
+        if self.policy == LONGEST:
+            return max(members, key=lambda m: (self.kept(m).length, -self.by_id[m][1]))
+        return min(members, key=lambda m: self.by_id[m][1])
+
+    def _load(self, maps: List[JsonlMap], lesson_id: str) -> Dict:
+        where = self.kept(lesson_id)
+        return maps[where.source].load_at(where.offset)
+
+    @contextlib.contextmanager
+    def _maps(self) -> Iterator[List[JsonlMap]]:
+        maps = [JsonlMap(source.path) for source in self.sources]
+        try:
+            yield maps
+        finally:
+            for bible in maps:
+                bible.close()
+
+    def winners(self) -> Iterator[Tuple[Optional[str], Location]]:
+        """Kept records with their ids: by id, then lessons without one in library order"""
+        for lesson_id in sorted(self.by_id):
+            yield lesson_id, self.kept(lesson_id)
+        for packed in sorted(self.anonymous.values()):
+            yield None, Location.unpack(packed)
+
+    def write(self, output: pathlib.Path) -> int:
+        """Write the kept records, exactly as they are in their bibles (unless retagged), atomically"""
+        tmp = output.with_name(f"{output.name}.{os.getpid()}.tmp")
+        try:
+            with self._maps() as maps, open(tmp, "wb") as f:
+                written = 0
+                for lesson_id, where in self.winners():
+                    if lesson_id in self.retagged:
+                        lesson = maps[where.source].load_at(where.offset)
+                        lesson["tags"] = self.retagged[lesson_id]
+                        f.write(json.dumps(lesson, ensure_ascii=False).encode("utf-8"))
+                    else:
+                        f.write(maps[where.source].buffer[where.offset:where.offset + where.length])
+                    f.write(b"\n")
+                    written += 1
+            os.replace(tmp, output)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return written
+
+    def describe(self, where: Location) -> str:
+        return f"{self.sources[where.source].name}:{where.line}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge and deduplicate every bible of a library")
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    parser.add_argument("-o", "--output", type=pathlib.Path, help=f"Merged file (default: <library>/{MERGED_NAME})")
+    parser.add_argument("--policy", choices=POLICIES, default=FIRST,
+                        help="Who wins when one id has different content (default: first)")
+    parser.add_argument("--near", type=float, metavar="THRESHOLD",
+                        help="Also fold lessons whose estimated similarity reaches THRESHOLD (e.g. 0.8)")
+    args = parser.parse_args()
+
+    sources = discover_sources(args.library)
+    merger = Merger(sources, args.policy)
+    stats = merger.run()
+
+    print(f"{CYAN}=== Merging {len(sources)} Bible(s) ==={NC}")
+    print(f"   Records read:            {stats.records}")
+    print(f"   Same id, same content:   {stats.same_id}")
+    print(f"   Same content, other id:  {stats.same_content}")
+    print(f"   Id conflicts:            {len(stats.conflicts)}")
+    if stats.unparsable:
+        print(f"   {YELLOW}Skipped (not a JSON object): {stats.unparsable}{NC}")
+
+    if stats.conflicts:
+        print()
+        for lesson_id, kept, other in stats.conflicts[:20]:
+            outcome = "" if args.policy == ERROR else \
+                f" -> {merger.describe(merger.kept(lesson_id))} kept"
+            print(f"   {YELLOW}⚠{NC}  {lesson_id}: {merger.describe(kept)} vs {merger.describe(other)}{outcome}")
+        if len(stats.conflicts) > 20:
+            print(f"   ... and {len(stats.conflicts) - 20} more")
+    if args.policy == ERROR and stats.conflicts:
+        print(f"\n{RED}❌ {len(stats.conflicts)} id conflict(s); nothing written{NC}")
+        sys.exit(1)
+
+    if args.near is not None:
+        dropped = merger.fold(args.near)
+        print(f"\n   Near-duplicates folded:  {dropped} into {len(stats.folded)} card(s)")
+        for canonical, others in stats.folded[:20]:
+            print(f"   {CYAN}≈{NC}  {canonical} <- {', '.join(others)}")
+        if len(stats.folded) > 20:
+            print(f"   ... and {len(stats.folded) - 20} more")
+
+    output = args.output or args.library / MERGED_NAME
+    written = merger.write(output)
+    print(f"\n{GREEN}✅ Wrote {written} lesson(s) to {output}{NC}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:
+        sys.exit(0)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Lessons
+Finds lessons that say nearly the same thing under different ids, such as
+git2kb's commit-subject MISTAKE cards and pr2kb's fallback cards for the
+same bug, without comparing every pair.
+
+Each lesson's text fields are cut into word 3-grams and summarized by a
+MinHash signature. The signature uses one-permutation hashing: every
+shingle is hashed once (BLAKE2b) and the hash space is split into
+NUM_PERM bins, each keeping its minimum; empty bins borrow from the next
+full one (rotation densification). Signatures are cut into bands for
+locality-sensitive hashing, with the band/row split picked from the
+threshold, and a lesson is only compared with the first lesson of each
+bucket it lands in. Pairs whose estimated Jaccard similarity reaches the
+threshold are joined into clusters. The whole pass is linear in the
+number of lessons.
+
+Usage:
+    python3 -m biblelib.neardup                       # every bible of the library
+    python3 -m biblelib.neardup --threshold 0.7 --type MISTAKE
+    python3 -m biblelib.neardup ai_manual/kb/knowledge.jsonl
+"""
+
+import argparse
+import hashlib
+import pathlib
+import re
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .jsonl import JsonlMap
+from .library import LIBRARY_DIR, Source, discover_sources
+from .merge import Location
+
+NUM_PERM = 64        # MinHash bins per signature (a power of two)
+SHINGLE = 3          # words per shingle
+DEFAULT_THRESHOLD = 0.8
+BIN_BITS = NUM_PERM.bit_length() - 1
+VALUE_BITS = 64 - BIN_BITS  # the top bits of a hash pick its bin, the rest is the value
+
+# Fields whose words make up a lesson's text, in every card type
+TEXT_FIELDS = ("symptom", "root_cause", "fix_steps", "name", "when", "steps", "title",
+               "text", "question", "decision", "reason")
+
+RE_WORD = re.compile(r"\w+")
+
+CYAN = '\033[0;36m'
+YELLOW = '\033[1;33m'
+GREEN = '\033[0;32m'
+NC = '\033[0m'
+
+
+def lesson_text(lesson: Dict) -> str:
+    """The words of a lesson that decide whether it duplicates another"""
+    parts = []
+    for field in TEXT_FIELDS:
+        value = lesson.get(field)
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, list):
+            parts.extend(v for v in value if isinstance(v, str))
+    return " ".join(parts)
+
+
+def signature(text: str) -> Optional[array]:
+    """One-permutation MinHash of `text`'s word shingles; None if it has no words"""
+    words = RE_WORD.findall(text.casefold())
+    if not words:
+        return None
+    if len(words) < SHINGLE:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)]
+
+    empty = 1 << 64
+    bins = [empty] * NUM_PERM
+    mask = (1 << VALUE_BITS) - 1
+    for shingle in set(shingles):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        b = h >> VALUE_BITS
+        if h & mask < bins[b]:
+            bins[b] = h & mask
+    # Densify: an empty bin takes the next full bin's minimum, tagged with the distance
+    for b in range(NUM_PERM):
+        if bins[b] == empty:
+            for step in range(1, NUM_PERM):
+                borrowed = bins[(b + step) % NUM_PERM]
+                if borrowed >> VALUE_BITS == 0:  # a bin of its own, not empty or borrowed
+                    bins[b] = step << VALUE_BITS | borrowed
+                    break
+    return array("Q", bins)
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def bands_for(threshold: float) -> Tuple[int, int]:
+    """(bands, rows) with bands * rows = NUM_PERM whose LSH threshold is the highest not above `threshold`"""
+    splits = [(NUM_PERM // rows, rows) for rows in range(1, NUM_PERM + 1) if NUM_PERM % rows == 0]
+    below = [(b, r) for b, r in splits if (1 / b) ** (1 / r) <= threshold]
+    return max(below, key=lambda s: (1 / s[0]) ** (1 / s[1])) if below else splits[0]
+
+
+class NearDuplicates:
+    """Online LSH index: add signatures, then read the clusters"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.bands, self.rows = bands_for(threshold)
+        self.buckets: List[Dict[bytes, int]] = [{} for _ in range(self.bands)]
+        self.signatures: List[array] = []
+        self.parent: List[int] = []
+
+    def add(self, sig: array) -> int:
+        """Index one signature; returns its item number"""
+        item = len(self.signatures)
+        self.signatures.append(sig)
+        self.parent.append(item)
+        raw = sig.tobytes()
+        width = self.rows * sig.itemsize
+        for band, bucket in enumerate(self.buckets):
+            first = bucket.setdefault(raw[band * width:(band + 1) * width], item)
+            if first != item and self._find(first) != self._find(item) \
+                    and similarity(sig, self.signatures[first]) >= self.threshold:
+                self.parent[self._find(item)] = self._find(first)
+        return item
+
+    def _find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def clusters(self) -> List[List[int]]:
+        """Groups of two or more items, each in item order, ordered by their first item"""
+        groups: Dict[int, List[int]] = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self._find(item), []).append(item)
+        return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: g[0])
+
+
+def scan(sources: List[Source], threshold: float = DEFAULT_THRESHOLD,
+         lesson_type: Optional[str] = None) -> Tuple[List[List[Location]], int]:
+    """Near-duplicate clusters across `sources` as record locations, and the number of lessons compared"""
+    index = NearDuplicates(threshold)
+    where: List[Location] = []
+    for n, source in enumerate(sources):
+        with JsonlMap(source.path) as bible:
+            for record in bible.records():
+                try:
+                    lesson = record.load()
+                except (ValueError, UnicodeDecodeError):
+                    continue
+                if not isinstance(lesson, dict) or (lesson_type and lesson.get("type") != lesson_type):
+                    continue
+                sig = signature(lesson_text(lesson))
+                if sig is not None:
+                    index.add(sig)
+                    where.append(Location(n, record.line, record.offset, len(record.data)))
+    return [[where[i] for i in cluster] for cluster in index.clusters()], len(where)
+
+
+def file_sources(paths: Iterable[pathlib.Path]) -> List[Source]:
+    return [Source(str(path), path) for path in paths]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate lessons with MinHash/LSH")
+    parser.add_argument("files", nargs="*", type=pathlib.Path, help="JSONL files (default: every bible of --library)")
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Estimated Jaccard similarity that makes a duplicate (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--type", dest="lesson_type", help="Only compare lessons of this type")
+    args = parser.parse_args()
+
+    sources = file_sources(args.files) if args.files else discover_sources(args.library)
+    clusters, compared = scan(sources, args.threshold, args.lesson_type)
+
+    print(f"{CYAN}=== Near-duplicates (similarity >= {args.threshold}) ==={NC}")
+    maps = [JsonlMap(source.path) for source in sources]
+    try:
+        for cluster in clusters:
+            print()
+            for where in cluster:
+                lesson = maps[where.source].load_at(where.offset)
+                title = next((lesson[f] for f in TEXT_FIELDS if isinstance(lesson.get(f), str)), "")
+                print(f"  {YELLOW}{sources[where.source].name}:{where.line}{NC} "
+                      f"[{lesson.get('id')}] {title[:80]}")
+    finally:
+        for bible in maps:
+            bible.close()
+    print()
+    print(f"{GREEN}{len(clusters)} cluster(s), {sum(map(len, clusters))} lessons, out of {compared} compared{NC}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:
+        sys.exit(0)
@@ -0,0 +1,177 @@
+"""
+Bible Query Language
+Boolean queries over exact tags, evaluated on the sidecar index's posting lists.
+
+Syntax:
+    auth                        lessons tagged exactly "auth"
+    auth security               implicit AND
+    auth AND security NOT frontend
+    (auth OR jwt) AND NOT deprecated
+    type:MISTAKE api            type filter
+    project:pushfundz wallet    project filter (project:_master = master bible)
+    tag:"needs review"          explicit / quoted tag
+
+Operators are upper-case; NOT binds tighter than AND, AND tighter than OR.
+
+An AND starts from its smallest posting list and narrows it with the other
+terms by membership checks against the index, and NOT terms are removed the
+same way, so a compound query costs time in proportion to its smallest
+posting list rather than to the corpus.
+"""
+
+import re
+from typing import List, NamedTuple, Set, Tuple, Union
+
+FIELDS = ("tag", "type", "project")
+
+RE_TOKEN = re.compile(r'\s*(\(|\)|(?:\w+:)?"[^"]*"|[^\s()]+)')
+
+
+class QuerySyntaxError(ValueError):
+    """Raised for malformed queries"""
+
+
+class Term(NamedTuple):
+    field: str  # tag | type | project
+    value: str
+
+
+class Not(NamedTuple):
+    child: "Node"
+
+
+class And(NamedTuple):
+    children: Tuple["Node", ...]
+
+
+class Or(NamedTuple):
+    children: Tuple["Node", ...]
+
+
+Node = Union[Term, Not, And, Or]
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        m = RE_TOKEN.match(text, pos)
+        if not m:
+            raise QuerySyntaxError(f"Unexpected input at: {text[pos:]!r}")
+        tokens.append(m.group(1))
+        pos = m.end()
+    return tokens
+
+
+def parse(text: str) -> Node:
+    """Parse a query string into a tree of Term / Not / And / Or"""
+    tokens = tokenize(text)
+    if not tokens:
+        raise QuerySyntaxError("Empty query")
+    node, pos = _parse_or(tokens, 0)
+    if pos != len(tokens):
+        raise QuerySyntaxError(f"Unexpected {tokens[pos]!r}")
+    return node
+
+
+def _parse_or(tokens, pos):
+    children = []
+    node, pos = _parse_and(tokens, pos)
+    children.append(node)
+    while pos < len(tokens) and tokens[pos] == "OR":
+        node, pos = _parse_and(tokens, pos + 1)
+        children.append(node)
+    return (children[0] if len(children) == 1 else Or(tuple(children))), pos
+
+
+def _parse_and(tokens, pos):
+    children = []
+    node, pos = _parse_not(tokens, pos)
+    children.append(node)
+    while pos < len(tokens) and tokens[pos] not in ("OR", ")"):
+        if tokens[pos] == "AND":
+            pos += 1
+        node, pos = _parse_not(tokens, pos)
+        children.append(node)
+    return (children[0] if len(children) == 1 else And(tuple(children))), pos
+
+
+def _parse_not(tokens, pos):
+    if pos < len(tokens) and tokens[pos] == "NOT":
+        node, pos = _parse_not(tokens, pos + 1)
+        return Not(node), pos
+    return _parse_atom(tokens, pos)
+
+
+def _parse_atom(tokens, pos):
+    if pos >= len(tokens):
+        raise QuerySyntaxError("Query ends unexpectedly")
+    token = tokens[pos]
+    if token == "(":
+        node, pos = _parse_or(tokens, pos + 1)
+        if pos >= len(tokens) or tokens[pos] != ")":
+            raise QuerySyntaxError("Missing ')'")
+        return node, pos + 1
+    if token in ("AND", "OR", ")"):
+        raise QuerySyntaxError(f"Unexpected {token!r}")
+    field, sep, value = token.partition(":")
+    if not sep or field not in FIELDS or not value:
+        field, value = "tag", token
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    return Term(field, value), pos + 1
+
+
+def evaluate(node: Node, store) -> Set[int]:
+    """Lesson rowids matching `node`, using the store's posting lists"""
+    if isinstance(node, Term):
+        return store.posting(node)
+    if isinstance(node, Or):
+        result = set()
+        for child in node.children:
+            result |= evaluate(child, store)
+        return result
+    if isinstance(node, Not):
+        return store.universe() - evaluate(node.child, store)
+    return _evaluate_and(node, store)
+
+
+def _evaluate_and(node: And, store) -> Set[int]:
+    positive = [c for c in node.children if not isinstance(c, Not)]
+    negative = [c.child for c in node.children if isinstance(c, Not)]
+    if not positive:
+        return store.universe() - _union(negative, store)
+
+    # Seed with the cheapest positive term; compound children are evaluated fully.
+    terms = sorted((c for c in positive if isinstance(c, Term)), key=store.posting_size)
+    others = [c for c in positive if not isinstance(c, Term)]
+    if terms:
+        result = store.posting(terms[0])
+        terms = terms[1:]
+    else:
+        result = evaluate(others.pop(0), store)
+
+    for term in terms:
+        if not result:
+            return result
+        result = store.restrict(term, result)
+    for child in others:
+        if not result:
+            return result
+        result &= evaluate(child, store)
+    for child in negative:
+        if not result:
+            return result
+        if isinstance(child, Term):
+            result -= store.restrict(child, result)
+        else:
+            result -= evaluate(child, store)
+    return result
+
+
+def _union(nodes, store) -> Set[int]:
+    result = set()
+    for node in nodes:
+        result |= evaluate(node, store)
+    return result
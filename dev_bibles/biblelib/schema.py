@@ -0,0 +1,126 @@
+"""
+Card Schema
+The one definition of the lesson / knowledge card types, shared by
+validate.py, tooling/validators/validate_kb.py and validate_cards.py.
+
+SCHEMA is declarative: per type, the fields it requires and the fields that
+must be lists of strings when present. At import it is compiled into one
+checker function per type, generated with every field check unrolled and
+its required fields held as a frozenset, so a complete card costs one
+subset test and missing fields are a single set difference. `check`
+dispatches on the card's type through a dict.
+
+Checkers return Issue tuples rather than messages, so each validator keeps
+its own wording.
+
+Usage:
+    from biblelib.schema import check, MISSING
+    for issue in check(card):
+        print(issue.code, issue.field)
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+# Fields every card needs, whatever its type
+COMMON_REQUIRED = ("type", "id")
+
+SCHEMA: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "PRINCIPLE": {"required": ("text", "tags")},
+    "PATTERN": {"required": ("name", "when", "steps", "tags"), "lists": ("steps",)},
+    "MISTAKE": {"required": ("symptom", "root_cause", "fix_steps", "tags"), "lists": ("fix_steps",)},
+    "RUNBOOK": {"required": ("title", "steps", "tags"), "lists": ("steps",)},
+    "DECISION": {"required": ("question", "decision", "reason", "tags")},
+    "TOOL": {"required": ("name", "tags")},
+    "META": {"required": ()},
+}
+
+# Checked on every type when present
+COMMON_LISTS = ("tags", "repo")
+STRING_FIELDS = ("id",)
+
+CARD_TYPES = tuple(SCHEMA)
+
+# Issue codes
+NOT_OBJECT = "not_object"              # field: the JSON type that was found instead
+MISSING = "missing"                    # field: the missing field
+UNKNOWN_TYPE = "unknown_type"          # field: the type value
+NOT_STRING = "not_string"              # field must be a string
+NOT_LIST = "not_list"                  # field must be a list
+NOT_STRING_ITEMS = "not_string_items"  # field is a list with non-string items
+
+
+class Issue(NamedTuple):
+    code: str
+    field: str
+
+
+Checker = Callable[[Dict], List[Issue]]
+
+
+def _source(card_type: str, spec: Dict[str, Tuple[str, ...]]) -> str:
+    """Python source of the checker for one type, with every field check unrolled"""
+    lists = COMMON_LISTS[:1] + spec.get("lists", ()) + COMMON_LISTS[1:]  # report order: tags, steps, repo
+    lines = [
+        f"def check_{card_type.lower()}(card):",
+        "    issues = []",
+        "    if not REQUIRED <= card.keys():",
+        "        missing = REQUIRED - card.keys()",
+        "        issues = [Issue(MISSING, f) for f in ORDER if f in missing]",
+    ]
+    # A field that is present is type-checked whatever its value: `"tags": null` is not a list.
+    for field in STRING_FIELDS:
+        lines += [
+            f"    if {field!r} in card and type(card[{field!r}]) is not str:",
+            f"        issues.append(Issue(NOT_STRING, {field!r}))",
+        ]
+    for field in lists:
+        lines += [
+            f"    if {field!r} in card:",
+            f"        value = card[{field!r}]",
+            "        if type(value) is not list:",
+            f"            issues.append(Issue(NOT_LIST, {field!r}))",
+            "        else:",
+            "            try:",
+            "                join(value)  # C-speed item check: TypeError on the first non-string",
+            "            except TypeError:",
+            f"                issues.append(Issue(NOT_STRING_ITEMS, {field!r}))",
+        ]
+    lines.append("    return issues")
+    return "\n".join(lines) + "\n"
+
+
+def _compile(card_type: str, spec: Dict[str, Tuple[str, ...]]) -> Checker:
+    """Build the checker for one type; everything derivable from SCHEMA is fixed here"""
+    required = COMMON_REQUIRED + spec.get("required", ())
+    namespace = {
+        "Issue": Issue, "MISSING": MISSING, "NOT_STRING": NOT_STRING, "NOT_LIST": NOT_LIST,
+        "NOT_STRING_ITEMS": NOT_STRING_ITEMS, "join": "".join, "REQUIRED": frozenset(required), "ORDER": required,
+    }
+    exec(compile(_source(card_type, spec), f"<schema:{card_type}>", "exec"), namespace)
+    return namespace[f"check_{card_type.lower()}"]
+
+
+CHECKERS: Dict[str, Checker] = {card_type: _compile(card_type, spec) for card_type, spec in SCHEMA.items()}
+
+
+def check(card) -> List[Issue]:
+    """Every schema issue of one parsed card, in a stable order (empty list = valid)"""
+    try:
+        checker = CHECKERS[card["type"]]
+    except (KeyError, TypeError):  # not an object, no type, or not a known type
+        return _check_untyped(card)
+    return checker(card)
+
+
+def _check_untyped(card) -> List[Issue]:
+    if type(card) is not dict:
+        return [Issue(NOT_OBJECT, type(card).__name__)]
+    issues = [Issue(MISSING, f) for f in COMMON_REQUIRED if f not in card]
+    if "type" in card:
+        issues.append(Issue(UNKNOWN_TYPE, str(card["type"])))
+    return issues
+
+
+def required_fields(card_type: str) -> Tuple[str, ...]:
+    """Required fields of a type, in declaration order"""
+    return COMMON_REQUIRED + SCHEMA[card_type].get("required", ())
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Bible Search Engine
+In-process query engine behind bible-search. Queries match tags exactly and
+are answered from the sidecar index (biblelib.store) by biblelib.query; only
+the matching lessons are read back, and all results are printed in a single
+write.
+
+Usage:
+    python3 -m biblelib.search auth                  # all bibles
+    python3 -m biblelib.search "auth AND security NOT frontend"
+    python3 -m biblelib.search "(jwt OR oauth) type:MISTAKE"
+    python3 -m biblelib.search wallet pushfundz      # one project
+    python3 -m biblelib.search --text "cors preflight"   # ranked full text
+    python3 -m biblelib.search --type MISTAKE auth   # only mistakes
+    python3 -m biblelib.search --master auth         # master bible only
+    python3 -m biblelib.search --personal            # personal flaws & patterns
+    python3 -m biblelib.search --stats               # lessons per bible
+
+--personal and --stats read the library's columnar snapshot
+(biblelib.snapshot) instead of parsing the bibles; it is imported only for
+them, so a search does not pay for loading it.
+
+When the query daemon (biblelib.daemon) is running for the library, the
+command line is first handed to it (biblelib.client): it answers from an
+index it keeps open and prints exactly what this would. If it is not
+running, does not answer or serves another library, the search runs here
+as usual. `--no-daemon` or BIBLE_NO_DAEMON=1 skips it.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .library import LIBRARY_DIR, MASTER, Source, discover_sources
+from .query import And, QuerySyntaxError, Term, evaluate, parse
+
+if TYPE_CHECKING:
+    from .snapshot import Snapshot
+    from .store import BibleStore
+
+RED = '\033[0;31m'
+GREEN = '\033[0;32m'
+YELLOW = '\033[1;33m'
+BLUE = '\033[0;34m'
+CYAN = '\033[0;36m'
+NC = '\033[0m'
+
+SUMMARY_FIELDS = ("symptom", "name", "text", "title")
+
+
+class SearchError(Exception):
+    """A search that cannot be answered; the message is shown in red and the exit status is 1"""
+
+
+def jq_text(value) -> str:
+    """Render a value the way `jq -r` string interpolation does"""
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def summary(lesson: Dict) -> str:
+    """`TYPE: [id] <symptom // name // text // title>`"""
+    text = next((lesson[f] for f in SUMMARY_FIELDS if lesson.get(f) not in (None, False)), None)
+    return f"{jq_text(lesson.get('type'))}: [{jq_text(lesson.get('id'))}] {jq_text(text)}"
+
+
+def matching(store: "BibleStore", query: str, *filters: Term) -> List[Tuple[Source, List[Dict]]]:
+    """Lessons matching `query` AND every filter term, grouped per bible in library order"""
+    node = parse(query)
+    if filters:
+        node = And((node,) + filters)
+    hits: Dict[str, List[Dict]] = {}
+    for ref in store.refs(evaluate(node, store)):
+        hits.setdefault(ref.source, []).append(store.load(ref))
+    return [(source, hits.get(source.name, [])) for source in store.sources]
+
+
+def label(source: Source) -> str:
+    return "Master Bible" if source.name == MASTER else source.name
+
+
+def render_all(store: "BibleStore", query: str, lesson_type: Optional[str]) -> List[str]:
+    out = [f"{CYAN}=== Searching all Bibles for: '{query}' ==={NC}", ""]
+    filters = (Term("type", lesson_type),) if lesson_type else ()
+    for source, hits in matching(store, query, *filters):
+        if hits:
+            out.append(f"{YELLOW}{label(source)}:{NC}")
+            out.extend(summary(lesson) for lesson in hits)
+            out.append("")
+    return out
+
+
+def render_one(store: "BibleStore", source: Source, query: str, title: str) -> List[str]:
+    out = [f"{CYAN}=== Searching {title} for: '{query}' ==={NC}", ""]
+    for _, hits in matching(store, query, Term("project", source.name)):
+        out.extend(summary(lesson) for lesson in hits)
+    return out
+
+
+def render_text(store: "BibleStore", text: str, limit: int, sources: Optional[List[str]] = None) -> List[str]:
+    out = [f"{CYAN}=== Full-text search for: '{text}' ==={NC}", ""]
+    for ref, score in store.search_text(text, limit, sources):
+        source = Source(ref.source, pathlib.Path(ref.path))
+        out.append(f"{GREEN}{score:5.2f}{NC} {YELLOW}{label(source)}:{NC} {summary(store.load(ref))}")
+    return out
+
+
+def render_personal(snapshot: "Snapshot") -> List[str]:
+    """Master lessons by type; only the bodies of the lessons shown are parsed"""
+    master = snapshot.records(MASTER)
+    out = [f"{CYAN}=== Your Personal Flaws & Patterns ==={NC}", ""]
+    sections = [
+        (f"{RED}Mistakes you repeat:{NC}", "MISTAKE", "symptom"),
+        (f"{GREEN}Patterns you use:{NC}", "PATTERN", "name"),
+        (f"{BLUE}Principles you follow:{NC}", "PRINCIPLE", "text"),
+    ]
+    for i, (heading, lesson_type, field) in enumerate(sections):
+        if i:
+            out.append("")
+        out.append(heading)
+        for i in master:
+            if snapshot.type(i) == lesson_type:
+                lesson = snapshot.load(i)
+                out.append(f"  [{jq_text(lesson.get('id'))}] {jq_text(lesson.get(field))}")
+    return out
+
+
+def render_stats(snapshot: "Snapshot") -> List[str]:
+    """Lessons per bible, counted from the snapshot without parsing any of them"""
+    out = [f"{CYAN}=== Bible Library Stats ==={NC}", ""]
+    if MASTER in (s.name for s in snapshot.sources):
+        out.append(f"{YELLOW}Master Bible (Personal):{NC} {len(snapshot.records(MASTER))} lessons")
+    out += ["", f"{YELLOW}Project Bibles:{NC}"]
+    total = 0
+    for source in snapshot.sources:
+        if source.name != MASTER:
+            count = len(snapshot.records(source.name))
+            total += count
+            out.append(f"  {source.name}: {count} lessons")
+    out += ["", f"{GREEN}Total lessons across all projects: {total}{NC}"]
+    return out
+
+
+def answer(args: argparse.Namespace, sources: List[Source], store: Optional["BibleStore"]) -> List[str]:
+    """The lines a search prints; `store` is an open, refreshed index (unused by --personal / --stats)"""
+    by_name = {s.name: s for s in sources}
+    if args.personal or args.stats:
+        if args.personal and MASTER not in by_name:
+            raise SearchError("No master Bible found")
+        from .snapshot import load as load_snapshot  # only these two need it: keep it off the search path
+        with load_snapshot(args.library, sources) as snapshot:
+            return render_personal(snapshot) if args.personal else render_stats(snapshot)
+    try:
+        if args.text:
+            scope = [MASTER] if args.master else [args.project] if args.project else None
+            if scope and scope[0] not in by_name:
+                raise SearchError(f"Error: Project '{scope[0]}' not found")
+            return render_text(store, args.query, args.limit, scope)
+        if args.master:
+            if MASTER not in by_name:
+                raise SearchError("Error: Master Bible not found")
+            return render_one(store, by_name[MASTER], args.query, "Master Bible")
+        if args.project:
+            if args.project not in by_name:
+                raise SearchError(f"Error: Project '{args.project}' not found")
+            return render_one(store, by_name[args.project], args.query, args.project)
+        return render_all(store, args.query, args.lesson_type)
+    except QuerySyntaxError as e:
+        raise SearchError(f"Error: bad query '{args.query}': {e}") from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Search across all your project Bibles")
+    parser.add_argument("query", nargs="?", help="Tag or query, e.g. 'auth AND security NOT frontend'")
+    parser.add_argument("project", nargs="?", help="Only search this project")
+    parser.add_argument("--type", dest="lesson_type", help="Only lessons of this type (MISTAKE, PATTERN, ...)")
+    parser.add_argument("--master", action="store_true", help="Search only the master Bible")
+    parser.add_argument("--personal", action="store_true", help="Show your personal flaws & patterns")
+    parser.add_argument("--stats", action="store_true", help="Show lesson counts for all Bibles")
+    parser.add_argument("--text", action="store_true", help="Rank lessons by their text instead of matching tags")
+    parser.add_argument("--limit", type=int, default=10, help="Results shown by --text (default: 10)")
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    parser.add_argument("--no-daemon", action="store_true", help="Search here even if the query daemon is running")
+    return parser
+
+
+def parse_args(argv: Optional[List[str]] = None, prog: Optional[str] = None) -> argparse.Namespace:
+    """Parse a search command line (exits on errors and --help, as argparse does)"""
+    parser = build_parser()
+    if prog:
+        parser.prog = prog
+    args = parser.parse_args(argv)
+    if not (args.personal or args.stats or args.query):
+        parser.error("a query is required")
+    return args
+
+
+def main(daemon: bool = True):
+    """Run the search on the command line; `daemon=False` when biblelib.client already tried it"""
+    if daemon:
+        from .client import forward
+        status = forward(sys.argv[1:], os.path.basename(sys.argv[0]))
+        if status is not None:
+            sys.exit(status)
+    args = parse_args()
+
+    sources = discover_sources(args.library)
+    try:
+        if args.personal or args.stats:
+            out = answer(args, sources, None)
+        else:
+            from .store import BibleStore  # sqlite and the index: not needed when the daemon answered
+            with BibleStore(args.library, sources) as store:
+                store.refresh()
+                out = answer(args, sources, store)
+    except SearchError as e:
+        print(f"{RED}{e}{NC}")
+        sys.exit(1)
+
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except BrokenPipeError:  # e.g. piped into `head`
+        sys.exit(0)
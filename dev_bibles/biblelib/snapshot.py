@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Bible Snapshot
+Columnar binary snapshot of a library's bibles, for tools that only need
+ids, types and tags.
+
+`<library>/.bible-snapshot` holds every record of every bible as columns:
+    type      -> u16 index into an interned type dictionary
+    tags      -> u32 ranges into one array of interned tag numbers,
+                 plus each tag's posting list
+    id        -> u32 offsets into an id heap, and the records sorted by id
+    body      -> u64 offsets into a heap of the exact JSONL lines
+Loading is an mmap and a header read; columns are memoryviews cast straight
+out of the mapping, so nothing is parsed until a body is asked for.
+
+The snapshot remembers the size and mtime of every bible it was built
+from and is rebuilt by `load` as soon as one of them changes. Blank lines
+and a missing final newline are recorded too, so `import` writes back
+byte-identical JSONL.
+
+Usage:
+    python3 -m biblelib.snapshot                      # rebuild if stale, show counts
+    python3 -m biblelib.snapshot export               # force a rebuild
+    python3 -m biblelib.snapshot import --into /tmp/restored
+    python3 -m biblelib.snapshot stats
+"""
+
+import argparse
+import json
+import mmap
+import os
+import pathlib
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+from .library import LIBRARY_DIR, Source, discover_sources
+
+SNAPSHOT_NAME = ".bible-snapshot"
+MAGIC = b"BIBLSNAP"
+VERSION = 1
+HEADER = struct.Struct("<8sII")  # magic, version, length of the JSON metadata that follows
+ALIGN = 8
+NO_TYPE = 0xFFFF
+
+# Column name -> array typecode; also the order columns are written in
+COLUMNS = (
+    ("line", "I"),            # line number of each record
+    ("type", "H"),            # index into meta["types"], NO_TYPE if none
+    ("id_offs", "I"),         # n + 1 offsets into id_heap ("" = no id)
+    ("id_heap", "B"),
+    ("id_order", "I"),        # records sorted by id, for lookups
+    ("tag_start", "I"),       # n + 1 offsets into tag_ids
+    ("tag_ids", "I"),         # interned tag numbers, per record
+    ("tag_offs", "I"),        # T + 1 offsets into tag_heap; the dictionary is sorted
+    ("tag_heap", "B"),
+    ("post_start", "I"),      # T + 1 offsets into post
+    ("post", "I"),            # records per tag, in record order
+    ("body_offs", "Q"),       # n + 1 offsets into body_heap
+    ("body_heap", "B"),       # each record's line exactly as in its file, without the newline
+)
+
+
+class SnapshotError(Exception):
+    """The file is not a snapshot this version can read"""
+
+
+class Snapshot:
+    """A loaded snapshot; record numbers run across all bibles, master first"""
+
+    def __init__(self, data, path: Optional[pathlib.Path] = None):
+        self.path = path
+        self._data = data
+        self._buffer = memoryview(data)
+        magic, version, meta_len = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"not a version {VERSION} bible snapshot")
+        self.meta = json.loads(str(self._buffer[HEADER.size:HEADER.size + meta_len], "utf-8"))
+        if self.meta["byteorder"] != sys.byteorder:
+            raise SnapshotError("snapshot was written on a machine with another byte order")
+        self.sources = [Source(s["name"], pathlib.Path(s["path"])) for s in self.meta["sources"]]
+        self.types: List[str] = self.meta["types"]
+        self._firsts = [s["first"] for s in self.meta["sources"]]
+        for name, typecode in COLUMNS:
+            offset, length = self.meta["columns"][name]
+            setattr(self, f"_{name}", self._buffer[offset:offset + length].cast(typecode))
+        self._tag_cache: Dict[int, str] = {}
+        self._tag_dict: Optional[List[str]] = None
+
+    @classmethod
+    def open(cls, path: pathlib.Path) -> "Snapshot":
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data, pathlib.Path(path))
+
+    def close(self):
+        for name, _ in COLUMNS:
+            getattr(self, f"_{name}").release()
+        self._buffer.release()
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:  # a caller still holds a body slice; unmapped when it is dropped
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        return len(self._line)
+
+    # --- freshness --------------------------------------------------------
+
+    def is_current(self, sources: List[Source]) -> bool:
+        """True if built from exactly these bibles, none touched since"""
+        return self.meta["stamps"] == _stamps(sources)
+
+    # --- records ------------------------------------------------------------
+
+    def records(self, source: Optional[str] = None) -> range:
+        """Record numbers of one bible (or all of them), in file order"""
+        if source is None:
+            return range(len(self))
+        for s in self.meta["sources"]:
+            if s["name"] == source:
+                return range(s["first"], s["first"] + s["count"])
+        raise KeyError(source)
+
+    def source(self, i: int) -> Source:
+        return self.sources[bisect_right(self._firsts, i) - 1]
+
+    def line(self, i: int) -> int:
+        return self._line[i]
+
+    def id(self, i: int) -> Optional[str]:
+        start, end = self._id_offs[i], self._id_offs[i + 1]
+        return str(self._id_heap[start:end], "utf-8") if end > start else None
+
+    def type(self, i: int) -> Optional[str]:
+        t = self._type[i]
+        return None if t == NO_TYPE else self.types[t]
+
+    def tags(self, i: int) -> List[str]:
+        return [self._tag(t) for t in self._tag_ids[self._tag_start[i]:self._tag_start[i + 1]]]
+
+    def body(self, i: int) -> memoryview:
+        """The record's line exactly as it is in its bible (a slice of the mapping)"""
+        return self._body_heap[self._body_offs[i]:self._body_offs[i + 1]]
+
+    def load(self, i: int):
+        """Parse one record; the only place a body is decoded"""
+        return json.loads(str(self.body(i), "utf-8"))
+
+    # --- lookups --------------------------------------------------------------
+
+    def find(self, lesson_id: str) -> List[int]:
+        """Every record with this id, in record order (binary search over the id table)"""
+        key = lesson_id.encode("utf-8")
+        order = self._id_order
+        lo, hi = 0, len(order)
+        while lo < hi:  # first record whose id is >= key
+            mid = (lo + hi) // 2
+            if self._id_bytes(order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < len(order) and self._id_bytes(order[lo]) == key:
+            found.append(order[lo])
+            lo += 1
+        return found  # id_order is a stable sort, so equal ids are in record order
+
+    def with_tag(self, tag: str) -> memoryview:
+        """Records carrying exactly `tag`, in record order"""
+        tags = self.tag_dictionary()
+        t = bisect_left(tags, tag)
+        if t == len(tags) or tags[t] != tag:
+            return self._post[0:0]
+        return self._post[self._post_start[t]:self._post_start[t + 1]]
+
+    def type_counts(self, source: Optional[str] = None) -> Dict[str, int]:
+        """Records per type (records without one under None), counted on the type column alone"""
+        span = self.records(source)
+        counts = Counter(self._type[span.start:span.stop])
+        return {(None if t == NO_TYPE else self.types[t]): n for t, n in counts.items()}
+
+    def tag_dictionary(self) -> List[str]:
+        """Every tag, sorted; decoded once on first use"""
+        if self._tag_dict is None:
+            self._tag_dict = [self._tag(t) for t in range(len(self._tag_offs) - 1)]
+        return self._tag_dict
+
+    def _tag(self, t: int) -> str:
+        tag = self._tag_cache.get(t)
+        if tag is None:
+            tag = self._tag_cache[t] = str(self._tag_heap[self._tag_offs[t]:self._tag_offs[t + 1]], "utf-8")
+        return tag
+
+    def _id_bytes(self, i: int) -> bytes:
+        return self._id_heap[self._id_offs[i]:self._id_offs[i + 1]].tobytes()
+
+    # --- round trip -------------------------------------------------------------
+
+    def iter_jsonl(self, source: str) -> Iterator[bytes]:
+        """One bible's file, chunk by chunk, byte for byte as it was when snapshotted"""
+        meta = next(s for s in self.meta["sources"] if s["name"] == source)
+        blanks = {line: text.encode("ascii") for line, text in meta["blank"]}
+        span = self.records(source)
+        i = span.start
+        for line in range(1, meta["lines"] + 1):
+            if i < span.stop and self._line[i] == line:
+                yield self.body(i).tobytes()
+                i += 1
+            else:
+                yield blanks.get(line, b"")
+            if line < meta["lines"] or meta["newline_end"]:
+                yield b"\n"
+
+
+def _stamps(sources: List[Source]) -> List[list]:
+    """What a snapshot must have been built from to still be current"""
+    stamps = []
+    for source in sources:
+        try:
+            st = source.path.stat()
+        except OSError:
+            stamps.append([source.name, str(source.path), -1, -1])
+            continue
+        stamps.append([source.name, str(source.path), st.st_size, st.st_mtime_ns])
+    return stamps
+
+
+def build(sources: List[Source]) -> bytes:
+    """Compile bibles into snapshot bytes"""
+    stamps = _stamps(sources)  # before reading, so a write during the build leaves it stale
+    columns = {name: array(typecode) for name, typecode in COLUMNS}
+    id_heap = bytearray()
+    body_heap = bytearray()
+    columns["id_offs"].append(0)
+    columns["tag_start"].append(0)
+    columns["body_offs"].append(0)
+    types: Dict[str, int] = {}
+    record_tags: List[List[str]] = []
+    source_meta = []
+
+    for source in sources:
+        try:
+            data = source.path.read_bytes()
+        except OSError:
+            data = b""
+        lines = data.split(b"\n")
+        newline_end = not data or data.endswith(b"\n")
+        if newline_end:
+            lines.pop()  # the empty piece after the final newline
+        first = len(columns["line"])
+        blank = []
+        for line_no, raw in enumerate(lines, 1):
+            text = raw.strip()
+            if not text:
+                if raw:
+                    blank.append([line_no, raw.decode("ascii")])
+                continue
+            try:
+                lesson = json.loads(text)
+            except ValueError:  # kept as-is: it still has to round-trip
+                lesson = None
+            if not isinstance(lesson, dict):
+                lesson = {}
+            lesson_id = lesson.get("id") if isinstance(lesson.get("id"), str) else ""
+            lesson_type = lesson.get("type") if isinstance(lesson.get("type"), str) else None
+            tags = lesson.get("tags")
+            record_tags.append(sorted({t for t in tags if isinstance(t, str)}) if isinstance(tags, list) else [])
+
+            columns["line"].append(line_no)
+            columns["type"].append(NO_TYPE if lesson_type is None else types.setdefault(lesson_type, len(types)))
+            id_heap += lesson_id.encode("utf-8")
+            columns["id_offs"].append(len(id_heap))
+            body_heap += raw
+            columns["body_offs"].append(len(body_heap))
+        source_meta.append({
+            "name": source.name, "path": str(source.path), "first": first,
+            "count": len(columns["line"]) - first, "lines": len(lines),
+            "newline_end": newline_end, "blank": blank,
+        })
+    if len(types) >= NO_TYPE:
+        raise ValueError(f"more than {NO_TYPE - 1} lesson types")
+
+    # Interned tags: numbered in sorted order so lookups can bisect the dictionary
+    tag_list = sorted({t for tags in record_tags for t in tags})
+    tag_number = {t: n for n, t in enumerate(tag_list)}
+    tag_heap = bytearray()
+    columns["tag_offs"].append(0)
+    for tag in tag_list:
+        tag_heap += tag.encode("utf-8")
+        columns["tag_offs"].append(len(tag_heap))
+    postings: List[List[int]] = [[] for _ in tag_list]
+    for i, tags in enumerate(record_tags):
+        for tag in tags:
+            columns["tag_ids"].append(tag_number[tag])
+            postings[tag_number[tag]].append(i)
+        columns["tag_start"].append(len(columns["tag_ids"]))
+    columns["post_start"].append(0)
+    for posting in postings:
+        columns["post"].extend(posting)
+        columns["post_start"].append(len(columns["post"]))
+
+    ids = [bytes(id_heap[columns["id_offs"][i]:columns["id_offs"][i + 1]]) for i in range(len(columns["line"]))]
+    columns["id_order"] = array("I", sorted(range(len(ids)), key=ids.__getitem__))
+    columns["id_heap"] = array("B", id_heap)
+    columns["tag_heap"] = array("B", tag_heap)
+    columns["body_heap"] = array("B", body_heap)
+
+    blobs = [(name, columns[name].tobytes()) for name, _ in COLUMNS]
+    meta = {"byteorder": sys.byteorder, "stamps": stamps, "sources": source_meta,
+            "types": sorted(types, key=types.get), "columns": {}}
+    # Column offsets depend on the metadata's length, which depends on the
+    # offsets: lay out with a generous width, then pad the metadata to it.
+    meta_len = 0
+    while True:
+        offset = _aligned(HEADER.size + meta_len)
+        for name, blob in blobs:
+            meta["columns"][name] = [offset, len(blob)]
+            offset = _aligned(offset + len(blob))
+        encoded = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        if len(encoded) <= meta_len:
+            break
+        meta_len = len(encoded) + 64
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, meta_len))
+    out += encoded.ljust(meta_len)
+    for name, blob in blobs:
+        out += bytes(meta["columns"][name][0] - len(out))
+        out += blob
+    return bytes(out)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def write(sources: List[Source], path: pathlib.Path) -> int:
+    """Build a snapshot and move it into place atomically; returns its size"""
+    data = build(sources)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return len(data)
+
+
+def load(library_dir: pathlib.Path = LIBRARY_DIR, sources: List[Source] = None) -> Snapshot:
+    """The library's snapshot, rebuilt first if any bible changed size or mtime.
+
+    A library that cannot be written to gets an in-memory snapshot instead.
+    """
+    library_dir = pathlib.Path(library_dir)
+    sources = discover_sources(library_dir) if sources is None else sources
+    path = library_dir / SNAPSHOT_NAME
+    try:
+        snapshot = Snapshot.open(path)
+        if snapshot.is_current(sources):
+            return snapshot
+        snapshot.close()
+    except (OSError, ValueError, SnapshotError, struct.error):
+        pass  # missing, empty, truncated or from another version
+    try:
+        write(sources, path)
+    except OSError:
+        return Snapshot(build(sources))
+    return Snapshot.open(path)
+
+
+def import_to(snapshot: Snapshot, target: pathlib.Path) -> List[pathlib.Path]:
+    """Write every bible of a snapshot back out as `<target>/<name>/bible.jsonl`"""
+    written = []
+    for source in snapshot.sources:
+        out = target / re.sub(r"[^\w.-]", "_", source.name) / "bible.jsonl"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        with open(out, "wb") as f:
+            f.writelines(snapshot.iter_jsonl(source.name))
+        written.append(out)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, restore and summarize bible snapshots")
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    sub = parser.add_subparsers(dest="command")
+    export = sub.add_parser("export", help="Compile the library's bibles into a snapshot")
+    export.add_argument("--output", type=pathlib.Path, help=f"Snapshot file (default: <library>/{SNAPSHOT_NAME})")
+    restore = sub.add_parser("import", help="Write a snapshot's bibles back out as JSONL")
+    restore.add_argument("--into", type=pathlib.Path, required=True, help="Directory to write <name>/bible.jsonl into")
+    restore.add_argument("--snapshot", type=pathlib.Path, help=f"Snapshot file (default: <library>/{SNAPSHOT_NAME})")
+    sub.add_parser("stats", help="Lessons per bible and type, from the snapshot")
+    args = parser.parse_args()
+
+    default_path = args.library / SNAPSHOT_NAME
+    if args.command == "export":
+        output = args.output or default_path
+        size = write(discover_sources(args.library), output)
+        print(f"📦 Snapshot: {output} ({size} bytes)")
+        return
+    if args.command == "import":
+        snapshot = Snapshot.open(args.snapshot or default_path)
+        for path in import_to(snapshot, args.into):
+            print(f"   {path}")
+        return
+
+    with load(args.library) as snapshot:
+        if args.command == "stats":
+            for source in snapshot.sources:
+                by_type = snapshot.type_counts(source.name)
+                detail = ", ".join(f"{t or 'UNKNOWN'}: {n}" for t, n in sorted(by_type.items(), key=lambda x: -x[1]))
+                print(f"{source.name}: {sum(by_type.values())} lessons ({detail})")
+            return
+        print(f"📦 Snapshot: {snapshot.path or '(in memory)'}")
+        for source in snapshot.sources:
+            print(f"   {source.name}: {len(snapshot.records(source.name))} lessons")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except (SnapshotError, FileNotFoundError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Bible Store
+Persistent sidecar index over a library's bible.jsonl files.
+
+The index lives in `<library>/.bible-index.db` (SQLite) and maps
+    lesson id -> (bible, line, byte offset, length)
+    tag       -> posting list of lessons
+    type      -> posting list of lessons
+    words     -> FTS5 full-text index over the lesson bodies (BM25-ranked)
+so point, tag and text lookups read only the records they return.
+
+Bibles are append-only, so a refresh only parses the bytes added since the
+last one. A file that shrank, or whose first bytes or last indexed bytes
+changed, was rewritten and is re-indexed from scratch.
+
+Usage:
+    python3 -m biblelib.store                 # refresh and show counts
+    python3 -m biblelib.store --id p.fail_fast
+    python3 -m biblelib.store --tag auth
+    python3 -m biblelib.store --text "cors preflight"
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import re
+import sqlite3
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from .jsonl import JsonlMap
+from .library import LIBRARY_DIR, Source, discover_sources
+
+INDEX_NAME = ".bible-index.db"
+SCHEMA_VERSION = 2
+EDGE = 4096  # bytes fingerprinted at the start of a file and before its indexed end
+
+# Lesson fields searched by `search_text`, in FTS column order
+TEXT_FIELDS = ("symptom", "root_cause", "fix_steps", "steps", "text", "question", "reason")
+RE_WORD = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE sources (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,       -- bytes indexed (always ends on a newline)
+    lines INTEGER NOT NULL DEFAULT 0,      -- lines indexed
+    file_size INTEGER NOT NULL DEFAULT 0,  -- st_size at the last refresh
+    mtime_ns INTEGER NOT NULL DEFAULT 0,   -- st_mtime_ns at the last refresh
+    head TEXT NOT NULL DEFAULT '',         -- hash of the first EDGE bytes
+    tail TEXT NOT NULL DEFAULT ''          -- hash of the EDGE bytes before `size`
+);
+CREATE TABLE lessons (
+    rowid INTEGER PRIMARY KEY,
+    source INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    id TEXT,
+    type TEXT
+);
+CREATE TABLE tags (
+    tag TEXT NOT NULL,
+    lesson INTEGER NOT NULL
+);
+CREATE INDEX lessons_id ON lessons(id);
+CREATE INDEX lessons_type ON lessons(type, rowid);
+CREATE INDEX lessons_source ON lessons(source, offset);
+CREATE INDEX tags_tag ON tags(tag, lesson);
+CREATE VIRTUAL TABLE lessons_fts USING fts5(
+    symptom, root_cause, fix_steps, steps, text, question, reason,
+    tokenize = 'porter unicode61'  -- stemmed: "caching" matches "cached"
+);
+"""
+
+
+class Ref(NamedTuple):
+    """Where a lesson lives: enough to read it back without scanning its file"""
+    rowid: int
+    source: str
+    path: str
+    line: int
+    offset: int
+    length: int
+    id: Optional[str]
+    type: Optional[str]
+
+
+class BibleStore:
+    """Sidecar index over the bibles of one library"""
+
+    def __init__(self, library_dir: pathlib.Path = LIBRARY_DIR, sources: List[Source] = None,
+                 db_path: pathlib.Path = None):
+        self.library_dir = pathlib.Path(library_dir)
+        self.sources = discover_sources(self.library_dir) if sources is None else sources
+        self.db_path = db_path or self.library_dir / INDEX_NAME
+        self.db = sqlite3.connect(str(self.db_path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._create()
+        self._maps: Dict[str, JsonlMap] = {}
+
+    def _create(self):
+        # Virtual tables first: dropping one also drops its shadow tables.
+        for (name,) in self.db.execute("SELECT name FROM sqlite_master WHERE type='table' "
+                                       "ORDER BY sql NOT LIKE 'CREATE VIRTUAL%'").fetchall():
+            self.db.execute(f"DROP TABLE IF EXISTS {name}")
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.db.commit()
+
+    def close(self):
+        for bible in self._maps.values():
+            bible.close()
+        self._maps.clear()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --- indexing -------------------------------------------------------
+
+    def refresh(self, only: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Bring the index up to date; returns lessons newly indexed per bible.
+
+        With `only`, just those bibles are looked at (bible-sync passes the
+        projects it touched) and nothing else is dropped from the index.
+        """
+        added = {}
+        sources = self.sources
+        with self.db:
+            if only is None:
+                known = {name: sid for sid, name in self.db.execute("SELECT id, name FROM sources")}
+                wanted = {s.name for s in self.sources}
+                for name, sid in known.items():
+                    if name not in wanted:
+                        self._forget(sid)
+            else:
+                only = set(only)
+                sources = [s for s in self.sources if s.name in only]
+            for source in sources:
+                added[source.name] = self._refresh_source(source)
+        return added
+
+    def _forget(self, sid: int, keep_source: bool = False):
+        self.db.execute("DELETE FROM lessons_fts WHERE rowid IN (SELECT rowid FROM lessons WHERE source=?)", (sid,))
+        self.db.execute("DELETE FROM tags WHERE lesson IN (SELECT rowid FROM lessons WHERE source=?)", (sid,))
+        self.db.execute("DELETE FROM lessons WHERE source=?", (sid,))
+        if not keep_source:
+            self.db.execute("DELETE FROM sources WHERE id=?", (sid,))
+
+    def _refresh_source(self, source: Source) -> int:
+        try:
+            st = os.stat(source.path)
+        except FileNotFoundError:
+            return 0
+        row = self.db.execute(
+            "SELECT id, path, size, lines, file_size, mtime_ns, head, tail FROM sources WHERE name=?",
+            (source.name,),
+        ).fetchone()
+        if row is None:
+            cur = self.db.execute("INSERT INTO sources (name, path) VALUES (?, ?)", (source.name, str(source.path)))
+            row = (cur.lastrowid, str(source.path), 0, 0, 0, 0, "", "")
+        sid, path, size, lines, file_size, mtime_ns, head, tail = row
+        if path == str(source.path) and st.st_size == file_size and st.st_mtime_ns == mtime_ns:
+            return 0  # untouched since the last refresh
+
+        self._drop_handle(str(source.path))
+        with open(source.path, "rb") as f:
+            if path != str(source.path) or not _still_prefix(f, st.st_size, size, head, tail):
+                self._forget(sid, keep_source=True)
+                size = lines = 0
+            f.seek(size)
+            data = f.read(st.st_size - size)
+
+        rows, tag_rows, text_rows, consumed, new_lines = _index_lines(data, size, lines)
+        # Rows for lines that were not yet complete last time are provisional.
+        self.db.execute("DELETE FROM lessons_fts WHERE rowid IN (SELECT rowid FROM lessons WHERE source=? AND offset>=?)",
+                        (sid, size))
+        self.db.execute("DELETE FROM tags WHERE lesson IN (SELECT rowid FROM lessons WHERE source=? AND offset>=?)",
+                        (sid, size))
+        self.db.execute("DELETE FROM lessons WHERE source=? AND offset>=?", (sid, size))
+        for (line, offset, length, lesson_id, lesson_type), tags, texts in zip(rows, tag_rows, text_rows):
+            cur = self.db.execute(
+                "INSERT INTO lessons (source, line, offset, length, id, type) VALUES (?, ?, ?, ?, ?, ?)",
+                (sid, line, offset, length, lesson_id, lesson_type),
+            )
+            self.db.executemany("INSERT INTO tags (tag, lesson) VALUES (?, ?)", ((t, cur.lastrowid) for t in tags))
+            if any(texts):
+                self.db.execute(f"INSERT INTO lessons_fts (rowid, {', '.join(TEXT_FIELDS)}) "
+                                f"VALUES (?{', ?' * len(TEXT_FIELDS)})", (cur.lastrowid, *texts))
+
+        size += consumed
+        with open(source.path, "rb") as f:
+            head, tail = _fingerprint(f, size)
+        self.db.execute(
+            "UPDATE sources SET path=?, size=?, lines=?, file_size=?, mtime_ns=?, head=?, tail=? WHERE id=?",
+            (str(source.path), size, lines + new_lines, st.st_size, st.st_mtime_ns, head, tail, sid),
+        )
+        return len(rows)
+
+    # --- queries --------------------------------------------------------
+
+    _REF_SQL = ("SELECT l.rowid, s.name, s.path, l.line, l.offset, l.length, l.id, l.type "
+                "FROM lessons l JOIN sources s ON s.id = l.source")
+
+    def _refs(self, where: str, params: Iterable, sources: Optional[Iterable[str]] = None) -> List[Ref]:
+        sql = f"{self._REF_SQL} WHERE {where}"
+        params = list(params)
+        if sources is not None:
+            sources = list(sources)
+            sql += f" AND s.name IN ({','.join('?' * len(sources))})"
+            params += sources
+        sql += " ORDER BY (s.name != '_master'), s.name, l.offset"
+        return [Ref(*r) for r in self.db.execute(sql, params)]
+
+    def get(self, lesson_id: str, sources: Optional[Iterable[str]] = None) -> List[Ref]:
+        """Every copy of a lesson id (the same id may live in several bibles)"""
+        return self._refs("l.id = ?", [lesson_id], sources)
+
+    def by_tag(self, tag: str, sources: Optional[Iterable[str]] = None) -> List[Ref]:
+        """Lessons carrying exactly `tag`"""
+        return self._refs("l.rowid IN (SELECT lesson FROM tags WHERE tag = ?)", [tag], sources)
+
+    def by_type(self, lesson_type: str, sources: Optional[Iterable[str]] = None) -> List[Ref]:
+        """Lessons of one type (MISTAKE, PATTERN, ...)"""
+        return self._refs("l.type = ?", [lesson_type], sources)
+
+    def all(self, sources: Optional[Iterable[str]] = None) -> List[Ref]:
+        """Every indexed lesson"""
+        return self._refs("1", [], sources)
+
+    # --- posting lists (used by biblelib.query) --------------------------
+
+    # field -> (FROM ... WHERE <match one value>, rowid column); see biblelib.query.Term
+    _TERM_SQL = {
+        "tag": ("tags WHERE tag = ?", "lesson"),
+        "type": ("lessons WHERE type = ?", "rowid"),
+        "project": ("lessons WHERE source = (SELECT id FROM sources WHERE name = ?)", "rowid"),
+    }
+    RESTRICT_BATCH = 500  # rowids per membership query (SQLite caps bound parameters)
+
+    def posting(self, term) -> Set[int]:
+        """Rowids of the lessons matching one `field:value` term"""
+        where, col = self._TERM_SQL[term.field]
+        return {r for (r,) in self.db.execute(f"SELECT {col} FROM {where}", (term.value,))}
+
+    def posting_size(self, term) -> int:
+        """Length of a term's posting list, counted on the index without fetching it"""
+        where, _ = self._TERM_SQL[term.field]
+        return self.db.execute(f"SELECT COUNT(*) FROM {where}", (term.value,)).fetchone()[0]
+
+    def restrict(self, term, candidates: Set[int]) -> Set[int]:
+        """The subset of `candidates` matching `term`: cost follows len(candidates)"""
+        found = set()
+        ids = list(candidates)
+        for i in range(0, len(ids), self.RESTRICT_BATCH):
+            batch = ids[i:i + self.RESTRICT_BATCH]
+            where, col = self._TERM_SQL[term.field]
+            sql = f"SELECT {col} FROM {where} AND {col} IN ({','.join('?' * len(batch))})"
+            found.update(r for (r,) in self.db.execute(sql, [term.value] + batch))
+        return found
+
+    def universe(self) -> Set[int]:
+        """Every lesson rowid (only needed for a bare NOT)"""
+        return {r for (r,) in self.db.execute("SELECT rowid FROM lessons")}
+
+    def refs(self, rowids: Iterable[int]) -> List[Ref]:
+        """Refs for a set of rowids, in library order"""
+        refs = []
+        ids = list(rowids)
+        for i in range(0, len(ids), self.RESTRICT_BATCH):
+            batch = ids[i:i + self.RESTRICT_BATCH]
+            refs.extend(self._refs(f"l.rowid IN ({','.join('?' * len(batch))})", batch))
+        order = {s.name: i for i, s in enumerate(self.sources)}
+        refs.sort(key=lambda r: (order.get(r.source, len(order)), r.offset))
+        return refs
+
+    def search_text(self, text: str, limit: int = 10,
+                    sources: Optional[Iterable[str]] = None) -> List[Tuple[Ref, float]]:
+        """Top `limit` lessons for free text, best first, with their BM25 scores (higher is better).
+
+        Every word is optional, so "that CORS thing from last year" still
+        finds the CORS lesson; rarer words weigh more.
+        """
+        words = RE_WORD.findall(text.lower())
+        if not words:
+            return []
+        match = " OR ".join(f'"{w}"' for w in dict.fromkeys(words))
+        sql = "SELECT f.rowid, -bm25(lessons_fts) FROM lessons_fts f"
+        params: List = [match]
+        if sources is not None:
+            sources = list(sources)
+            sql += (" JOIN lessons l ON l.rowid = f.rowid JOIN sources s ON s.id = l.source"
+                    f" WHERE lessons_fts MATCH ? AND s.name IN ({','.join('?' * len(sources))})")
+            params += sources
+        else:
+            sql += " WHERE lessons_fts MATCH ?"
+        sql += " ORDER BY bm25(lessons_fts) LIMIT ?"
+        params.append(limit)
+        scores = dict(self.db.execute(sql, params).fetchall())
+        refs = self.refs(scores)
+        refs.sort(key=lambda r: -scores[r.rowid])  # stable: ties stay in library order
+        return [(ref, scores[ref.rowid]) for ref in refs]
+
+    def query(self, text: str) -> List[Ref]:
+        """Evaluate a biblelib.query expression, e.g. `auth AND security NOT frontend`"""
+        from .query import evaluate, parse
+        return self.refs(evaluate(parse(text), self))
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """Lesson counts per bible and type, answered from the index alone"""
+        out: Dict[str, Dict[str, int]] = {s.name: {} for s in self.sources}
+        for name, lesson_type, n in self.db.execute(
+                "SELECT s.name, l.type, COUNT(*) FROM lessons l JOIN sources s ON s.id = l.source "
+                "GROUP BY s.name, l.type"):
+            out.setdefault(name, {})[lesson_type or "UNKNOWN"] = n
+        return out
+
+    def read_raw(self, ref: Ref) -> bytes:
+        """The exact JSONL bytes of one lesson (without the newline), copied out of the bible's mapping"""
+        bible = self._maps.get(ref.path)
+        if bible is None:
+            bible = self._maps[ref.path] = JsonlMap(ref.path)
+        return bible.buffer[ref.offset:ref.offset + ref.length].tobytes()
+
+    def load(self, ref: Ref) -> Dict:
+        """Parse one lesson, reading only its own bytes"""
+        return json.loads(self.read_raw(ref))
+
+    def _drop_handle(self, path: str):
+        bible = self._maps.pop(path, None)
+        if bible is not None:
+            bible.close()
+
+
+def _hash(data: bytes) -> str:
+    import hashlib  # only needed once a bible has changed; a search of an up-to-date index skips it
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _fingerprint(f, size: int):
+    """(head, tail) hashes for the first `size` bytes of an open file"""
+    f.seek(0)
+    head = _hash(f.read(min(EDGE, size)))
+    start = max(0, size - EDGE)
+    f.seek(start)
+    tail = _hash(f.read(size - start))
+    return head, tail
+
+
+def _still_prefix(f, file_size: int, size: int, head: str, tail: str) -> bool:
+    """True if the first `size` bytes are unchanged, i.e. the file was only appended to"""
+    if size == 0:
+        return True
+    if file_size < size:
+        return False
+    return _fingerprint(f, size) == (head, tail)
+
+
+def _index_lines(data: bytes, base: int, line_no: int):
+    """Index the JSONL records in `data`, which starts at byte `base` / after line `line_no`.
+
+    Returns (rows, tag lists, text field tuples, bytes of complete lines
+    consumed, complete lines).
+    A trailing line without a newline is indexed if it parses, but is not
+    counted as consumed, so the next refresh re-reads it.
+    """
+    rows, tag_rows, text_rows = [], [], []
+    pos = 0
+    consumed = 0
+    lines = 0
+    while pos < len(data):
+        nl = data.find(b"\n", pos)
+        end = len(data) if nl < 0 else nl
+        raw = data[pos:end].rstrip(b"\r")
+        if nl >= 0:
+            lines += 1
+            consumed = nl + 1
+        lead = len(raw) - len(raw.lstrip())
+        raw = raw.strip()
+        if raw:
+            try:
+                lesson = json.loads(raw)
+            except ValueError:
+                lesson = None
+            if isinstance(lesson, dict):
+                tags = lesson.get("tags")
+                tags = sorted({t for t in tags if isinstance(t, str)}) if isinstance(tags, list) else []
+                lesson_id = lesson.get("id") if isinstance(lesson.get("id"), str) else None
+                lesson_type = lesson.get("type") if isinstance(lesson.get("type"), str) else None
+                rows.append((line_no + lines + (nl < 0), base + pos + lead, len(raw), lesson_id, lesson_type))
+                tag_rows.append(tags)
+                text_rows.append(tuple(_flatten(lesson.get(f)) for f in TEXT_FIELDS))
+        if nl < 0:
+            break
+        pos = nl + 1
+    return rows, tag_rows, text_rows, consumed, lines
+
+
+def _flatten(value) -> str:
+    """Searchable text of a field: strings as-is, lists (fix_steps, steps) one item per line"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "\n".join(filter(None, (_flatten(v) for v in value)))
+    if isinstance(value, dict):
+        return "\n".join(filter(None, (_flatten(v) for v in value.values())))
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain and query the bible sidecar index")
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    parser.add_argument("--id", help="Print every copy of this lesson id")
+    parser.add_argument("--tag", help="Print lessons with this exact tag")
+    parser.add_argument("--text", help="Rank lessons against free text (BM25)")
+    parser.add_argument("--limit", type=int, default=10, help="Results for --text (default: 10)")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the index and rebuild it")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        (args.library / INDEX_NAME).unlink(missing_ok=True)
+    with BibleStore(args.library) as store:
+        added = store.refresh()
+        if args.text:
+            hits = store.search_text(args.text, args.limit)
+            for ref, score in hits:
+                print(f"{score:6.2f}  {ref.source}:{ref.line}\t{ref.id}")
+            sys.exit(0 if hits else 1)
+        if args.id or args.tag:
+            refs = store.get(args.id) if args.id else store.by_tag(args.tag)
+            for ref in refs:
+                print(f"{ref.source}:{ref.line}\t{store.read_raw(ref).decode('utf-8')}")
+            sys.exit(0 if refs else 1)
+        print(f"📇 Index: {store.db_path}")
+        for name, by_type in store.counts().items():
+            total = sum(by_type.values())
+            new = f" (+{added[name]} new)" if added.get(name) else ""
+            print(f"   {name}: {total} lessons{new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Bible Sync Engine
+Incremental import of project bibles into the library, behind
+`bible-sync --import` and `--register`.
+
+`<library>/.bible-sync.json` records, per imported project, the source it
+came from and the size, mtime, line count and content hash (BLAKE2b) of
+what was copied. Bibles are append-only, so a sync:
+    - skips a source whose size and mtime are unchanged, without reading it
+    - hashes the first `size` bytes of a grown source; if they still hash
+      to the manifest's value, only the appended tail is copied
+    - copies the whole file (atomically) when the source shrank, the
+      prefix hash differs (the file was rewritten), or the library copy
+      is missing or no longer the size the manifest says
+Line counts are carried forward from the manifest plus the newlines in the
+copied bytes, so nothing is re-read to count. Afterwards only the touched
+projects are refreshed in the search index.
+
+Usage:
+    python3 -m biblelib.sync                      # every project under ~/repos (biblelib.discovery)
+    python3 -m biblelib.sync pushfundz            # one project
+    python3 -m biblelib.sync --from ~/my-project/dev_bible/bible.jsonl my-project
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .discovery import BIBLE_DIR, REPOS_DIR, scan
+from .library import BIBLE_FILE, LIBRARY_DIR
+from .store import BibleStore
+
+MANIFEST_NAME = ".bible-sync.json"
+COPY_BLOCK = 1 << 20
+
+# What a sync did to one project
+COPIED = "copied"          # first import
+APPENDED = "appended"      # only the new tail was copied
+REWRITTEN = "rewritten"    # the source was not an extension of the last copy
+UNCHANGED = "unchanged"
+
+GREEN = '\033[0;32m'
+RED = '\033[0;31m'
+NC = '\033[0m'
+
+
+class SyncResult(NamedTuple):
+    project: str
+    action: str
+    lines: int        # lines in the library copy
+    new_lines: int    # lines added by this sync
+
+
+def load_manifest(library_dir: pathlib.Path) -> Dict[str, Dict]:
+    try:
+        with open(library_dir / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            return json.load(f).get("projects", {})
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return {}
+
+
+def save_manifest(library_dir: pathlib.Path, projects: Dict[str, Dict]):
+    """Write the manifest atomically, so an interrupted sync leaves the old one"""
+    path = library_dir / MANIFEST_NAME
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "projects": projects}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _copy(src, dst, hasher, limit: Optional[int] = None) -> Tuple[int, int]:
+    """Copy up to `limit` bytes (to EOF by default), hashing them; returns (bytes, newlines)"""
+    copied = newlines = 0
+    while limit is None or copied < limit:
+        block = src.read(COPY_BLOCK if limit is None else min(COPY_BLOCK, limit - copied))
+        if not block:
+            break
+        hasher.update(block)
+        newlines += block.count(b"\n")
+        if dst is not None:
+            dst.write(block)
+        copied += len(block)
+    return copied, newlines
+
+
+def _entry(source: pathlib.Path, st: os.stat_result, size: int, lines: int, hasher) -> Dict:
+    return {"source": str(source), "size": size, "mtime_ns": st.st_mtime_ns,
+            "lines": lines, "hash": hasher.hexdigest()}
+
+
+def sync_bible(source: pathlib.Path, target: pathlib.Path, entry: Optional[Dict]) -> Tuple[Dict, str, int]:
+    """Bring `target` up to date with `source`; returns (manifest entry, action, new lines)"""
+    st = os.stat(source)
+    try:
+        target_ok = entry is not None and target.stat().st_size == entry["size"]
+    except FileNotFoundError:
+        target_ok = False
+
+    if target_ok and st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+        return entry, UNCHANGED, 0
+
+    with open(source, "rb") as src:
+        if target_ok and st.st_size >= entry["size"]:
+            hasher = hashlib.blake2b()
+            prefix, _ = _copy(src, None, hasher, entry["size"])
+            if prefix == entry["size"] and hasher.hexdigest() == entry["hash"]:
+                with open(target, "ab") as dst:
+                    tail, newlines = _copy(src, dst, hasher)
+                updated = _entry(source, st, prefix + tail, entry["lines"] + newlines, hasher)
+                return updated, APPENDED if tail else UNCHANGED, newlines
+            src.seek(0)
+
+        # First import, or the source was rewritten: replace the copy whole
+        target.parent.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.blake2b()
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "wb") as dst:
+                size, newlines = _copy(src, dst, hasher)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+    return _entry(source, st, size, newlines, hasher), COPIED if entry is None else REWRITTEN, newlines
+
+
+def sync(library_dir: pathlib.Path, bibles: Dict[str, pathlib.Path]) -> List[SyncResult]:
+    """Import each project's bible into `<library>/<project>/bible.jsonl` and refresh the touched ones"""
+    manifest = load_manifest(library_dir)
+    results = []
+    try:
+        for project, source in bibles.items():
+            target = library_dir / project / BIBLE_FILE
+            entry, action, new_lines = sync_bible(source, target, manifest.get(project))
+            manifest[project] = entry
+            results.append(SyncResult(project, action, entry["lines"], new_lines))
+    finally:
+        save_manifest(library_dir, manifest)  # keep what was done before a failure
+
+    touched = [r.project for r in results if r.action != UNCHANGED]
+    if touched:
+        with BibleStore(library_dir) as store:
+            store.refresh(only=touched)
+    return results
+
+
+def describe(result: SyncResult, verb: str = "Imported") -> str:
+    if result.action == UNCHANGED:
+        return f"{GREEN}✓{NC} {result.project} up to date ({result.lines} lessons)"
+    detail = {
+        COPIED: "",
+        APPENDED: f", +{result.new_lines} appended",
+        REWRITTEN: ", rewritten",
+    }[result.action]
+    return f"{GREEN}✓{NC} {verb} {result.project} ({result.lines} lessons{detail})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import project bibles into the library incrementally")
+    parser.add_argument("projects", nargs="*", help="Projects to import (default: every project under --repos)")
+    parser.add_argument("--library", type=pathlib.Path, default=LIBRARY_DIR, help="Library directory")
+    parser.add_argument("--repos", type=pathlib.Path, default=REPOS_DIR, help="Directory holding the projects")
+    parser.add_argument("--from", dest="source", type=pathlib.Path,
+                        help="Register this bible file as the single project given")
+    args = parser.parse_args()
+
+    if args.source:
+        if len(args.projects) != 1:
+            parser.error("--from needs exactly one project name")
+        bibles = {args.projects[0]: args.source}
+    else:
+        found = {project.name: project.bible for project in scan(args.repos, args.library)}
+        if args.projects:
+            missing = [p for p in args.projects if p not in found]
+            if missing:
+                print(f"{RED}Error: No Bible found at {args.repos / missing[0] / BIBLE_DIR / BIBLE_FILE}{NC}")
+                sys.exit(1)
+            found = {p: found[p] for p in args.projects}
+        bibles = found
+
+    verb = "Registered" if args.source else "Imported"
+    for result in sync(args.library, bibles):
+        print(describe(result, verb))
+    sys.exit(0 if bibles else 3)  # 3: nothing to import
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Classifier Micro-Benchmark
+Compares git2kb's rule-by-rule regex classification with the single-pass CLASSIFIER.
+
+Usage:
+    python3 tooling/benchmarks/bench_classifier.py
+    python3 tooling/benchmarks/bench_classifier.py --commits 20000 --repeat 5
+
+Both paths are checked to return identical tags, mistake types, patterns
+and tool names before any timing is reported.
+"""
+
+import argparse
+import pathlib
+import random
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "extractors"))
+
+import git2kb  # noqa: E402
+
+WORDS = [
+    "update", "add", "remove", "refactor", "rename", "cleanup", "bump", "deps", "docs", "readme",
+    "layout", "button", "header", "footer", "page", "form", "styles", "config", "lint", "tests",
+    "settings", "profile", "dashboard", "modal", "routing", "build", "ci", "types", "copy", "icons",
+]
+KEYWORDS = [
+    "fix", "bug", "openai", "completion", "retry", "upload", "auth", "token", "timeout", "react",
+    "useEffect", "supabase", "edge function", "binary", "progress bar", "revert", "parallel api",
+    "cache", "pdf", "JSON.parse failed", "rate limit", "mongoose", "middleware", "flashcard",
+    "memory leak", "markdown block", "pricing", "shared module",
+]
+DIRS = ["src/components", "src/pages", "src/services", "src/controllers", "supabase/functions/_shared", "server", "lib"]
+EXTS = [".ts", ".tsx", ".js", ".css", ".md", ".json", ".test.ts"]
+
+
+def synthetic_commits(n: int, seed: int = 42) -> List[Dict]:
+    """Commits with mostly everyday subjects and paths, some hitting the rule tables"""
+    rng = random.Random(seed)
+
+    def word():
+        return rng.choice(KEYWORDS) if rng.random() < 0.1 else rng.choice(WORDS)
+
+    commits = []
+    for i in range(n):
+        subject = " ".join(word() for _ in range(rng.randint(2, 7)))
+        files = [
+            f"{rng.choice(DIRS)}/{word().replace(' ', '_')}{j}{rng.choice(EXTS)}"
+            for j in range(rng.randint(1, git2kb.MAX_FILES))
+        ]
+        commits.append({"hash": f"{i:040x}", "subject": subject, "files": files})
+    return commits
+
+
+def legacy_classify(c: Dict) -> Tuple:
+    """The original per-rule loops: tools over text and every file, then each table"""
+    files = c["files"]
+    text = f"{c['subject']} {' '.join(files)}"
+    tools = [name for name, rx in git2kb.RE_TOOLS if rx.search(text) or any(rx.search(f) for f in files)]
+    mistake = next((name for name, rx in git2kb.RE_MISTAKE if rx.search(text)), None)
+    pattern = next((name for name, rx in git2kb.RE_PATTERN if rx.search(text)), None)
+    tool = next((name for name, rx in git2kb.RE_TOOLS if rx.search(c["subject"])), None)
+    return tools, mistake, pattern, tool
+
+
+def single_pass_classify(c: Dict) -> Tuple:
+    """The CLASSIFIER path used by cards_for_commit()"""
+    files = c["files"]
+    text = f"{c['subject']} {' '.join(files)}"
+    found = git2kb.CLASSIFIER.scan(text)
+    tools = git2kb.CLASSIFIER.names(found, "tool")
+    mistake = next(iter(git2kb.CLASSIFIER.names(found, "mistake")), None)
+    pattern = next(iter(git2kb.CLASSIFIER.names(found, "pattern")), None)
+    tool = git2kb.CLASSIFIER.first(c["subject"], "tool")
+    return tools, mistake, pattern, tool
+
+
+def bench(fn, commits: List[Dict], repeat: int) -> float:
+    """Best wall-clock time of `repeat` runs over all commits"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for c in commits:
+            fn(c)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark git2kb commit classification")
+    parser.add_argument("--commits", type=int, default=5000, help="Synthetic commits to classify (default: 5000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation, best is kept (default: 3)")
+    args = parser.parse_args()
+
+    commits = synthetic_commits(args.commits)
+
+    mismatches = [c for c in commits if legacy_classify(c) != single_pass_classify(c)]
+    if mismatches:
+        print(f"❌ {len(mismatches)} commit(s) classified differently, e.g. {mismatches[0]['subject']!r}")
+        sys.exit(1)
+    print(f"✅ Identical results on {len(commits)} commits")
+
+    legacy = bench(legacy_classify, commits, args.repeat)
+    single = bench(single_pass_classify, commits, args.repeat)
+
+    print(f"   rule-by-rule: {legacy * 1e6 / len(commits):8.1f} µs/commit")
+    print(f"   single-pass:  {single * 1e6 / len(commits):8.1f} µs/commit")
+    print(f"   speedup:      {legacy / single:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+PR-Body Card Scan Benchmark
+Compares the `RE_JSONL_BLOCK` regex that pr2kb.py and validate_cards.py
+used to find card blocks with the line scanner in biblelib.fences, on
+ordinary PR bodies and on adversarial ones.
+
+Usage:
+    python3 tooling/benchmarks/bench_fences.py
+    python3 tooling/benchmarks/bench_fences.py --scale 4 --repeat 5
+
+On well-formed bodies both paths are checked to find the same card lines
+before any timing is reported. The adversarial bodies are where they part
+ways: an unclosed fence is no block at all to the regex (found only after
+rescanning to the end of the body for each one) and a block running to
+the end of the body to the scanner, which also stops at MAX_SCAN
+characters, so for those only the timings and counts are shown.
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import re
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "dev_bibles"))
+
+from biblelib import fences  # noqa: E402
+
+RE_JSONL_BLOCK = re.compile(r'```(?:json|jsonl)\s*\n(.*?)\n```', re.DOTALL | re.I)
+
+PROSE = [
+    "Fixes the upload flow when the file is empty.", "Root cause: the parser assumed a trailing newline.",
+    "Also bumps the SDK.", "See the linked issue for the stack trace.", "Tested locally against staging.",
+]
+LOG_LINE = "2024-05-01T12:00:00Z INFO worker[{}] processed batch in 12ms (queue=3, retries=0)"
+
+
+def legacy(text: str) -> List[str]:
+    """The card lines the old regex found (extract_cards_from_text)"""
+    cards = []
+    for block in RE_JSONL_BLOCK.findall(text):
+        for line in block.split('\n'):
+            line = line.strip()
+            if not line or line.startswith('//') or line.startswith('#'):
+                continue
+            cards.append(line)
+    return cards
+
+
+def scanner(text: str) -> List[str]:
+    return list(fences.card_lines(text))
+
+
+def card(i: int) -> str:
+    return json.dumps({"type": "MISTAKE", "id": f"m.bench.{i}", "symptom": "x", "root_cause": "y",
+                       "fix_steps": ["z"], "tags": ["bench"]})
+
+
+def typical_bodies(n: int, seed: int = 42) -> List[str]:
+    """PR bodies with prose, a comment line and zero to three card blocks"""
+    rng = random.Random(seed)
+    bodies = []
+    for i in range(n):
+        parts = [rng.choice(PROSE) for _ in range(rng.randint(2, 8))]
+        for b in range(rng.randint(0, 3)):
+            lines = ["// generated"] + [card(i * 10 + b * 3 + k) for k in range(rng.randint(1, 3))]
+            parts.append(rng.choice(["```json", "```jsonl", "```JSON"]) + "\n" + "\n".join(lines) + "\n```")
+            parts.append("```bash\nmake test\n```")
+        bodies.append("\n\n".join(parts))
+    return bodies
+
+
+def huge_log(lines: int) -> str:
+    """A bot body: one card block, then a long CI log pasted after it"""
+    return ("```json\n" + card(0) + "\n```\n<details>\n\n```\n"
+            + "\n".join(LOG_LINE.format(i) for i in range(lines)) + "\n```\n</details>")
+
+
+def unclosed_fences(fences_count: int, log_lines: int) -> str:
+    """`fences_count` openers that are never closed, each followed by log output.
+
+    The openers end lines of prose, so no line starts with ``` to close them.
+    """
+    chunk = "\n".join(LOG_LINE.format(i) for i in range(log_lines))
+    return "\n".join(f"step {i} output: ```json\n{chunk}" for i in range(fences_count))
+
+
+def timed(fn: Callable[[str], List[str]], bodies: List[str], repeat: int) -> Tuple[float, int]:
+    """Best-of-`repeat` seconds for one pass over `bodies`, and the card lines found"""
+    best, found = float("inf"), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = sum(len(fn(body)) for body in bodies)
+        best = min(best, time.perf_counter() - start)
+    return best, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PR-body card block scanning")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply every input size (default: 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs, best is kept (default: 3)")
+    args = parser.parse_args()
+
+    well_formed = [
+        ("typical bodies", typical_bodies(5000 * args.scale)),
+        ("card + huge log", [huge_log(10000 * args.scale)]),
+    ]
+    adversarial = [
+        ("unclosed fences", [unclosed_fences(200 * args.scale, 20)]),
+        ("unclosed + huge log", [unclosed_fences(20 * args.scale, 2000)]),
+    ]
+
+    for name, bodies in well_formed:
+        if [legacy(body) for body in bodies] != [scanner(body) for body in bodies]:
+            print(f"❌ biblelib.fences disagrees with RE_JSONL_BLOCK on {name}")
+            sys.exit(1)
+    print(f"✅ Both paths find the same card lines on {', '.join(name for name, _ in well_formed)}\n")
+
+    print(f"   {'input':<22} {'chars':>10}   {'regex':>10} {'cards':>6}   {'scanner':>10} {'cards':>6}   speedup")
+    for name, bodies in well_formed + adversarial:
+        chars = sum(map(len, bodies))
+        old, old_found = timed(legacy, bodies, args.repeat)
+        new, new_found = timed(scanner, bodies, args.repeat)
+        print(f"   {name:<22} {chars:>10}   {old * 1e3:8.1f}ms {old_found:>6}   {new * 1e3:8.1f}ms {new_found:>6}"
+              f"   {old / new:6.1f}x")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
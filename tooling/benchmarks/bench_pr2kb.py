@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+PR Extractor Fetch Benchmark
+Runs pr2kb.py's fetch, cache and replay paths offline against fake_gh.py
+(a `gh` stand-in serving a fixed, generated repository), checks that they
+do what the extractor promises, and times the `--stdin` JSON stream
+reader against the one it replaced.
+
+Usage:
+    python3 tooling/benchmarks/bench_pr2kb.py
+    python3 tooling/benchmarks/bench_pr2kb.py --limit 200 --delay 0.2 --body-mb 16
+
+Checked, in a temp KB and cache (the real ones are never touched):
+  - pagination: iter_pages yields exactly the newest `--limit` merged PRs,
+    in order, and stops requesting pages once it has them;
+  - page-ahead: with --jobs 2, the next page downloads while the current
+    one is processed (fake_gh's request log shows overlapping requests);
+  - caching: each processed PR is cached as the raw record gh returned;
+  - re-runs: a second run, and a `--stdin` replay of every page, skip the
+    cached PRs and process only the new ones;
+  - `--from-cache`: a replay of the raw cache produces the same cards.
+
+Exits 1 if any check fails.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import shlex
+import sys
+import tempfile
+import time
+from typing import Callable, Iterator, List, Tuple
+
+BENCHMARKS = pathlib.Path(__file__).resolve().parent
+FAKE_GH = BENCHMARKS / "fake_gh.py"
+os.environ["PR2KB_GH"] = f"{shlex.quote(sys.executable)} {shlex.quote(str(FAKE_GH))}"  # read by pr2kb on import
+sys.path.insert(0, str(BENCHMARKS.parent / "extractors"))
+sys.path.insert(0, str(BENCHMARKS))
+
+import pr2kb  # noqa: E402
+from fake_gh import fake_pr, page_prs  # noqa: E402
+from kbwriter import KBWriter, UPDATE  # noqa: E402
+
+TOTAL_PRS = 350
+PER_PAGE = 20
+
+
+def legacy_iter_json_array(stream, chunk_size: int = pr2kb.STREAM_CHUNK) -> Iterator:
+    """iter_json_array as it was: an element spanning k chunks is decoded k times over a growing buffer"""
+    decoder = json.JSONDecoder()
+    buf, pos, more, in_array = "", 0, True, False
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ',')):
+            pos += 1
+        if pos == len(buf):
+            if not more:
+                return
+            buf, pos = stream.read(chunk_size), 0
+            more = bool(buf)
+            continue
+        if not in_array:
+            in_array = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            in_array = False
+            pos += 1
+            continue
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if not more:
+                raise
+            end = len(buf)
+        if end == len(buf) and more:
+            chunk = stream.read(chunk_size)
+            buf, pos, more = buf[pos:] + chunk, 0, bool(chunk)
+            continue
+        pos = end
+        yield value
+
+
+def merged_numbers(limit: int) -> List[int]:
+    """The newest `limit` merged PRs in the fake repository"""
+    return [n for n in range(TOTAL_PRS, 0, -1) if fake_pr(n)["merged_at"]][:limit]
+
+
+def paginate_output(per_page: int = PER_PAGE) -> str:
+    """What `gh api --paginate .../pulls` prints for the fake repository: arrays back to back"""
+    pages = (TOTAL_PRS + per_page - 1) // per_page
+    return "".join(json.dumps(page_prs(page, per_page, TOTAL_PRS), indent=1) + "\n" for page in range(1, pages + 1))
+
+
+def read_log(path: pathlib.Path) -> List[Tuple[int, float, float]]:
+    with open(path) as f:
+        return [(int(page), float(start), float(end)) for page, start, end in (line.split() for line in f)]
+
+
+def check_pages(limit: int, jobs: int, delay: float, log: pathlib.Path) -> List[str]:
+    """Fetch `limit` PRs, processing each page for `delay` seconds; what went wrong"""
+    problems = []
+    numbers = []
+    for page in pr2kb.iter_pages(limit, jobs=jobs, per_page=PER_PAGE):
+        numbers += [pr["number"] for pr in page]
+        time.sleep(delay)  # as long as a fetch: with page-ahead, the next one is done by now
+    if numbers != merged_numbers(limit):
+        problems.append(f"iter_pages yielded {len(numbers)} PRs, not the newest {limit} merged ones in order")
+    requests = read_log(log)
+    needed, found = 0, 0
+    while found < limit and needed * PER_PAGE < TOTAL_PRS:  # pages up to the one completing `limit`
+        needed += 1
+        found += sum(1 for pr in page_prs(needed, PER_PAGE, TOTAL_PRS) if pr["merged_at"])
+    pages = sorted(page for page, _, _ in requests)
+    if pages[:needed] != list(range(1, needed + 1)) or len(pages) > needed + jobs - 1:
+        problems.append(f"requested pages {pages}, {needed} needed")
+    overlapping = sum(1 for (_, s1, e1), (_, s2, _) in zip(requests, requests[1:]) if s2 < e1)
+    if jobs > 1 and needed > 1 and not overlapping:
+        problems.append("no page was fetched while another was in flight")
+    return problems
+
+
+def check_cache_and_replays(limit: int, jobs: int, tmp: pathlib.Path) -> List[str]:
+    """A fetch, a re-run, a --stdin replay and a --from-cache replay into a temp KB; what went wrong"""
+    problems = []
+    kb, cache_dir = tmp / "knowledge.jsonl", tmp / "pr2kb.cache" / "fake"
+    quiet = contextlib.redirect_stdout(io.StringIO())
+
+    def run(pages, skip, **kwargs) -> Tuple[int, int, int, int]:
+        with quiet, KBWriter(kb, fsync=False, **kwargs) as writer:
+            processed, skipped, cards = pr2kb.extract_pages(pages, "fake", writer, cache_dir, skip)
+        return processed, skipped, cards, writer.skipped
+
+    processed, _, cards, _ = run(pr2kb.iter_pages(limit, jobs=jobs, per_page=PER_PAGE), set())
+    expected = merged_numbers(limit)
+    if processed != limit or sorted(pr2kb.cached_numbers(cache_dir)) != sorted(expected):
+        problems.append(f"first run: {processed} PRs processed, cache holds {len(pr2kb.cached_numbers(cache_dir))}")
+    raw = [json.loads((cache_dir / f"{n}.json").read_text()) for n in expected]
+    if raw != [fake_pr(n) for n in expected]:
+        problems.append("the cache does not hold the records as gh returned them")
+    kb_bytes = kb.read_bytes()
+
+    processed, skipped, _, _ = run(pr2kb.iter_pages(limit, jobs=jobs, per_page=PER_PAGE),
+                                   pr2kb.cached_numbers(cache_dir))
+    if (processed, skipped) != (0, limit) or kb.read_bytes() != kb_bytes:
+        problems.append(f"re-run: {processed} PRs processed again, {skipped} skipped (expected 0, {limit})")
+
+    stream = io.StringIO(paginate_output())
+    stdin_pages = pr2kb.iter_batches(pr for pr in pr2kb.iter_json_array(stream, chunk_size=4096) if pr2kb.is_merged(pr))
+    processed, skipped, _, _ = run(stdin_pages, pr2kb.cached_numbers(cache_dir))
+    all_merged = len(merged_numbers(TOTAL_PRS))
+    if (processed, skipped) != (all_merged - limit, limit):
+        problems.append(f"--stdin replay: {processed} processed, {skipped} skipped "
+                        f"(expected {all_merged - limit}, {limit})")
+    kb_bytes = kb.read_bytes()
+
+    processed, _, replayed, _ = run(pr2kb.iter_batches(pr2kb.iter_cached(cache_dir)), set(), on_duplicate=UPDATE)
+    if processed != all_merged or kb.read_bytes().count(b"\n") != kb_bytes.count(b"\n"):
+        problems.append(f"--from-cache: {processed} of {all_merged} PRs replayed, KB size changed")
+    if not cards or not replayed:
+        problems.append("no cards were extracted")
+    return problems
+
+
+def timed(reader: Callable, text: str, repeat: int) -> Tuple[float, List]:
+    """Best-of-`repeat` seconds to read every element of `text`, and the elements"""
+    best, values = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        values = list(reader(io.StringIO(text)))
+        best = min(best, time.perf_counter() - start)
+    return best, values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark pr2kb's fetch, cache and --stdin paths")
+    parser.add_argument("--limit", type=int, default=120, help=f"PRs fetched (of {TOTAL_PRS}, default: 120)")
+    parser.add_argument("--jobs", type=int, default=pr2kb.FETCH_JOBS, help="Pages fetched at once")
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds per fake page request (default: 0.1)")
+    parser.add_argument("--body-mb", type=float, default=4, help="Size of the one huge PR body read (default: 4)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs, best is kept (default: 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_pr2kb_") as tmp:
+        tmp = pathlib.Path(tmp)
+        log = tmp / "requests.log"
+        os.environ.update(FAKE_GH_PRS=str(TOTAL_PRS), FAKE_GH_DELAY=str(args.delay), FAKE_GH_LOG=str(log))
+        start = time.perf_counter()
+        problems = check_pages(args.limit, args.jobs, args.delay, log)
+        elapsed = time.perf_counter() - start
+        requests = len(read_log(log))
+        os.environ["FAKE_GH_DELAY"] = "0"
+        problems += check_cache_and_replays(args.limit, args.jobs, tmp)
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"✅ {args.limit} PRs fetched in {requests} page requests, {elapsed:.2f}s "
+          f"({requests * args.delay * 2:.2f}s without page-ahead); cache, re-run, --stdin and --from-cache agree\n")
+
+    pr = dict(fake_pr(1), body="log line\n" * int(args.body_mb * (1 << 20) / 10))
+    streams = [("many PRs", paginate_output() * 20), (f"one {args.body_mb:g}MB PR", json.dumps([pr]))]
+    for name, text in streams:
+        new, values = timed(pr2kb.iter_json_array, text, args.repeat)
+        old, expected = timed(legacy_iter_json_array, text, args.repeat)
+        if values != expected:
+            print(f"❌ iter_json_array reads {name} differently")
+            sys.exit(1)
+        print(f"   {name:<16} iter_json_array {new * 1e3:8.1f}ms   before {old * 1e3:8.1f}ms   {old / new:5.1f}x")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
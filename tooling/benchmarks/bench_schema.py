@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Schema Validation Micro-Benchmark
+Compares the three hand-written card checks the validators used to carry
+(validate.py, validate_kb.py, validate_cards.py) with the compiled
+biblelib.schema checkers.
+
+Usage:
+    python3 tooling/benchmarks/bench_schema.py
+    python3 tooling/benchmarks/bench_schema.py --cards 200000 --repeat 5
+
+Cards are parsed once up front, so only the per-record validation cost is
+timed. Every path is checked to agree on which cards are valid before any
+timing is reported, and the schema is checked to reject the NULL_FIELDS
+and BAD_TYPES cards (null required fields, a non-string type) as
+validate.py always did, and validate_kb.py is run over them to check it
+reports each one instead of crashing. Only validate.py's legacy check is as strict as
+the schema: the validate_kb and validate_cards checks never looked inside
+lists or at the type of `id`, so they are cheaper for doing less.
+"""
+
+import argparse
+import json
+import pathlib
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "dev_bibles"))
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "validators"))
+
+from biblelib import schema  # noqa: E402
+import validate_kb  # noqa: E402
+
+# Types every legacy checker knows about
+TYPES = ("MISTAKE", "PATTERN", "RUNBOOK", "DECISION")
+
+LEGACY_REQUIRED = {
+    "PRINCIPLE": ["type", "id", "text", "tags"],
+    "PATTERN": ["type", "id", "name", "when", "steps", "tags"],
+    "MISTAKE": ["type", "id", "symptom", "root_cause", "fix_steps", "tags"],
+    "RUNBOOK": ["type", "id", "title", "steps", "tags"],
+    "DECISION": ["type", "id", "question", "decision", "reason", "tags"],
+    "TOOL": ["type", "id", "name", "tags"],
+}
+
+# Cards the schema must reject (regressions): a present field is type-checked even when it is null,
+# and a type that is not a string is an invalid type, not a crash
+NULL_FIELDS = [
+    {"type": "PRINCIPLE", "id": "p.a", "text": "x", "tags": None},
+    {"type": "PRINCIPLE", "id": None, "text": "x", "tags": ["a"]},
+    {"type": "MISTAKE", "id": "m.a", "symptom": "s", "root_cause": "r", "fix_steps": None, "tags": None},
+    {"type": "RUNBOOK", "id": "r.a", "title": "t", "steps": None, "tags": []},
+    {"type": "PATTERN", "id": "pat.a", "name": "n", "when": "w", "steps": ["a", None], "tags": []},
+]
+BAD_TYPES = [{"type": ["MISTAKE"], "id": "m.b"}, {"type": {"a": 1}, "id": "m.c", "tags": []}, {"type": None, "id": "x"}]
+
+
+def check_regressions() -> List[str]:
+    """How the NULL_FIELDS / BAD_TYPES cards get through: accepted by the schema, judged differently
+    by validate.py's legacy check, or not reported by validate_kb.py"""
+    failures = []
+    for card in NULL_FIELDS:
+        if compiled(card) or legacy_validate_py(card):
+            failures.append(f"biblelib.schema accepts {card!r}")
+    for card in BAD_TYPES:
+        issues = schema.check(card)
+        if not any(issue.code in (schema.UNKNOWN_TYPE, schema.MISSING) for issue in issues):
+            failures.append(f"biblelib.schema accepts {card!r}")
+    lines = [(i, json.dumps(card)) for i, card in enumerate(NULL_FIELDS + BAD_TYPES, 1)]
+    try:
+        reported = {f.line for f in validate_kb.scan_lines(lines, validate_kb.ScanStats(), {})
+                    if f.category == validate_kb.STRUCTURE}
+    except Exception as e:  # e.g. an unhashable type counted as a key
+        return failures + [f"validate_kb.py crashes on the regression cards: {e!r}"]
+    failures += [f"validate_kb.py does not report {line}" for i, line in lines if i not in reported]
+    return failures
+
+
+def synthetic_cards(n: int, broken: float = 0.1, seed: int = 42) -> List[Dict]:
+    """Well-formed cards of the types all checks share, with a share of them missing a field"""
+    rng = random.Random(seed)
+    cards = []
+    for i in range(n):
+        card_type = rng.choice(TYPES)
+        card = {"type": card_type, "id": f"x.card_{i}", "repo": ["demo"], "tags": ["a", "b", "c"]}
+        for field in LEGACY_REQUIRED[card_type][2:]:
+            card.setdefault(field, [f"step {j}" for j in range(4)] if field in ("steps", "fix_steps") else "text")
+        if rng.random() < broken:
+            # Missing fields only: the legacy checks disagree on list checks
+            # (validate_kb never checked RUNBOOK steps, for one).
+            del card[rng.choice(LEGACY_REQUIRED[card_type][2:])]
+        cards.append(card)
+    return cards
+
+
+def legacy_validate_py(lesson: Dict) -> bool:
+    """validate.py's validate_lesson, minus the json.loads"""
+    errors = []
+    if not isinstance(lesson, dict):
+        return False
+    lesson_type = lesson.get("type")
+    if not lesson_type or lesson_type not in LEGACY_REQUIRED or lesson_type == "TOOL":
+        return False
+    for field in LEGACY_REQUIRED[lesson_type]:
+        if field not in lesson:
+            errors.append(field)
+    if "id" in lesson and not isinstance(lesson["id"], str):
+        errors.append("id")
+    if "tags" in lesson:
+        if not isinstance(lesson["tags"], list):
+            errors.append("tags")
+        elif not all(isinstance(tag, str) for tag in lesson["tags"]):
+            errors.append("tags")
+    if lesson_type == "PATTERN" or lesson_type == "RUNBOOK":
+        if "steps" in lesson:
+            if not isinstance(lesson["steps"], list):
+                errors.append("steps")
+            elif not all(isinstance(step, str) for step in lesson["steps"]):
+                errors.append("steps")
+    if lesson_type == "MISTAKE" and "fix_steps" in lesson:
+        if not isinstance(lesson["fix_steps"], list):
+            errors.append("fix_steps")
+        elif not all(isinstance(step, str) for step in lesson["fix_steps"]):
+            errors.append("fix_steps")
+    return not errors
+
+
+def legacy_validate_kb(card: Dict) -> bool:
+    """validate_kb.py's if/elif validate_card_structure"""
+    errors = []
+    if 'type' not in card:
+        errors.append('type')
+    if 'id' not in card:
+        errors.append('id')
+    card_type = card.get('type', '')
+    if card_type == 'META':
+        pass
+    elif card_type == 'MISTAKE':
+        for field in ['symptom', 'root_cause', 'fix_steps', 'tags']:
+            if field not in card:
+                errors.append(field)
+        if 'fix_steps' in card and not isinstance(card['fix_steps'], list):
+            errors.append('fix_steps')
+        if 'tags' in card and not isinstance(card['tags'], list):
+            errors.append('tags')
+    elif card_type == 'PATTERN':
+        for field in ['name', 'when', 'steps', 'tags']:
+            if field not in card:
+                errors.append(field)
+        if 'steps' in card and not isinstance(card['steps'], list):
+            errors.append('steps')
+    elif card_type == 'DECISION':
+        for field in ['question', 'decision', 'reason', 'tags']:
+            if field not in card:
+                errors.append(field)
+    elif card_type == 'TOOL':
+        for field in ['name', 'tags']:
+            if field not in card:
+                errors.append(field)
+    elif card_type == 'RUNBOOK':
+        for field in ['title', 'steps', 'tags']:
+            if field not in card:
+                errors.append(field)
+    else:
+        errors.append('type')
+    if 'repo' in card and not isinstance(card['repo'], list):
+        errors.append('repo')
+    return not errors
+
+
+def legacy_validate_cards(card: Dict) -> bool:
+    """validate_cards.py's validate_card, minus the json.loads"""
+    if 'type' not in card or 'id' not in card:
+        return False
+    card_type = card['type']
+    if card_type not in LEGACY_REQUIRED or card_type == 'PRINCIPLE':
+        return False
+    missing = []
+    for field in LEGACY_REQUIRED[card_type]:
+        if field not in card:
+            missing.append(field)
+    if missing:
+        return False
+    if card_type in ['MISTAKE', 'PATTERN', 'RUNBOOK']:
+        list_fields = {'MISTAKE': ['fix_steps'], 'PATTERN': ['steps'], 'RUNBOOK': ['steps']}
+        for field in list_fields.get(card_type, []):
+            if not isinstance(card.get(field), list):
+                return False
+    if not isinstance(card.get('tags'), list):
+        return False
+    if 'repo' in card and not isinstance(card['repo'], list):
+        return False
+    return True
+
+
+def compiled(card: Dict) -> bool:
+    return not schema.check(card)
+
+
+def timed(fn: Callable[[Dict], bool], cards: List[Dict], repeat: int) -> float:
+    """Best-of-`repeat` seconds for one pass over `cards`"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for card in cards:
+            fn(card)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark card schema validation")
+    parser.add_argument("--cards", type=int, default=100000, help="Synthetic cards (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs, best is kept (default: 3)")
+    args = parser.parse_args()
+
+    cards = synthetic_cards(args.cards)
+    paths = [
+        ("validate.py (legacy)", legacy_validate_py),
+        ("validate_kb.py (legacy)", legacy_validate_kb),
+        ("validate_cards.py (legacy)", legacy_validate_cards),
+        ("biblelib.schema", compiled),
+    ]
+
+    failures = check_regressions()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ biblelib.schema and validate_kb.py reject all {len(NULL_FIELDS) + len(BAD_TYPES)} regression cards")
+
+    expected = [compiled(card) for card in cards]
+    for name, fn in paths[:-1]:
+        if [fn(card) for card in cards] != expected:
+            print(f"❌ {name} disagrees with biblelib.schema")
+            sys.exit(1)
+    print(f"✅ All checks agree on {len(cards)} cards ({expected.count(False)} invalid)\n")
+
+    baseline = timed(compiled, cards, args.repeat)
+    for name, fn in paths:
+        elapsed = baseline if fn is compiled else timed(fn, cards, args.repeat)
+        per_card = elapsed / len(cards) * 1e6
+        print(f"   {name:<28} {per_card:6.2f} µs/card   {elapsed / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Bible Startup Benchmark
+Times `bible search <tag>` end to end, as a shell user sees it, against a
+generated library, next to a bare interpreter, `python3 -m biblelib.search`
+and the bible-search wrapper, and fails if `bible` is over budget. With
+--daemon, the same again with the query daemon (biblelib.daemon) serving
+the library.
+
+Usage:
+    python3 tooling/benchmarks/bench_startup.py
+    python3 tooling/benchmarks/bench_startup.py --budget-ms 150 --runs 21
+    python3 tooling/benchmarks/bench_startup.py --bibles 20 --lessons 2000
+    python3 tooling/benchmarks/bench_startup.py --daemon
+
+Each command runs once untimed first, so the sidecar index is built and
+the timings are of the steady state: an up-to-date index, a query and
+its hits printed. The median of `--runs` is compared with the budget.
+`bible` is also run under `-X importtime` to check that a search never
+imports the modules only other subcommands need. With --daemon, every
+search flag is first checked to print the same output and exit status
+through the daemon as in-process, including after a lesson is appended
+while it runs; everything stays on a Unix socket in the temp library.
+
+Exits 1 if `bible search` is over budget or imports one of them, or if
+the daemon answers differently.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "dev_bibles"))
+
+from biblelib.client import ask  # noqa: E402
+
+DEV_BIBLES = pathlib.Path(__file__).resolve().parents[2] / "dev_bibles"
+BIBLE = DEV_BIBLES / "bible"
+BIBLE_SEARCH = DEV_BIBLES / "bible-search"
+
+DEFAULT_BUDGET_MS = 200
+# Loaded by stats/personal, sync, validate and extract; a search must not pay for them
+NOT_FOR_SEARCH = ("biblelib.snapshot", "biblelib.sync", "biblelib.discovery", "biblelib.merge", "hashlib",
+                  "concurrent.futures", "subprocess")
+
+# Command lines whose output must not depend on whether the daemon answered
+DAEMON_CHECKS = [
+    ["{tag}"], ["{tag} AND security NOT frontend"], ["{tag}", "project01"], ["--master", "{tag}"],
+    ["--type", "MISTAKE", "{tag}"], ["--text", "lesson about {tag}"], ["--stats"], ["--personal"],
+    ["{tag}", "no-such-project"], ["{tag} AND ("],
+]
+
+TAGS = ["auth", "security", "frontend", "wallet", "api", "database", "cors", "jwt", "testing", "deploy"]
+TYPES = ["MISTAKE", "PATTERN", "PRINCIPLE", "RUNBOOK", "DECISION"]
+
+
+def make_library(root: pathlib.Path, bibles: int, lessons: int, seed: int = 42):
+    """`bibles` project bibles plus _master, `lessons` random lessons each"""
+    rng = random.Random(seed)
+    for b in range(bibles + 1):
+        project = root / ("_master" if b == 0 else f"project{b:02d}")
+        project.mkdir(parents=True)
+        lines = []
+        for i in range(lessons):
+            lesson_type = rng.choice(TYPES)
+            lines.append(json.dumps({
+                "type": lesson_type, "id": f"{lesson_type[0].lower()}.{project.name}.{i}",
+                "symptom": f"lesson {i} about {rng.choice(TAGS)}", "root_cause": "generated",
+                "fix_steps": ["regenerate"], "tags": rng.sample(TAGS, 3),
+            }))
+        (project / "bible.jsonl").write_text("\n".join(lines) + "\n")
+
+
+def timed(cmd: List[str], env: Dict[str, str], runs: int) -> List[float]:
+    """Wall-clock seconds of `runs` runs of `cmd`, after one untimed warm-up"""
+    subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, check=True)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(cmd: List[str], env: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def served(library: pathlib.Path) -> int:
+    """Searches the daemon has answered itself (a client falls back silently otherwise)"""
+    reply = ask(str(library), {"op": "ping"})
+    return reply["served"] if reply else -1
+
+
+def check_daemon(bible: List[str], env: Dict[str, str], library: pathlib.Path, tag: str) -> List[str]:
+    """Command lines the daemon answers differently from an in-process search, or not at all"""
+    local_env = dict(env, BIBLE_NO_DAEMON="1")
+    checks = [[arg.format(tag=tag) for arg in argv] for argv in DAEMON_CHECKS]
+    appended = json.dumps({"type": "MISTAKE", "id": "m.bench.appended", "symptom": "appended while serving",
+                           "tags": [tag, "appended"]})
+    different = []
+    for step in ("before", "after"):
+        if step == "after":  # the daemon must see it without being restarted
+            with (library / "project01" / "bible.jsonl").open("a") as f:
+                f.write(appended + "\n")
+            checks.append(["appended"])
+        for argv in checks:
+            before = served(library)
+            local, remote = run(bible + argv, local_env), run(bible + argv, env)
+            if served(library) != before + 1:
+                different.append(f"{' '.join(argv)} ({step} an append): not answered by the daemon")
+            elif (local.returncode, local.stdout, local.stderr) != (remote.returncode, remote.stdout, remote.stderr):
+                different.append(f"{' '.join(argv)} ({step} an append): different output")
+    return different
+
+
+def imported(cmd: List[str], env: Dict[str, str]) -> List[str]:
+    """Modules `cmd` (a python3 command line) imports, from -X importtime"""
+    proc = subprocess.run([cmd[0], "-X", "importtime"] + cmd[1:], env=env, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True, check=True)
+    return [line.rsplit("|", 1)[-1].strip() for line in proc.stderr.splitlines() if line.startswith("import time:")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark `bible search` startup")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Median wall-clock budget for `bible search` (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument("--runs", type=int, default=15, help="Timed runs per command (default: 15)")
+    parser.add_argument("--bibles", type=int, default=5, help="Project bibles in the library (default: 5)")
+    parser.add_argument("--lessons", type=int, default=200, help="Lessons per bible (default: 200)")
+    parser.add_argument("--tag", default="auth", help="Tag searched for (default: auth)")
+    parser.add_argument("--daemon", action="store_true", help="Also check and time searches through the query daemon")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as tmp:
+        home = pathlib.Path(tmp)
+        library = home / "dev_bibles"
+        make_library(library, args.bibles, args.lessons)
+        # bible-search finds the library at $HOME/dev_bibles, bible and biblelib through BIBLE_LIBRARY
+        env = dict(os.environ, HOME=str(home), BIBLE_LIBRARY=str(library), PYTHONPATH=str(DEV_BIBLES))
+        python = sys.executable
+        commands = [
+            ("python3 -c pass", [python, "-c", "pass"]),
+            ("python3 -m biblelib.search", [python, "-m", "biblelib.search", "--library", str(library), args.tag]),
+            ("bible-search", [str(BIBLE_SEARCH), args.tag]),
+            ("bible search", [python, str(BIBLE), "search", args.tag]),
+        ]
+        if not shutil.which("bash"):
+            commands = [c for c in commands if c[0] != "bible-search"]
+
+        print(f"🏁 {args.bibles + 1} bibles x {args.lessons} lessons, `{args.tag}`, {args.runs} runs each\n")
+        print(f"   {'command':<28} {'median':>9} {'best':>9}")
+        results = {}
+        for name, cmd in commands:
+            times = timed(cmd, env, args.runs)
+            results[name] = statistics.median(times)
+            print(f"   {name:<28} {results[name] * 1e3:7.1f}ms {min(times) * 1e3:7.1f}ms")
+
+        modules = set(imported(commands[-1][1], env))
+        leaked = [m for m in NOT_FOR_SEARCH if m in modules]
+
+        different = []
+        if args.daemon:
+            daemon = [python, str(BIBLE), "daemon"]
+            subprocess.run(daemon + ["start"], env=env, stdout=subprocess.DEVNULL, check=True)
+            try:
+                different = check_daemon([python, str(BIBLE), "search"], env, library, args.tag)
+                for name, cmd in commands[1:]:
+                    name += " (daemon)"
+                    times = timed(cmd, env, args.runs)
+                    results[name] = statistics.median(times)
+                    print(f"   {name:<28} {results[name] * 1e3:7.1f}ms {min(times) * 1e3:7.1f}ms")
+            finally:
+                subprocess.run(daemon + ["stop"], env=env, stdout=subprocess.DEVNULL)
+
+    median_ms = results["bible search"] * 1e3
+    print()
+    ok = True
+    if leaked:
+        print(f"❌ `bible search` imports {', '.join(leaked)}")
+        ok = False
+    for argv in different:
+        print(f"❌ `bible search {argv}`")
+        ok = False
+    if median_ms > args.budget_ms:
+        print(f"❌ `bible search` median {median_ms:.1f}ms is over the {args.budget_ms:.0f}ms budget")
+        ok = False
+    if ok:
+        print(f"✅ `bible search` median {median_ms:.1f}ms is within the {args.budget_ms:.0f}ms budget "
+              f"({len(modules)} modules imported)")
+    if args.daemon and not different:
+        print(f"✅ The daemon answers all {len(DAEMON_CHECKS) + 1} checked searches as an in-process search would; "
+              f"`bible search` through it: {results['bible search (daemon)'] * 1e3:.1f}ms median")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
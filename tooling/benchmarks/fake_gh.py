@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Fake GitHub CLI
+A stand-in for `gh` that answers pr2kb.py's page requests from a fixed,
+generated repository, so the fetch layer can be run offline:
+
+    PR2KB_GH="python3 tooling/benchmarks/fake_gh.py" python3 pr2kb.py --limit 50
+
+Only `api repos/{owner}/{repo}/pulls?...&per_page=N&page=P` is understood.
+It prints that page of the repository's closed PRs, newest first, in the
+REST API's shape. PRs are numbered FAKE_GH_PRS down to 1; every third is
+closed without being merged and every fifth has no body. `page_prs` is the
+same data for a caller that wants to know what should come back.
+
+Environment:
+    FAKE_GH_PRS     PRs in the repository (default: 350)
+    FAKE_GH_DELAY   seconds each request takes, as if over the network (default: 0)
+    FAKE_GH_LOG     file to append "<page> <start> <end>" to per request (time.time())
+"""
+
+import json
+import os
+import sys
+import time
+import urllib.parse
+from typing import Dict, List
+
+DEFAULT_PRS = 350
+
+
+def fake_pr(number: int) -> Dict:
+    """Closed PR `number` as `gh api .../pulls` returns it"""
+    return {
+        "number": number,
+        "title": f"Fix crash in worker {number}",
+        "user": {"login": f"dev{number % 7}"},
+        "body": None if number % 5 == 0 else (
+            f"Bug fix.\nRoot cause: worker {number} read a stale handle\n\nFix steps:\n1. reopen it\n2. retry\n"),
+        "labels": [{"name": "bug"}],
+        "merged_at": None if number % 3 == 0 else "2024-05-01T12:00:00Z",
+        "closed_at": "2024-05-01T12:00:00Z",
+        "html_url": f"https://github.com/owner/repo/pull/{number}",
+    }
+
+
+def page_prs(page: int, per_page: int, total: int = DEFAULT_PRS) -> List[Dict]:
+    """Page `page` (from 1) of `total` closed PRs, newest first"""
+    first = total - (page - 1) * per_page
+    return [fake_pr(number) for number in range(first, max(first - per_page, 0), -1)]
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != "api":
+        print(f"fake_gh: unsupported command: {' '.join(sys.argv[1:])}", file=sys.stderr)
+        sys.exit(1)
+    query = urllib.parse.parse_qs(urllib.parse.urlparse(sys.argv[2]).query)
+    page, per_page = int(query["page"][0]), int(query["per_page"][0])
+    start = time.time()
+    time.sleep(float(os.environ.get("FAKE_GH_DELAY", "0")))
+    prs = page_prs(page, per_page, int(os.environ.get("FAKE_GH_PRS", DEFAULT_PRS)))
+    if os.environ.get("FAKE_GH_LOG"):
+        with open(os.environ["FAKE_GH_LOG"], "a") as log:
+            log.write(f"{page} {start:.4f} {time.time():.4f}\n")
+    print(json.dumps(prs))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,34 @@ Git History → Knowledge Base Extractor
 Mines commit history from AI learning platform repos and generates structured knowledge cards.
 
 Tailored for: React/TypeScript, Node.js/Express, MongoDB, Supabase, OpenAI integration
+
+Card IDs are derived from the commit hash, and the KB's IDs are loaded
+once at startup (kbwriter), so a commit walked again (after a history
+rewrite, or with --full) never adds a second copy of its cards: they are
+skipped, or with --full replace the old ones.
 """
 
 import json
+import argparse
 import subprocess
 import re
 import pathlib
 import sys
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Set
 
+from kbwriter import KBWriter, SKIP, SKIPPED, UPDATE
+
 ROOT = pathlib.Path(__file__).resolve().parents[3]  # repo root
 KB = ROOT / "ai_manual" / "kb" / "knowledge.jsonl"
+STATE = KB.parent / "git2kb.state.json"  # per-repo high-water marks
+
+MAX_FILES = 30  # files kept per commit
+STREAM_CHUNK = 1 << 16  # bytes read per pipe read in streaming mode
+CHECKPOINT_EVERY = 500  # commits between state checkpoints
 
 
 RE_FIXES = re.compile(r"\b(fix|bug|hotfix|patch|regression|broken|crash|error)\b", re.I)
@@ -56,16 +71,141 @@ RE_PATTERN = [
 ]
 
 
+class Classifier:
+    """Single-pass matcher over several (name, regex) rule tables.
+
+    Every top-level alternative of a rule starts with a literal (`openai`,
+    `edge.?function` -> "edge", `\\b(jwt|token|...)` -> "jwt", "token", ...).
+    Those literals are pulled out once at build time and act as a
+    prefilter: a rule's regex only runs when one of its literals occurs in
+    the lower-cased text, which a plain substring test answers in C, and
+    then starts at the earliest one. Most commits trigger only a handful
+    of the rules, so most regexes never run.
+    Rules without a usable literal, and non-ASCII text (where IGNORECASE
+    folds more than str.lower() does), always fall back to the regex.
+    """
+
+    def __init__(self, tables: Dict[str, List]):
+        self.rules = []  # (kind, name, regex, literals or None)
+        self.kinds = {}  # kind -> bitmask of its rules
+        for kind, table in tables.items():
+            for name, rx in table:
+                self.kinds[kind] = self.kinds.get(kind, 0) | (1 << len(self.rules))
+                self.rules.append((kind, name, rx, _literal_prefixes(rx.pattern)))
+
+    def scan(self, text: str, mask: int = None) -> int:
+        """Bitmask of every rule in `mask` (default: all) that matches `text`"""
+        low = text.lower() if text.isascii() else None
+        found = 0
+        for i, (_, _, rx, literals) in enumerate(self.rules):
+            if mask is not None and not mask >> i & 1:
+                continue
+            pos = 0
+            if low is not None and literals is not None:
+                # A match has to start at one of the literals, so the regex
+                # can skip straight to the earliest one (`\b` still sees the
+                # character before `pos`).
+                pos = min((p for p in map(low.find, literals) if p >= 0), default=-1)
+                if pos < 0:
+                    continue
+            if rx.search(text, pos):
+                found |= 1 << i
+        return found
+
+    def first(self, text: str, kind: str):
+        """Name of the first rule of `kind`, in table order, that matches `text`"""
+        return next(iter(self.names(self.scan(text, self.kinds[kind]), kind)), None)
+
+    def names(self, found: int, kind: str) -> List[str]:
+        """Names of the matched rules of `kind`, in table order"""
+        found &= self.kinds[kind]
+        return [name for i, (_, name, _, _) in enumerate(self.rules) if found >> i & 1]
+
+
+def _literal_prefixes(pattern: str):
+    """Lower-cased literal each top-level alternative of `pattern` must start with.
+
+    Returns None when some alternative has no literal prefix of at least two
+    characters, meaning the rule cannot be prefiltered.
+    """
+    prefixes = []
+    for branch in _split_alternatives(pattern):
+        while branch.startswith("\\b"):
+            branch = branch[2:]
+        if branch.startswith("("):
+            inner, depth = "", 0
+            for j, ch in enumerate(branch):
+                depth += (ch == "(") - (ch == ")")
+                if depth == 0:
+                    inner = branch[1:j]
+                    break
+            if inner.startswith("?:"):
+                inner = inner[2:]
+            elif inner.startswith("?"):
+                return None
+            sub = _literal_prefixes(inner)
+            if sub is None:
+                return None
+            prefixes.extend(sub)
+            continue
+        literal = []
+        j = 0
+        while j < len(branch):
+            ch = branch[j]
+            if ch == "\\" and j + 1 < len(branch) and not branch[j + 1].isalnum():
+                literal.append(branch[j + 1])
+                j += 2
+            elif ch.isalnum() or ch in "_/- '\"=:,;<>!@#%&~`":
+                literal.append(ch)
+                j += 1
+            else:
+                break
+            if j < len(branch) and branch[j] in "?*{":
+                literal.pop()  # optional character, not part of the prefix
+                break
+        if len(literal) < 2:
+            return None
+        prefixes.append("".join(literal).lower())
+    return prefixes
+
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Split a regex on its top-level `|`"""
+    parts, depth, start, j = [], 0, 0, 0
+    while j < len(pattern):
+        ch = pattern[j]
+        if ch == "\\":
+            j += 2
+            continue
+        if ch == "[":
+            j = pattern.index("]", j + 2) + 1
+            continue
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "|" and depth == 0:
+            parts.append(pattern[start:j])
+            start = j + 1
+        j += 1
+    parts.append(pattern[start:])
+    return parts
+
+
+CLASSIFIER = Classifier({"tool": RE_TOOLS, "mistake": RE_MISTAKE, "pattern": RE_PATTERN})
+SEP = "\n\0"  # no rule can match across it: `.` stops at LF, `\s`/`\w` stop at NUL
+
+
 def run(cmd, cwd=None):
     """Run shell command and return output"""
     r = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, check=True)
     return r.stdout
 
 
-def git_commits(repo_path):
-    """Get all commits from a repo"""
+def git_commits(repo_path, rev_range=None):
+    """Get all commits from a repo (or from `rev_range` only)"""
     fmt = "%H||%an||%ad||%s"
-    out = run(["git", "log", "--date=iso", "--pretty=format:" + fmt], cwd=repo_path)
+    out = run(["git", "log", "--date=iso", "--pretty=format:" + fmt] + ([rev_range] if rev_range else []), cwd=repo_path)
     for line in out.splitlines():
         if not line.strip():
             continue
@@ -82,16 +222,141 @@ def git_diff_stats(commit_hash, repo_path):
         files = [x.strip() for x in out.splitlines() if x.strip()]
     except subprocess.CalledProcessError:
         files = []
-    return files[:30]  # cap for performance
+    return files[:MAX_FILES]  # cap for performance
+
+
+def git_log_stream(repo_path, rev_range=None, chunk_size=STREAM_CHUNK):
+    """Stream commits with their changed files from a single `git log` pipe.
+
+    Each record starts with an RS byte, header fields are separated by US and
+    file names by NUL (`-z`), so any subject or path parses unambiguously.
+    `--cc` mirrors the merge-commit file list that `git show` reports.
+    """
+    cmd = ["git", "log", "--cc", "--name-only", "-z", "--date=iso",
+           "--pretty=format:%x1e%H%x1f%an%x1f%ad%x1f%s"] + ([rev_range] if rev_range else [])
+    proc = subprocess.Popen(cmd, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    commit = None
+    finished = False
+    try:
+        for token in _split_stream(proc.stdout, b"\0", chunk_size):
+            if token.startswith(b"\x1e"):
+                if commit is not None:
+                    yield commit
+                commit = _parse_log_header(token[1:].decode("utf-8", "replace"))
+            elif commit is not None and len(commit["files"]) < MAX_FILES:
+                name = token.decode("utf-8", "replace").strip()
+                if name:
+                    commit["files"].append(name)
+        if commit is not None:
+            yield commit
+        finished = True
+    finally:
+        if not finished:
+            proc.kill()  # consumer stopped early
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        if proc.wait() != 0 and finished:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr.decode("utf-8", "replace"))
+
+
+def _split_stream(stream, sep: bytes, chunk_size: int):
+    """Yield `sep`-delimited tokens from a binary stream, reading fixed-size chunks"""
+    tail = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        tokens = (tail + chunk).split(sep)
+        tail = tokens.pop()
+        yield from tokens
+    if tail:
+        yield tail
+
+
+def _parse_log_header(text: str):
+    """Parse `hash US author US date US subject [LF first-file]` into a commit dict"""
+    header, _, first_file = text.partition("\n")
+    parts = header.split("\x1f", 3)
+    if len(parts) != 4:
+        return None
+    h, a, d, s = parts
+    commit = {"hash": h, "author": a, "date": d, "subject": s, "files": []}
+    if first_file.strip():
+        commit["files"].append(first_file.strip())
+    return commit
+
+
+def iter_commits(repo_path, stream: bool = True, rev_range=None):
+    """Yield commits with their `files` list, streamed or one `git show` per commit"""
+    if stream:
+        yield from git_log_stream(repo_path, rev_range)
+        return
+    for c in git_commits(repo_path, rev_range):
+        c["files"] = git_diff_stats(c["hash"], repo_path)
+        yield c
+
+
+def git_head(repo_path) -> str:
+    """Resolve the current HEAD commit of a repo"""
+    return run(["git", "rev-parse", "HEAD"], cwd=repo_path).strip()
+
+
+def git_has_commit(repo_path, commit_hash: str) -> bool:
+    """Check that a commit still exists (it may be gone after a history rewrite)"""
+    r = subprocess.run(["git", "cat-file", "-e", commit_hash + "^{commit}"], cwd=repo_path, capture_output=True)
+    return r.returncode == 0
+
+
+def load_state() -> Dict:
+    """Load per-repo high-water marks from the state file"""
+    try:
+        with STATE.open("r", encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = {}
+    state.setdefault("repos", {})
+    return state
+
+
+def save_state(state: Dict):
+    """Write the state file atomically so an interrupted run never corrupts it"""
+    tmp = STATE.with_name(STATE.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, STATE)
+
+
+def plan_range(repo_path: pathlib.Path, entry: Dict):
+    """Work out what to walk for one repo: returns (base, tip, already_done).
+
+    A `pending` checkpoint pins the tip of an interrupted run, so the range
+    `base..tip` lists the same commits in the same order and the first
+    `done` of them can be skipped. Otherwise walk from the recorded `head`.
+    """
+    pending = entry.get("pending")
+    if pending and git_has_commit(repo_path, pending["tip"]):
+        base = pending.get("base")
+        if not base or git_has_commit(repo_path, base):
+            return base, pending["tip"], pending["done"]
+    base = entry.get("head")
+    if base and not git_has_commit(repo_path, base):
+        print(f"  ⚠️  Last processed commit {base[:8]} is gone (history rewritten?), walking full history "
+              f"(cards already in the KB are skipped)")
+        base = None
+    return base, git_head(repo_path), 0
 
 
 def tags_for(text: str, files: List[str]) -> List[str]:
     """Extract relevant tags from commit text and files"""
-    tags = set()
-    
-    for name, rx in RE_TOOLS:
-        if rx.search(text) or any(rx.search(f) for f in files):
-            tags.add(name)
+    found = CLASSIFIER.scan(SEP.join([text] + files), CLASSIFIER.kinds["tool"])
+    return tags_from(found, files)
+
+
+def tags_from(found: int, files: List[str]) -> List[str]:
+    """Tags for a commit given its CLASSIFIER.scan() result and changed files"""
+    tags = set(CLASSIFIER.names(found, "tool"))
     
     if any(f.endswith((".spec.ts", ".test.ts", ".test.js", ".spec.py")) for f in files):
         tags.add("tests")
@@ -111,104 +376,218 @@ def tags_for(text: str, files: List[str]) -> List[str]:
     return sorted(tags)
 
 
-def emit(obj: Dict):
-    """Append a JSONL line to the knowledge base"""
-    with KB.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+def cards_for_commit(c: Dict, repo_name: str) -> List[Dict]:
+    """Classify one commit and build its knowledge cards (pure, safe to run in a worker)"""
+    cards = []
+    files = c["files"]
+    text = f"{c['subject']} {' '.join(files)}"
+    ts = c["date"]
+    # `text` already holds every file name, so one scan covers the
+    # per-file tool checks as well as the mistake and pattern tables.
+    found = CLASSIFIER.scan(text)
+
+    base = {
+        "repo": [repo_name],
+        "commit": c["hash"][:8],
+        "author": c["author"],
+        "when": ts,
+        "tags": tags_from(found, files)
+    }
+
+    is_fix = RE_FIXES.search(c["subject"])
+    mistake_type = next(iter(CLASSIFIER.names(found, "mistake")), None)
+
+    if is_fix or mistake_type:
+        cards.append({
+            **base,
+            "type": "MISTAKE",
+            "id": f"m.{repo_name}.{c['hash'][:8]}",
+            "symptom": c["subject"],
+            "root_cause": mistake_type or "TBD",
+            "wrong_steps": [],
+            "fix_steps": [f"See commit {c['hash'][:8]} for implementation"],
+            "evidence": {"commit": c["hash"][:8], "files": files[:5]},
+        })
+    
+    if RE_REVERT.search(c["subject"]) or "decision:" in c["subject"].lower():
+        cards.append({
+            **base,
+            "type": "DECISION",
+            "id": f"d.{repo_name}.{c['hash'][:8]}",
+            "question": c["subject"],
+            "options": [],
+            "decision": "Reverted or changed approach",
+            "reason": "See commit for details",
+        })
+    
+    pat_name = next(iter(CLASSIFIER.names(found, "pattern")), None)
+    if pat_name:  # Only one pattern per commit
+        cards.append({
+            **base,
+            "type": "PATTERN",
+            "id": f"pat.{pat_name}.{repo_name}.{c['hash'][:6]}",
+            "name": pat_name,
+            "when": "Observed in code changes",
+            "steps": [f"Implementation in {c['hash'][:8]}"],
+            "files": files[:3],
+        })
+    
+    tname = CLASSIFIER.first(c["subject"], "tool")  # Only if mentioned in subject line
+    if tname:
+        cards.append({
+            **base,
+            "type": "TOOL",
+            "id": f"t.{tname}.{repo_name}.{c['hash'][:6]}",
+            "name": tname,
+            "context": c["subject"],
+            "correct_usage": "See commit for implementation",
+            "pitfalls": [],
+        })
+    
+    return cards
+
+
+def classify_chunk(repo_name: str, commits: List[Dict]) -> List[Dict]:
+    """Build the cards for a chunk of commits, in commit order"""
+    cards = []
+    for c in commits:
+        cards.extend(cards_for_commit(c, repo_name))
+    return cards
 
 
-def extract_from_repo(repo_path: pathlib.Path):
+def iter_chunks(commits, size: int, skip: int = 0):
+    """Group commits into lists of `size`, yielding (commits done after chunk, chunk)"""
+    chunk = []
+    done = skip
+    for i, c in enumerate(commits, 1):
+        if i <= skip:
+            continue
+        chunk.append(c)
+        if len(chunk) == size:
+            done += len(chunk)
+            yield done, chunk
+            chunk = []
+    if chunk:
+        yield done + len(chunk), chunk
+
+
+def extract_from_repo(repo_path: pathlib.Path, stream: bool = True, state: Dict = None,
+                      checkpoint_every: int = CHECKPOINT_EVERY, writer: KBWriter = None):
     """Extract knowledge cards from a single repository"""
-    repo_name = repo_path.name
-    print(f"📖 Extracting from {repo_name}...")
+    return extract_repos([repo_path], stream=stream, state=state, checkpoint_every=checkpoint_every,
+                         writer=writer)
+
+
+def extract_repos(repo_paths: List[pathlib.Path], stream: bool = True, state: Dict = None,
+                  checkpoint_every: int = CHECKPOINT_EVERY, jobs: int = 1, writer: KBWriter = None):
+    """Extract knowledge cards from several repositories.
+
+    Commits are classified in chunks of `checkpoint_every`. With `jobs > 1`
+    the chunks of every repo are fanned out to a process pool while this
+    process stays the single writer: results are emitted strictly in
+    submission order, so the KB is byte-identical to a serial run.
+
+    With a `state` dict only commits after each repo's high-water mark are
+    walked. Every emitted chunk is committed to the KB before the state is
+    checkpointed, so the two never disagree by more than one chunk.
+    """
+    if writer is None:
+        with KBWriter(KB, batch_size=None, on_duplicate=SKIP) as writer:
+            return extract_repos(repo_paths, stream=stream, state=state, checkpoint_every=checkpoint_every,
+                                 jobs=jobs, writer=writer)
     
-    commit_count = 0
-    card_count = 0
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    in_flight = deque()
+    total_commits = 0
+    total_cards = 0
     
-    for c in git_commits(repo_path):
-        commit_count += 1
-        files = git_diff_stats(c["hash"], repo_path)
-        text = f"{c['subject']} {' '.join(files)}"
-        ts = c["date"]
-        
-        base = {
-            "repo": [repo_name],
-            "commit": c["hash"][:8],
-            "author": c["author"],
-            "when": ts,
-            "tags": tags_for(text, files)
-        }
-        
-        is_fix = RE_FIXES.search(c["subject"])
-        mistake_type = None
-        for mtype, rx in RE_MISTAKE:
-            if rx.search(text):
-                mistake_type = mtype
-                break
-        
-        if is_fix or mistake_type:
-            emit({
-                **base,
-                "type": "MISTAKE",
-                "id": f"m.{repo_name}.{c['hash'][:8]}",
-                "symptom": c["subject"],
-                "root_cause": mistake_type or "TBD",
-                "wrong_steps": [],
-                "fix_steps": [f"See commit {c['hash'][:8]} for implementation"],
-                "evidence": {"commit": c["hash"][:8], "files": files[:5]},
-            })
-            card_count += 1
-        
-        if RE_REVERT.search(c["subject"]) or "decision:" in c["subject"].lower():
-            emit({
-                **base,
-                "type": "DECISION",
-                "id": f"d.{repo_name}.{c['hash'][:8]}",
-                "question": c["subject"],
-                "options": [],
-                "decision": "Reverted or changed approach",
-                "reason": "See commit for details",
-            })
-            card_count += 1
-        
-        for pat_name, rx in RE_PATTERN:
-            if rx.search(text):
-                emit({
-                    **base,
-                    "type": "PATTERN",
-                    "id": f"pat.{pat_name}.{repo_name}.{c['hash'][:6]}",
-                    "name": pat_name,
-                    "when": "Observed in code changes",
-                    "steps": [f"Implementation in {c['hash'][:8]}"],
-                    "files": files[:3],
-                })
-                card_count += 1
-                break  # Only one pattern per commit
-        
-        for tname, rx in RE_TOOLS:
-            if rx.search(c["subject"]):  # Only if mentioned in subject line
-                emit({
-                    **base,
-                    "type": "TOOL",
-                    "id": f"t.{tname}.{repo_name}.{c['hash'][:6]}",
-                    "name": tname,
-                    "context": c["subject"],
-                    "correct_usage": "See commit for implementation",
-                    "pitfalls": [],
-                })
-                card_count += 1
-                break
+    def drain(job):
+        nonlocal total_commits, total_cards
+        repo, done, chunk, result = job
+        if chunk is None:  # end of this repo's stream
+            if state is not None:
+                repo["entry"]["head"] = repo["tip"]
+                repo["entry"].pop("pending", None)
+                save_state(state)
+            already = f" ({repo['skipped']} already in KB)" if repo["skipped"] else ""
+            print(f"  ✅ {repo['name']}: {repo['commits']} commits → {repo['cards']} knowledge cards{already}")
+            return
+        cards = result.result() if pool else result
+        written = sum(1 for card in cards if writer.write(card) != SKIPPED)
+        writer.commit()
+        repo["commits"] += len(chunk)
+        repo["cards"] += written
+        repo["skipped"] += len(cards) - written
+        total_commits += len(chunk)
+        total_cards += written
+        if state is not None:
+            repo["entry"]["pending"] = {"base": repo["since"], "tip": repo["tip"], "done": done}
+            save_state(state)
+    
+    try:
+        for repo_path in repo_paths:
+            repo = {"name": repo_path.name, "commits": 0, "cards": 0, "skipped": 0}
+            print(f"📖 Extracting from {repo['name']}...")
+            
+            rev_range = None
+            skip = 0
+            if state is not None:
+                repo["entry"] = state["repos"].setdefault(repo["name"], {})
+                repo["since"], repo["tip"], skip = plan_range(repo_path, repo["entry"])
+                if repo["since"] == repo["tip"]:
+                    print("  ✅ Up to date")
+                    continue
+                rev_range = f"{repo['since']}..{repo['tip']}" if repo["since"] else repo["tip"]
+                if skip:
+                    print(f"  ↩️  Resuming interrupted run after {skip} commits")
+            
+            commits = iter_commits(repo_path, stream=stream, rev_range=rev_range)
+            for done, chunk in iter_chunks(commits, checkpoint_every, skip):
+                if pool:
+                    result = pool.submit(classify_chunk, repo["name"], chunk)
+                else:
+                    result = classify_chunk(repo["name"], chunk)
+                in_flight.append((repo, done, chunk, result))
+                while len(in_flight) > (jobs * 2 if pool else 0):
+                    drain(in_flight.popleft())
+            in_flight.append((repo, None, None, None))
+            if not pool:
+                drain(in_flight.popleft())
+        while in_flight:
+            drain(in_flight.popleft())
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
     
-    print(f"  ✅ {commit_count} commits → {card_count} knowledge cards")
-    return commit_count, card_count
+    return total_commits, total_cards
 
 
 def main():
     """Main extraction pipeline"""
-    os.makedirs(KB.parent, exist_ok=True)
+    parser = argparse.ArgumentParser(description="Extract knowledge cards from git history")
+    parser.add_argument("--per-commit", action="store_true",
+                        help="Run one `git show` per commit instead of streaming a single `git log`")
+    parser.add_argument("--full", action="store_true",
+                        help=f"Reset the high-water marks in {STATE.name} and walk the whole history; "
+                             "cards already in the KB are replaced in place, not added again")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY,
+                        help=f"Commits between state checkpoints (default: {CHECKPOINT_EVERY})")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes for classifying commit chunks across repos (default: 1)")
+    parser.add_argument("--no-fsync", action="store_true",
+                        help="Skip fsync on each KB commit (faster, not crash-safe)")
+    args = parser.parse_args()
     
-    if not KB.exists() or KB.stat().st_size == 0:
-        emit({
+    # A commit walked again yields the same card IDs: skip them, or on --full rebuild them in place
+    on_duplicate = UPDATE if args.full else SKIP
+    with KBWriter(KB, batch_size=None, fsync=not args.no_fsync, on_duplicate=on_duplicate) as kb:
+        run_pipeline(args, kb)
+
+
+def run_pipeline(args, kb: KBWriter):
+    """Write the META header if needed, then extract every target repo into `kb`"""
+    if kb.is_empty():
+        kb.write({
             "type": "META",
             "id": "kb.v1",
             "created": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC"),
@@ -217,6 +596,7 @@ def main():
             "total_commits": 0,
             "total_cards": 0
         })
+        kb.commit()
         print("📝 Created new knowledge base")
     
     repos_dir = ROOT / "repos"
@@ -226,21 +606,26 @@ def main():
         sys.exit(1)
     
     target_repos = ["cortexcoach-ai", "STUDY-AI", "Study-Ai-fix"]
-    total_commits = 0
-    total_cards = 0
-    
+    state = load_state()
+    if args.full:
+        for repo_name in target_repos:
+            state["repos"].pop(repo_name, None)
+    repo_paths = []
     for repo_name in target_repos:
         repo_path = repos_dir / repo_name
         if repo_path.exists() and (repo_path / ".git").exists():
-            commits, cards = extract_from_repo(repo_path)
-            total_commits += commits
-            total_cards += cards
+            repo_paths.append(repo_path)
         else:
             print(f"⚠️  Skipping {repo_name} (not found or not a git repo)")
     
+    total_commits, total_cards = extract_repos(repo_paths, stream=not args.per_commit, state=state,
+                                               checkpoint_every=args.checkpoint_every, jobs=args.jobs, writer=kb)
+    
     print(f"\n🎉 Extraction complete!")
     print(f"   Total commits processed: {total_commits}")
     print(f"   Total knowledge cards: {total_cards}")
+    if kb.skipped:
+        print(f"   Cards already in KB (skipped): {kb.skipped}")
     print(f"   Knowledge base: {KB}")
 
 
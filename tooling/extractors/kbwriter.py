@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Buffered, Atomic Knowledge Base Writer
+Shared by git2kb.py and pr2kb.py to append cards to knowledge.jsonl.
+
+Cards are buffered in memory and written in batches, one write() and one
+fsync per commit instead of an open/close per card. A batch of new cards is
+appended to the KB in place, so a commit costs the size of the batch, not
+of the KB. If the append fails the KB is truncated back to where it was,
+and a crash in the middle of one leaves at most a torn last line, which
+the next writer cuts off when it opens the KB. Only a commit that
+replaces cards (UPDATE, below) rewrites the file: it copies the KB to a
+temp file next to it with those cards swapped, appends the batch, fsyncs
+and renames the temp file over the KB. An exclusive lock on `<kb>.lock` is
+held for the writer's lifetime, so two extractors running at once take
+turns instead of interleaving their lines.
+
+With an `on_duplicate` policy the IDs already in the KB are read once,
+right after the lock is taken, into a set, and every card is checked
+against it (and against the cards buffered so far) before it is
+buffered: SKIP drops a card whose ID is known, UPDATE replaces the known
+card in place at the next commit, so re-running an extractor leaves the
+KB the same size.
+
+Usage:
+    with KBWriter(KB, batch_size=500) as kb:
+        kb.write(card)
+        kb.commit()  # optional: force a durable checkpoint
+
+    with KBWriter(KB, on_duplicate=SKIP) as kb:
+        if kb.write(card) == SKIPPED: ...
+"""
+
+import json
+import os
+import pathlib
+import re
+import shutil
+import sys
+from typing import Dict, List, Optional, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking
+    fcntl = None
+
+DEFAULT_BATCH = 1000  # cards buffered before an automatic commit
+
+# What to do with a card whose ID is already in the KB
+APPEND = "append"  # write it anyway (no ID check)
+SKIP = "skip"      # keep the card in the KB
+UPDATE = "update"  # replace the card in the KB with the new one
+POLICIES = (SKIP, UPDATE, APPEND)
+
+# What write() did with a card
+ADDED = "added"
+UPDATED = "updated"
+SKIPPED = "skipped"
+
+RE_ID_MEMBER = re.compile(r'"id"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+
+class KBWriter:
+    """Append JSONL cards to a knowledge base in atomic, locked batches.
+
+    `batch_size` cards trigger an automatic commit; `None` means cards are
+    only committed by explicit `commit()` calls (and on a clean close).
+    Leaving the `with` block through an exception drops the uncommitted
+    buffer, so the KB only ever holds batches the caller committed.
+    `on_duplicate` (SKIP or UPDATE) turns on the ID check; APPEND writes
+    every card as it comes.
+    """
+
+    def __init__(self, path: pathlib.Path, batch_size: Optional[int] = DEFAULT_BATCH, fsync: bool = True,
+                 on_duplicate: str = APPEND):
+        self.path = pathlib.Path(path)
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.on_duplicate = on_duplicate
+        self.written = 0  # cards committed by this writer (updates included)
+        self.skipped = 0  # cards dropped as duplicates
+        self._buffer: List[str] = []
+        self._ids: Optional[Set[str]] = None  # IDs committed to the KB, when checking
+        self._pending: Dict[str, int] = {}  # ID -> index in _buffer of a new card
+        self._updates: Dict[str, str] = {}  # ID -> line replacing a committed card
+        self._lock_file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._buffer.clear()
+            self._pending.clear()
+            self._updates.clear()
+            self._unlock()
+        return False
+
+    def open(self):
+        """Create the KB directory, take the writer lock and cut off a torn last line"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.path.with_name(self.path.name + ".lock"), "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                print(f"⏳ Waiting for another writer to release {self.path.name}...", file=sys.stderr)
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        _repair_tail(self.path)
+        if self.on_duplicate != APPEND:
+            self._ids = read_ids(self.path)  # under the lock: no other writer can change it now
+
+    def is_empty(self) -> bool:
+        """True if the KB has no committed and no buffered cards"""
+        return not self._buffer and (not self.path.exists() or self.path.stat().st_size == 0)
+
+    def write(self, obj: Dict) -> str:
+        """Buffer one card, committing when the batch is full; returns ADDED, UPDATED or SKIPPED"""
+        line = json.dumps(obj, ensure_ascii=False) + "\n"
+        card_id = obj.get("id") if self._ids is not None else None
+        outcome = ADDED
+        if not isinstance(card_id, str):
+            self._buffer.append(line)
+        elif card_id in self._pending or card_id in self._ids:
+            if self.on_duplicate == SKIP:
+                self.skipped += 1
+                return SKIPPED
+            if card_id in self._pending:
+                self._buffer[self._pending[card_id]] = line
+            else:
+                self._updates[card_id] = line
+            outcome = UPDATED
+        else:
+            self._pending[card_id] = len(self._buffer)
+            self._buffer.append(line)
+        if self.batch_size and len(self._buffer) + len(self._updates) >= self.batch_size:
+            self.commit()
+        return outcome
+
+    def commit(self):
+        """Publish the buffered cards: append them, or rewrite the KB when committed cards are replaced"""
+        if not self._buffer and not self._updates:
+            return
+        if self._updates:
+            self._rewrite()
+        else:
+            self._append()
+        self.written += len(self._buffer) + len(self._updates)
+        self._buffer.clear()
+        self._updates.clear()
+        if self._ids is not None:
+            self._ids.update(self._pending)
+            self._pending.clear()
+
+    def _append(self):
+        """Append the batch in place and fsync; on failure truncate back to the committed end"""
+        created = not self.path.exists()
+        with open(self.path, "ab") as f:
+            end = f.tell()
+            try:
+                f.write("".join(self._buffer).encode("utf-8"))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(end)
+                raise
+        if created and self.fsync:
+            _fsync_dir(self.path.parent)
+
+    def _rewrite(self):
+        """Copy KB → temp with the updated cards replaced, append the batch, fsync, rename over the KB"""
+        tmp = self.path.with_name(f"{self.path.name}.tmp.{os.getpid()}")
+        try:
+            if self.path.exists():
+                _copy_replacing(self.path, tmp, self._updates)
+                shutil.copymode(self.path, tmp)
+            with tmp.open("a", encoding="utf-8") as f:
+                f.write("".join(self._buffer))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        if self.fsync:
+            _fsync_dir(self.path.parent)
+
+    def close(self):
+        """Commit what is buffered and release the lock"""
+        try:
+            self.commit()
+        finally:
+            self._unlock()
+
+    def _unlock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # closing the descriptor drops the flock
+            self._lock_file = None
+
+
+def _card_id(line: str) -> Optional[str]:
+    try:
+        card = json.loads(line)
+    except ValueError:
+        return None
+    card_id = card.get("id") if isinstance(card, dict) else None
+    return card_id if isinstance(card_id, str) else None
+
+
+def read_ids(path: pathlib.Path) -> Set[str]:
+    """Every card ID in a KB, read in one pass (empty if there is no KB yet)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {card_id for card_id in map(_card_id, f) if card_id is not None}
+    except FileNotFoundError:
+        return set()
+
+
+def _json_string(literal: str) -> Optional[str]:
+    """A JSON string literal's value (None for a malformed escape)"""
+    try:
+        return json.loads(literal)
+    except ValueError:
+        return None
+
+
+def _copy_replacing(src: pathlib.Path, dst: pathlib.Path, updates: Dict[str, str]):
+    """Copy a KB line by line, swapping in `updates[id]` for each card with that ID.
+
+    Only lines with an `"id": "<one of them>"` member somewhere are parsed whole.
+    """
+    with open(src, "r", encoding="utf-8") as fin, open(dst, "w", encoding="utf-8") as fout:
+        for line in fin:
+            if any(_json_string(value) in updates for value in RE_ID_MEMBER.findall(line)):
+                card_id = _card_id(line)
+                if card_id in updates:
+                    line = updates[card_id]
+            fout.write(line)
+
+
+def _repair_tail(path: pathlib.Path):
+    """Cut off a last line without its newline, left by a crash in the middle of an append.
+
+    A last line that is a whole JSON value (written by hand, without the
+    final newline) is kept and gets its newline instead.
+    """
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        start = size
+        while start > 0:  # back to the start of the last line, a block at a time
+            block = min(start, 1 << 16)
+            f.seek(start - block)
+            newline = f.read(block).rfind(b"\n")
+            if newline >= 0:
+                start = start - block + newline + 1
+                break
+            start -= block
+        f.seek(start)
+        tail = f.read()
+        try:
+            json.loads(tail)
+        except ValueError:
+            print(f"⚠️  Dropping a torn last line ({len(tail)} bytes) from {path.name}", file=sys.stderr)
+            f.truncate(start)
+        else:
+            f.write(b"\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path: pathlib.Path):
+    """Make a rename in `path` durable (no-op where directories can't be opened)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -3,23 +3,60 @@
 GitHub PR → Knowledge Base Extractor
 Extracts knowledge cards from merged PRs using GitHub CLI.
 
+PRs are fetched a page at a time (`gh api .../pulls`, newest first) on a
+small thread pool, so the next pages download while the current one is
+processed, and only one page is held in memory. After each page the KB is
+committed and every PR's JSON, as gh returned it, is cached under
+`pr2kb.cache/<repo>/<number>.json` next to the KB. A cached PR counts as
+processed: re-runs and `--stdin` replays skip it, so a large `--limit`
+can backfill history across several runs. `--from-cache` replays the
+cache offline (e.g. after the extraction rules changed); as the records
+are kept raw, a replay also picks up fields a later version reads.
+
+The KB's card IDs are read into a set once at startup (kbwriter), and a
+card whose ID is already there is skipped, or with `--on-duplicate update`
+replaces the old card, so repeated runs leave the KB the same size.
+
+The CLI is run as $PR2KB_GH (default `gh`), so the fetch layer can be
+pointed at a local stand-in that answers `api <path>` with JSON
+(tooling/benchmarks/fake_gh.py, used by bench_pr2kb.py).
+
 Usage:
     python3 ai_manual/tooling/extractors/pr2kb.py --limit 50
+    python3 ai_manual/tooling/extractors/pr2kb.py --limit 5000 --jobs 4   # backfill
+    python3 ai_manual/tooling/extractors/pr2kb.py --from-cache --on-duplicate update
     
     gh pr list --state merged --limit 50 --json number,title,author,body,labels,mergedAt,closedAt | python3 pr2kb.py --stdin
+    gh api --paginate 'repos/{owner}/{repo}/pulls?state=closed' | python3 pr2kb.py --stdin
 """
 
 import json
+import os
+import shlex
 import subprocess
 import sys
 import pathlib
 import re
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from kbwriter import KBWriter, DEFAULT_BATCH, POLICIES, SKIP, SKIPPED, UPDATED
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "dev_bibles"))
+
+from biblelib.fences import MAX_SCAN, card_lines  # noqa: E402
 
 ROOT = pathlib.Path(__file__).resolve().parents[3]
 KB = ROOT / "ai_manual" / "kb" / "knowledge.jsonl"
+CACHE = KB.parent / "pr2kb.cache"  # raw PR JSON per repo, one file per processed PR
+
+GH = os.environ.get("PR2KB_GH", "gh")  # the GitHub CLI, or a stand-in for testing
+PER_PAGE = 100  # PRs per page (GitHub's maximum)
+FETCH_JOBS = 2  # pages fetched at once
+STREAM_CHUNK = 1 << 16  # characters read per stdin read
 
 RE_MISTAKE_ID = re.compile(r'm\.[\w\-\.]+', re.I)
 RE_PATTERN_ID = re.compile(r'pat\.[\w\-\.]+', re.I)
@@ -27,14 +64,12 @@ RE_CONTRACT_ID = re.compile(r'contract\.[\w\-\.]+', re.I)
 RE_ROOT_CAUSE = re.compile(r'(?:root cause|cause):\s*(.+?)(?:\n|$)', re.I | re.DOTALL)
 RE_FIX_STEPS = re.compile(r'(?:fix steps?|steps?|solution):\s*(.+?)(?:\n\n|$)', re.I | re.DOTALL)
 
-RE_JSONL_BLOCK = re.compile(r'```(?:json|jsonl)\s*\n(.*?)\n```', re.DOTALL | re.I)
-
 
 def run_gh_command(args: List[str]) -> str:
     """Run GitHub CLI command and return output"""
     try:
         result = subprocess.run(
-            ["gh"] + args,
+            shlex.split(GH) + args,
             capture_output=True,
             text=True,
             check=True
@@ -49,30 +84,148 @@ def run_gh_command(args: List[str]) -> str:
         sys.exit(1)
 
 
-def emit(obj: Dict):
-    """Append a JSONL line to knowledge base"""
-    with KB.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+def fetch_page(page: int, per_page: int = PER_PAGE) -> List[Dict]:
+    """One page of the repo's closed PRs, newest first, as the REST API returns them"""
+    output = run_gh_command([
+        'api',
+        f'repos/{{owner}}/{{repo}}/pulls?state=closed&sort=created&direction=desc&per_page={per_page}&page={page}'
+    ])
+    return json.loads(output)
+
+
+def iter_pages(limit: int, jobs: int = FETCH_JOBS, per_page: int = PER_PAGE) -> Iterator[List[Dict]]:
+    """Yield the newest `limit` merged PRs page by page, keeping `jobs` pages in flight.
+
+    A page shorter than `per_page` is the last one; pages requested past it
+    are dropped.
+    """
+    pool = ThreadPoolExecutor(max_workers=jobs)
+    in_flight = deque(pool.submit(fetch_page, page, per_page) for page in range(1, jobs + 1))
+    next_page = jobs + 1
+    try:
+        while in_flight and limit > 0:
+            raw = in_flight.popleft().result()
+            merged = [pr for pr in raw if is_merged(pr)][:limit]
+            limit -= len(merged)
+            if len(raw) < per_page or limit <= 0:
+                in_flight.clear()
+            else:
+                in_flight.append(pool.submit(fetch_page, next_page, per_page))
+                next_page += 1
+            yield merged
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def is_merged(pr: Dict) -> bool:
+    """False for a closed-unmerged REST record; `gh pr list --state merged` output is all merged"""
+    return 'user' not in pr or bool(pr.get('merged_at'))
+
+
+def normalize_pr(pr: Dict) -> Dict:
+    """A PR in the shape `gh pr list --json` prints (REST API records are converted)"""
+    if 'user' not in pr:
+        return pr
+    return {
+        'number': pr['number'],
+        'title': pr.get('title') or '',
+        'author': {'login': (pr.get('user') or {}).get('login', 'unknown')},
+        'body': pr.get('body') or '',
+        'labels': [{'name': lbl.get('name', '')} for lbl in pr.get('labels') or []],
+        'mergedAt': pr.get('merged_at') or '',
+        'closedAt': pr.get('closed_at') or '',
+    }
+
+
+def iter_json_array(stream, chunk_size: int = STREAM_CHUNK) -> Iterator:
+    """Yield the elements of a JSON array read from `stream`, without loading it whole.
+
+    Several arrays back to back (what `gh api --paginate` prints) read as one.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, more, in_array = "", 0, True, False
+    while True:
+        while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ',')):
+            pos += 1
+        if pos == len(buf):
+            if not more:
+                if in_array:
+                    raise ValueError("unterminated JSON array")
+                return
+            buf, pos = stream.read(chunk_size), 0
+            more = bool(buf)
+            continue
+        if not in_array:
+            if buf[pos] != '[':
+                raise ValueError(f"expected a JSON array of PRs, found {buf[pos]!r}")
+            in_array = True
+            pos += 1
+            continue
+        if buf[pos] == ']':
+            in_array = False
+            pos += 1
+            continue
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if not more:
+                raise
+            end = len(buf)
+        if end == len(buf) and more:  # the element may go on in the next chunk
+            # Read at least as much again as is pending: an element spanning many
+            # chunks is decoded over a doubling buffer, so O(its size) in all,
+            # instead of once more per chunk (quadratic).
+            chunk = stream.read(max(chunk_size, len(buf) - pos))
+            buf, pos, more = buf[pos:] + chunk, 0, bool(chunk)
+            continue
+        pos = end
+        yield value
+
+
+def iter_batches(items: Iterable[Dict], size: int = PER_PAGE) -> Iterator[List[Dict]]:
+    """Group PRs into pages of `size`"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def cached_numbers(cache_dir: pathlib.Path) -> Set[int]:
+    """Numbers of the PRs already processed into the KB"""
+    return {int(p.stem) for p in cache_dir.glob('*.json') if p.stem.isdigit()}
+
+
+def iter_cached(cache_dir: pathlib.Path) -> Iterator[Dict]:
+    """The cached PRs, raw, in PR order, so with UPDATE the newest PR's card wins"""
+    for number in sorted(cached_numbers(cache_dir)):
+        with open(cache_dir / f"{number}.json", 'r', encoding='utf-8') as f:
+            yield json.load(f)
+
+
+def cache_pr(cache_dir: pathlib.Path, pr: Dict):
+    """Store a processed PR's raw JSON atomically, marking it done"""
+    path = cache_dir / f"{pr['number']}.json"
+    tmp = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+    with tmp.open('w', encoding='utf-8') as f:
+        json.dump(pr, f, ensure_ascii=False)
+    os.replace(tmp, path)
 
 
 def extract_jsonl_from_body(body: str) -> List[Dict]:
     """Extract JSONL knowledge cards from PR body"""
     cards = []
     
-    matches = RE_JSONL_BLOCK.findall(body)
-    
-    for block in matches:
-        for line in block.split('\n'):
-            line = line.strip()
-            if not line or line.startswith('//') or line.startswith('#'):
-                continue
-            
-            try:
-                card = json.loads(line)
-                if 'type' in card and 'id' in card:
-                    cards.append(card)
-            except json.JSONDecodeError:
-                continue
+    for line in card_lines(body):
+        try:
+            card = json.loads(line)
+            if isinstance(card, dict) and 'type' in card and 'id' in card:
+                cards.append(card)
+        except json.JSONDecodeError:
+            continue
     
     return cards
 
@@ -81,6 +234,7 @@ def extract_metadata_from_body(body: str, pr_number: int) -> Optional[Dict]:
     """Extract structured metadata from PR body (fallback if no JSONL)"""
     if not body:
         return None
+    body = body[:MAX_SCAN]  # the same bound as the card scan: a bot's log is not read past it
     
     is_bug_fix = any(kw in body.lower() for kw in ['fix', 'bug', 'hotfix', 'patch'])
     
@@ -108,7 +262,17 @@ def extract_metadata_from_body(body: str, pr_number: int) -> Optional[Dict]:
     return None
 
 
-def process_pr(pr: Dict, repo_name: str) -> int:
+def emit(writer: KBWriter, card: Dict, message: str) -> int:
+    """Write one card and report what became of it; returns 1 if it went into the KB"""
+    outcome = writer.write(card)
+    if outcome == SKIPPED:
+        print(f"  ⏭️  Already in KB: {card['id']}")
+        return 0
+    print(f"  ✅ {message}" + (" (updated)" if outcome == UPDATED else ""))
+    return 1
+
+
+def process_pr(pr: Dict, repo_name: str, writer: KBWriter) -> int:
     """Process a single PR and extract knowledge cards"""
     pr_number = pr['number']
     title = pr['title']
@@ -128,11 +292,9 @@ def process_pr(pr: Dict, repo_name: str) -> int:
         card['evidence']['pr'] = pr_number
         card['evidence']['pr_title'] = title
         
-        emit(card)
-        card_count += 1
-        print(f"  ✅ Extracted {card['type']} card: {card['id']}")
+        card_count += emit(writer, card, f"Extracted {card['type']} card: {card['id']}")
     
-    if card_count == 0:
+    if not jsonl_cards:
         metadata = extract_metadata_from_body(body, pr_number)
         
         if metadata and metadata.get('is_bug_fix'):
@@ -151,9 +313,7 @@ def process_pr(pr: Dict, repo_name: str) -> int:
                 },
                 'tags': labels + ['pr-generated']
             }
-            emit(card)
-            card_count += 1
-            print(f"  ✅ Generated MISTAKE card from PR #{pr_number}")
+            card_count += emit(writer, card, f"Generated MISTAKE card from PR #{pr_number}")
         
         elif 'enhancement' in labels or 'feature' in labels:
             card = {
@@ -165,13 +325,40 @@ def process_pr(pr: Dict, repo_name: str) -> int:
                 'evidence': {'pr': pr_number, 'merged_at': merged_at},
                 'tags': labels + ['pr-generated']
             }
-            emit(card)
-            card_count += 1
-            print(f"  ✅ Generated RUNBOOK card from PR #{pr_number}")
+            card_count += emit(writer, card, f"Generated RUNBOOK card from PR #{pr_number}")
     
     return card_count
 
 
+def extract_pages(pages: Iterable[List[Dict]], repo_name: str, writer: KBWriter,
+                  cache_dir: pathlib.Path, skip: Set[int]) -> Tuple[int, int, int]:
+    """Process PRs a page at a time; returns (PRs processed, PRs skipped, cards).
+
+    After each page the KB is committed and then its PRs are cached, so the
+    cache never lists a PR whose cards are not in the KB. Pages hold raw
+    records (REST or `gh pr list --json`); they are cached as they are and
+    normalized only to be processed. PRs in `skip` (and repeats within the
+    run) are passed over.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    processed = skipped = cards = 0
+    for page in pages:
+        done = []
+        for raw in page:
+            pr = normalize_pr(raw)
+            if pr['number'] in skip:
+                skipped += 1
+                continue
+            skip.add(pr['number'])
+            cards += process_pr(pr, repo_name, writer)
+            done.append(raw)
+        writer.commit()
+        for pr in done:
+            cache_pr(cache_dir, pr)
+        processed += len(done)
+    return processed, skipped, cards
+
+
 def get_repo_name() -> str:
     """Get current repo name from git"""
     try:
@@ -195,37 +382,46 @@ def main():
     parser = argparse.ArgumentParser(description='Extract knowledge from GitHub PRs')
     parser.add_argument('--limit', type=int, default=50, help='Number of PRs to fetch (default: 50)')
     parser.add_argument('--stdin', action='store_true', help='Read PR JSON from stdin instead of fetching')
+    parser.add_argument('--from-cache', action='store_true',
+                        help=f'Process every PR cached under {CACHE.name}/<repo>/ again, without fetching')
+    parser.add_argument('--reprocess', action='store_true',
+                        help='Process PRs again even if they are already cached')
+    parser.add_argument('--on-duplicate', choices=POLICIES, default=SKIP,
+                        help='Cards whose ID is already in the KB: skip them, update the KB copy, '
+                             'or append them anyway (default: skip)')
+    parser.add_argument('--jobs', '-j', type=int, default=FETCH_JOBS,
+                        help=f'Pages fetched at once (default: {FETCH_JOBS})')
     parser.add_argument('--repo', type=str, help='Repository name (auto-detected if not provided)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH,
+                        help=f'Cards buffered per atomic KB commit (default: {DEFAULT_BATCH})')
+    parser.add_argument('--no-fsync', action='store_true', help='Skip fsync on each KB commit (faster, not crash-safe)')
     args = parser.parse_args()
     
-    KB.parent.mkdir(parents=True, exist_ok=True)
-    
     repo_name = args.repo or get_repo_name()
     print(f"📖 Extracting knowledge from PRs in {repo_name}...")
     
+    cache_dir = CACHE / repo_name
     if args.stdin:
         print("📥 Reading PR data from stdin...")
-        pr_data = json.load(sys.stdin)
+        pages = iter_batches(pr for pr in iter_json_array(sys.stdin) if is_merged(pr))
+    elif args.from_cache:
+        print(f"📥 Replaying cached PRs from {cache_dir}...")
+        pages = iter_batches(iter_cached(cache_dir))
     else:
         print(f"📥 Fetching last {args.limit} merged PRs from GitHub...")
-        output = run_gh_command([
-            'pr', 'list',
-            '--state', 'merged',
-            '--limit', str(args.limit),
-            '--json', 'number,title,author,body,labels,mergedAt,closedAt'
-        ])
-        pr_data = json.loads(output)
-    
-    total_prs = len(pr_data)
-    total_cards = 0
+        pages = iter_pages(args.limit, jobs=args.jobs)
+    skip = set() if args.reprocess or args.from_cache else cached_numbers(cache_dir)
     
-    for pr in pr_data:
-        cards = process_pr(pr, repo_name)
-        total_cards += cards
+    with KBWriter(KB, batch_size=args.batch_size, fsync=not args.no_fsync, on_duplicate=args.on_duplicate) as kb:
+        total_prs, skipped, total_cards = extract_pages(pages, repo_name, kb, cache_dir, skip)
     
     print(f"\n🎉 Extraction complete!")
     print(f"   PRs processed: {total_prs}")
+    if skipped:
+        print(f"   Already processed (skipped): {skipped}")
     print(f"   Knowledge cards extracted: {total_cards}")
+    if kb.skipped:
+        print(f"   Cards already in KB (skipped): {kb.skipped}")
     print(f"   Knowledge base: {KB}")
 
 
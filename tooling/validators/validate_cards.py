@@ -11,18 +11,33 @@ Usage:
     
     echo "$PR_BODY" | python3 ai_manual/tooling/validators/validate_cards.py --stdin
 
+Batch mode validates many PR bodies in one process, on a worker pool with
+--jobs, and reports per PR as text, JSON or JUnit XML. --batch takes a
+directory (one body per file, named after the file) or a JSON array of
+bodies: strings, or objects with `body` and `number` as
+`gh pr list --json number,body` prints them (`-` reads it from stdin).
+
+    python3 ai_manual/tooling/validators/validate_cards.py --batch bodies/ --format junit -o cards.xml
+    gh pr list --json number,body | python3 validate_cards.py --batch - --jobs 4 --format json
+
 Exit codes:
-    0: Valid cards found
-    1: No cards or invalid cards
+    0: Valid cards found (batch: every PR passed)
+    1: No cards or invalid cards (batch: some PR failed)
     2: Error
 """
 
 import json
 import sys
-import re
 import argparse
 import os
-from typing import List, Dict, Tuple
+import pathlib
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Tuple
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "dev_bibles"))
+
+from biblelib import fences, schema  # noqa: E402
 
 GREEN = '\033[92m'
 RED = '\033[91m'
@@ -30,30 +45,19 @@ YELLOW = '\033[93m'
 BLUE = '\033[94m'
 RESET = '\033[0m'
 
-RE_JSONL_BLOCK = re.compile(r'```(?:json|jsonl)\s*\n(.*?)\n```', re.DOTALL | re.I)
-
-REQUIRED_FIELDS = {
-    'MISTAKE': ['type', 'id', 'symptom', 'root_cause', 'fix_steps', 'tags'],
-    'PATTERN': ['type', 'id', 'name', 'when', 'steps', 'tags'],
-    'DECISION': ['type', 'id', 'question', 'decision', 'reason', 'tags'],
-    'TOOL': ['type', 'id', 'name', 'tags'],
-    'RUNBOOK': ['type', 'id', 'title', 'steps', 'tags'],
+ISSUE_MESSAGES = {
+    schema.NOT_OBJECT: "Expected a JSON object, got {field}",
+    schema.MISSING: "Missing required field '{field}'",
+    schema.UNKNOWN_TYPE: "Unknown card type '{field}'",
+    schema.NOT_STRING: "Field '{field}' must be a string",
+    schema.NOT_LIST: "Field '{field}' must be a list",
+    schema.NOT_STRING_ITEMS: "Field '{field}' must be a list of strings",
 }
 
 
 def extract_cards_from_text(text: str) -> List[str]:
-    """Extract JSONL cards from markdown code blocks"""
-    cards = []
-    matches = RE_JSONL_BLOCK.findall(text)
-    
-    for block in matches:
-        for line in block.split('\n'):
-            line = line.strip()
-            if not line or line.startswith('//') or line.startswith('#'):
-                continue
-            cards.append(line)
-    
-    return cards
+    """Extract JSONL cards from markdown code blocks (biblelib.fences)"""
+    return list(fences.card_lines(text))
 
 
 def validate_card(card_json: str) -> Tuple[bool, str, Dict]:
@@ -63,37 +67,146 @@ def validate_card(card_json: str) -> Tuple[bool, str, Dict]:
     except json.JSONDecodeError as e:
         return False, f"Invalid JSON: {e.msg}", {}
     
-    if 'type' not in card:
-        return False, "Missing required field 'type'", card
-    if 'id' not in card:
-        return False, "Missing required field 'id'", card
-    
-    card_type = card['type']
-    
-    if card_type not in REQUIRED_FIELDS:
-        return False, f"Unknown card type '{card_type}'", card
-    
-    missing = []
-    for field in REQUIRED_FIELDS[card_type]:
-        if field not in card:
-            missing.append(field)
+    issues = schema.check(card)
+    if not issues:
+        return True, "Valid", card
     
-    if missing:
+    first = issues[0]
+    if first.code == schema.MISSING and first.field not in schema.COMMON_REQUIRED:
+        missing = [issue.field for issue in issues if issue.code == schema.MISSING]
         return False, f"Missing required fields: {', '.join(missing)}", card
+    return False, ISSUE_MESSAGES[first.code].format(field=first.field), card
+
+
+def check_body(body: str, require_cards: bool = False) -> Dict:
+    """Validate every card in one PR body; a JSON-ready report"""
+    cards = []
+    for i, card_line in enumerate(fences.card_lines(body), 1):
+        is_valid, message, card = validate_card(card_line)
+        if is_valid:
+            cards.append({'index': i, 'valid': True, 'type': card['type'], 'id': card['id']})
+        else:
+            cards.append({'index': i, 'valid': False, 'message': message, 'line': card_line[:100]})
+    invalid = sum(not card['valid'] for card in cards)
+    if invalid:
+        failure = f"{invalid} invalid card(s)"
+    elif require_cards and not cards:
+        failure = "No knowledge cards found (at least one required)"
+    else:
+        failure = None
+    return {'passed': failure is None, 'failure': failure, 'valid': len(cards) - invalid, 'invalid': invalid,
+            'truncated': fences.truncated(body), 'cards': cards}
+
+
+def check_entry(task: Tuple[str, Optional[str], Optional[str], bool]) -> Dict:
+    """Worker for --batch: (name, body or None, path to read it from or None, require_cards) -> report"""
+    name, body, path, require_cards = task
+    if body is None:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                body = f.read()
+        except OSError as e:
+            return {'name': name, 'passed': False, 'failure': f"Cannot read {path}: {e.strerror}",
+                    'valid': 0, 'invalid': 0, 'truncated': False, 'cards': []}
+    return {'name': name, **check_body(body, require_cards)}
+
+
+def load_batch(source: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(name, body, path) per PR from a directory of bodies, a JSON array file, or `-` for stdin"""
+    if source != '-' and os.path.isdir(source):
+        return [(entry.name, None, entry.path) for entry in sorted(os.scandir(source), key=lambda e: e.name)
+                if entry.is_file() and not entry.name.startswith('.')]
+    if source == '-':
+        data = json.load(sys.stdin)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError(f"{source}: expected a JSON array of PR bodies")
+    batch = []
+    for i, item in enumerate(data, 1):
+        if isinstance(item, str):
+            batch.append((f"#{i}", item, None))
+        elif isinstance(item, dict):
+            name = f"PR #{item['number']}" if 'number' in item else str(item.get('name', f"#{i}"))
+            batch.append((name, item.get('body') or '', None))
+        else:
+            raise ValueError(f"{source}: item {i} is neither a string nor an object")
+    return batch
+
+
+def check_batch(batch: List[Tuple[str, Optional[str], Optional[str]]], require_cards: bool,
+                jobs: int = 1) -> List[Dict]:
+    """Reports for every PR of the batch, in batch order, on `jobs` processes"""
+    tasks = [(name, body, path, require_cards) for name, body, path in batch]
+    if jobs <= 1 or len(tasks) < 2:
+        return [check_entry(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(check_entry, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+
+
+def junit_report(reports: List[Dict]) -> ET.ElementTree:
+    """One <testcase> per PR; a failing PR carries its invalid cards in <failure>"""
+    failures = sum(not report['passed'] for report in reports)
+    suites = ET.Element('testsuites', tests=str(len(reports)), failures=str(failures))
+    suite = ET.SubElement(suites, 'testsuite', name='validate_cards', tests=str(len(reports)),
+                          failures=str(failures), errors='0')
+    for report in reports:
+        case = ET.SubElement(suite, 'testcase', classname='validate_cards', name=report['name'])
+        if not report['passed']:
+            failure = ET.SubElement(case, 'failure', message=report['failure'])
+            failure.text = "\n".join(f"Card {card['index']}: {card['message']}\n   {card['line']}"
+                                      for card in report['cards'] if not card['valid'])
+        if report['truncated']:
+            ET.SubElement(case, 'system-out').text = f"Only the first {fences.MAX_SCAN} characters were scanned"
+    ET.indent(suites)
+    return ET.ElementTree(suites)
+
+
+def print_batch(reports: List[Dict]):
+    print(f"{BLUE}🔍 Validating Knowledge Cards in {len(reports)} PR(s){RESET}\n")
+    for report in reports:
+        counts = f"{report['valid']} valid, {report['invalid']} invalid"
+        if report['passed']:
+            print(f"{GREEN}✅ {report['name']}: {counts}{RESET}")
+            continue
+        print(f"{RED}❌ {report['name']}: {report['failure']}{RESET}")
+        for card in report['cards']:
+            if not card['valid']:
+                print(f"   Card {card['index']}: {card['message']}")
+                print(f"      {card['line']}...")
+    failed = sum(not report['passed'] for report in reports)
+    print(f"\n{BLUE}📊 Summary{RESET}")
+    print(f"   PRs passed: {len(reports) - failed}")
+    print(f"   PRs failed: {failed}")
+
+
+def run_batch(args) -> int:
+    """--batch: validate every PR body, write the report, return the exit code"""
+    try:
+        batch = load_batch(args.batch)
+    except (OSError, ValueError) as e:  # json.JSONDecodeError is a ValueError
+        print(f"{RED}❌ Cannot read batch: {e}{RESET}", file=sys.stderr)
+        return 2
+    reports = check_batch(batch, args.require_cards, args.jobs)
+    failed = sum(not report['passed'] for report in reports)
     
-    if card_type in ['MISTAKE', 'PATTERN', 'RUNBOOK']:
-        list_fields = {'MISTAKE': ['fix_steps'], 'PATTERN': ['steps'], 'RUNBOOK': ['steps']}
-        for field in list_fields.get(card_type, []):
-            if not isinstance(card.get(field), list):
-                return False, f"Field '{field}' must be a list", card
-    
-    if not isinstance(card.get('tags'), list):
-        return False, "Field 'tags' must be a list", card
-    
-    if 'repo' in card and not isinstance(card['repo'], list):
-        return False, "Field 'repo' must be a list", card
-    
-    return True, "Valid", card
+    if args.format == 'text':
+        print_batch(reports)
+    else:
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            if args.format == 'json':
+                summary = {'prs': len(reports), 'passed': len(reports) - failed, 'failed': failed}
+                json.dump({'summary': summary, 'prs': reports}, out, indent=2, ensure_ascii=False)
+                out.write("\n")
+            else:
+                junit_report(reports).write(out, encoding='unicode', xml_declaration=True)
+                out.write("\n")
+        finally:
+            if args.output:
+                out.close()
+    return 1 if failed else 0
 
 
 def main():
@@ -102,8 +215,18 @@ def main():
     parser.add_argument('--env', type=str, help='Environment variable containing PR body')
     parser.add_argument('--stdin', action='store_true', help='Read PR body from stdin')
     parser.add_argument('--require-cards', action='store_true', help='Fail if no cards found')
+    parser.add_argument('--batch', type=str, metavar='PATH',
+                        help='Validate many PR bodies: a directory, a JSON array file, or - for stdin')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='With --batch, validate on N processes (default: 1)')
+    parser.add_argument('--format', choices=('text', 'json', 'junit'), default='text',
+                        help='With --batch, the report format (default: text)')
+    parser.add_argument('--output', '-o', type=str, help='With --batch, write the JSON/JUnit report here')
     args = parser.parse_args()
     
+    if args.batch:
+        sys.exit(run_batch(args))
+    
     pr_body = None
     if args.stdin:
         pr_body = sys.stdin.read()
@@ -120,12 +243,14 @@ def main():
             print(f"{RED}❌ File not found: {args.pr_body}{RESET}")
             sys.exit(2)
     else:
-        print(f"{RED}❌ Must specify --pr-body, --env, or --stdin{RESET}")
+        print(f"{RED}❌ Must specify --pr-body, --env, --stdin or --batch{RESET}")
         parser.print_help()
         sys.exit(2)
     
     print(f"{BLUE}🔍 Validating Knowledge Cards in PR{RESET}\n")
     
+    if fences.truncated(pr_body):
+        print(f"{YELLOW}⚠️  PR body is {len(pr_body)} characters; only the first {fences.MAX_SCAN} were scanned{RESET}\n")
     card_lines = extract_cards_from_text(pr_body)
     
     if not card_lines:
@@ -3,8 +3,17 @@
 Knowledge Base JSONL Validator
 Validates syntax and structure of knowledge.jsonl file.
 
+The KB is memory-mapped and read once (biblelib.jsonl): every line is
+parsed a single time and checked for syntax, structure and duplicate IDs
+as it goes. Findings are kept per
+category, and --max-errors stops the scan early for CI. --jobs validates
+newline-aligned chunks in parallel and merges their findings and ID sets
+in file order, so line numbers and duplicate reports match a serial run.
+
 Usage:
     python3 ai_manual/tooling/validators/validate_kb.py
+    python3 ai_manual/tooling/validators/validate_kb.py --max-errors 50
+    python3 ai_manual/tooling/validators/validate_kb.py --jobs 8
     
 Exit codes:
     0: All valid
@@ -12,126 +21,176 @@ Exit codes:
     2: File not found or other error
 """
 
+import argparse
+import heapq
 import json
 import sys
 import pathlib
-from typing import Dict, List, Tuple
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 ROOT = pathlib.Path(__file__).resolve().parents[3]
 KB = ROOT / "ai_manual" / "kb" / "knowledge.jsonl"
 
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "dev_bibles"))
+
+from biblelib import chunks, jsonl, schema  # noqa: E402
+
 GREEN = '\033[92m'
 RED = '\033[91m'
 YELLOW = '\033[93m'
 BLUE = '\033[94m'
 RESET = '\033[0m'
 
+SYNTAX = 'syntax'
+STRUCTURE = 'structure'
+DUPLICATE = 'duplicate'
 
-def validate_jsonl_syntax(file_path: pathlib.Path) -> Tuple[bool, List[str]]:
-    """Validate that each line is valid JSON"""
-    errors = []
-    line_num = 0
-    
-    try:
-        with file_path.open('r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
-                    continue  # Empty lines are OK
-                
-                try:
-                    json.loads(line)
-                except json.JSONDecodeError as e:
-                    errors.append(f"Line {line_num}: Invalid JSON - {e.msg}")
-    except FileNotFoundError:
-        errors.append(f"File not found: {file_path}")
-        return False, errors
-    
-    return len(errors) == 0, errors
+ISSUE_MESSAGES = {
+    schema.NOT_OBJECT: "Expected a JSON object, got {field}",
+    schema.UNKNOWN_TYPE: "Unknown card type '{field}'",
+    schema.NOT_STRING: "'{field}' should be a string",
+    schema.NOT_LIST: "'{field}' should be a list",
+    schema.NOT_STRING_ITEMS: "'{field}' should be a list of strings",
+}
+
+
+class Finding(NamedTuple):
+    line: int
+    category: str  # SYNTAX | STRUCTURE | DUPLICATE
+    message: str
+
+
+class ScanStats:
+    """What one pass over the KB saw, besides its findings"""
+
+    def __init__(self):
+        self.cards = 0
+        self.type_counts: Counter = Counter()
+        self.stopped_at: Optional[int] = None  # line where --max-errors cut the scan short
 
 
 def validate_card_structure(card: Dict, line_num: int) -> List[str]:
-    """Validate structure of a knowledge card"""
+    """Validate structure of a knowledge card against the shared schema"""
     errors = []
+    card_type = card.get('type', '') if isinstance(card, dict) else ''
     
-    if 'type' not in card:
-        errors.append(f"Line {line_num}: Missing required field 'type'")
-    if 'id' not in card:
-        errors.append(f"Line {line_num}: Missing required field 'id'")
-    
-    card_type = card.get('type', '')
-    
-    if card_type == 'META':
-        pass
-    
-    elif card_type == 'MISTAKE':
-        required = ['symptom', 'root_cause', 'fix_steps', 'tags']
-        for field in required:
-            if field not in card:
-                errors.append(f"Line {line_num}: MISTAKE card missing '{field}'")
-        
-        if 'fix_steps' in card and not isinstance(card['fix_steps'], list):
-            errors.append(f"Line {line_num}: 'fix_steps' should be a list")
-        
-        if 'tags' in card and not isinstance(card['tags'], list):
-            errors.append(f"Line {line_num}: 'tags' should be a list")
-    
-    elif card_type == 'PATTERN':
-        required = ['name', 'when', 'steps', 'tags']
-        for field in required:
-            if field not in card:
-                errors.append(f"Line {line_num}: PATTERN card missing '{field}'")
-        
-        if 'steps' in card and not isinstance(card['steps'], list):
-            errors.append(f"Line {line_num}: 'steps' should be a list")
-    
-    elif card_type == 'DECISION':
-        required = ['question', 'decision', 'reason', 'tags']
-        for field in required:
-            if field not in card:
-                errors.append(f"Line {line_num}: DECISION card missing '{field}'")
-    
-    elif card_type == 'TOOL':
-        required = ['name', 'tags']
-        for field in required:
-            if field not in card:
-                errors.append(f"Line {line_num}: TOOL card missing '{field}'")
-    
-    elif card_type == 'RUNBOOK':
-        required = ['title', 'steps', 'tags']
-        for field in required:
-            if field not in card:
-                errors.append(f"Line {line_num}: RUNBOOK card missing '{field}'")
-    
-    else:
-        errors.append(f"Line {line_num}: Unknown card type '{card_type}'")
-    
-    if 'repo' in card and not isinstance(card['repo'], list):
-        errors.append(f"Line {line_num}: 'repo' should be a list")
+    for issue in schema.check(card):
+        if issue.code == schema.MISSING and issue.field in schema.COMMON_REQUIRED:
+            message = f"Missing required field '{issue.field}'"
+        elif issue.code == schema.MISSING:
+            message = f"{card_type} card missing '{issue.field}'"
+        else:
+            message = ISSUE_MESSAGES[issue.code].format(field=issue.field)
+        errors.append(f"Line {line_num}: {message}")
     
     return errors
 
 
-def validate_card_ids(cards: List[Tuple[int, Dict]]) -> List[str]:
-    """Check for duplicate IDs"""
-    errors = []
-    seen_ids = {}
-    
-    for line_num, card in cards:
-        card_id = card.get('id')
-        if card_id:
+def duplicate_finding(line_num: int, card_id: str, first_line: int) -> Finding:
+    return Finding(line_num, DUPLICATE,
+                   f"Line {line_num}: Duplicate ID '{card_id}' (first seen on line {first_line})")
+
+
+def scan_lines(lines: Iterable[Tuple[int, str]], stats: ScanStats, seen_ids: Dict[str, int],
+               repeats: Optional[List[Tuple[int, str]]] = None) -> Iterator[Finding]:
+    """Yield syntax, structure and duplicate-ID findings for numbered non-blank lines, parsing each once.
+
+    With `repeats`, duplicate IDs are appended to it as (line, id) instead of
+    being reported, for callers that only know part of the file.
+    """
+    for line_num, line in lines:  # empty lines are OK and never reach here
+        try:
+            card = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield Finding(line_num, SYNTAX, f"Line {line_num}: Invalid JSON - {e.msg}")
+            continue
+        
+        stats.cards += 1
+        is_object = isinstance(card, dict)
+        card_type = card.get('type') if is_object else None
+        stats.type_counts[card_type if isinstance(card_type, str) else 'UNKNOWN'] += 1  # a list type is unhashable
+        
+        for error in validate_card_structure(card, line_num):
+            yield Finding(line_num, STRUCTURE, error)
+        
+        card_id = card.get('id') if is_object else None
+        if card_id and isinstance(card_id, str):
             if card_id in seen_ids:
-                errors.append(
-                    f"Line {line_num}: Duplicate ID '{card_id}' "
-                    f"(first seen on line {seen_ids[card_id]})"
-                )
+                if repeats is None:
+                    yield duplicate_finding(line_num, card_id, seen_ids[card_id])
+                else:
+                    repeats.append((line_num, card_id))
             else:
                 seen_ids[card_id] = line_num
-    
-    return errors
+
+
+def scan_kb(file_path: pathlib.Path, stats: ScanStats) -> Iterator[Finding]:
+    """All findings from a single read of the KB"""
+    with jsonl.JsonlMap(file_path) as kb:
+        yield from scan_lines(kb.lines(), stats, {})
+
+
+def scan_chunk(task) -> Tuple[List[Finding], Dict[str, int], List[Tuple[int, str]], int, Counter]:
+    """Worker for --jobs: a chunk's syntax and structure findings, the first line of
+    each ID in it, its repeated IDs and its card counts"""
+    file_path, chunk = task
+    stats = ScanStats()
+    seen_ids: Dict[str, int] = {}
+    repeats: List[Tuple[int, str]] = []
+    findings = list(scan_lines(chunks.iter_lines(file_path, chunk), stats, seen_ids, repeats))
+    return findings, seen_ids, repeats, stats.cards, stats.type_counts
+
+
+def scan_kb_parallel(file_path: pathlib.Path, stats: ScanStats, jobs: int) -> Iterator[Finding]:
+    """scan_kb over newline-aligned chunks on `jobs` processes: same findings, same order"""
+    seen_ids: Dict[str, int] = {}
+    for findings, chunk_ids, repeats, cards, type_counts in chunks.map_chunks(scan_chunk, str(file_path), jobs):
+        stats.cards += cards
+        stats.type_counts.update(type_counts)
+        # An ID first seen in this chunk may already be in an earlier one, and a
+        # repeat within the chunk points at the earliest line in the whole file.
+        # chunk_ids and repeats are both in line order.
+        crossing = [duplicate_finding(line_num, card_id, seen_ids[card_id])
+                    for card_id, line_num in chunk_ids.items() if card_id in seen_ids]
+        for card_id, line_num in chunk_ids.items():
+            seen_ids.setdefault(card_id, line_num)
+        repeated = [duplicate_finding(line_num, card_id, seen_ids[card_id]) for line_num, card_id in repeats]
+        duplicates = heapq.merge(crossing, repeated, key=itemgetter(0))
+        yield from heapq.merge(findings, duplicates, key=itemgetter(0))
+
+
+def collect(findings: Iterator[Finding], stats: ScanStats,
+            max_errors: Optional[int] = None) -> Dict[str, List[str]]:
+    """Group findings by category, stopping after `max_errors` in total"""
+    by_category: Dict[str, List[str]] = {SYNTAX: [], STRUCTURE: [], DUPLICATE: []}
+    total = 0
+    for finding in findings:
+        by_category[finding.category].append(finding.message)
+        total += 1
+        if max_errors and total >= max_errors:
+            stats.stopped_at = finding.line
+            findings.close()
+            break
+    return by_category
+
+
+def print_findings(errors: List[str], limit: Optional[int] = None):
+    for error in errors[:limit]:
+        print(f"      {error}")
+    if limit is not None and len(errors) > limit:
+        print(f"      ... and {len(errors) - limit} more")
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Validate the knowledge base')
+    parser.add_argument('--max-errors', type=int, default=None, metavar='N',
+                        help='Stop after N errors (default: scan the whole KB)')
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N',
+                        help='Validate chunks of the KB on N processes (default: 1)')
+    args = parser.parse_args()
+    
     print(f"{BLUE}🔍 Validating Knowledge Base{RESET}")
     print(f"   File: {KB}\n")
     
@@ -139,71 +198,48 @@ def main():
         print(f"{RED}❌ File not found: {KB}{RESET}")
         sys.exit(2)
     
-    all_errors = []
-    cards = []
+    stats = ScanStats()
+    scan = scan_kb_parallel(KB, stats, args.jobs) if args.jobs > 1 else scan_kb(KB, stats)
+    findings = collect(scan, stats, args.max_errors)
+    syntax_errors = findings[SYNTAX]
+    structure_errors = findings[STRUCTURE]
+    duplicate_errors = findings[DUPLICATE]
+    error_count = sum(len(errors) for errors in findings.values())
     
     print("1️⃣  Checking JSONL syntax...")
-    is_valid, syntax_errors = validate_jsonl_syntax(KB)
     if syntax_errors:
-        all_errors.extend(syntax_errors)
         print(f"{RED}   ❌ {len(syntax_errors)} syntax error(s) found{RESET}")
-        for error in syntax_errors:
-            print(f"      {error}")
+        print_findings(syntax_errors)
     else:
         print(f"{GREEN}   ✅ All lines are valid JSON{RESET}")
     
     print("\n2️⃣  Checking card structure...")
-    with KB.open('r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
-                continue
-            
-            try:
-                card = json.loads(line)
-                cards.append((line_num, card))
-                
-                card_errors = validate_card_structure(card, line_num)
-                all_errors.extend(card_errors)
-            except json.JSONDecodeError:
-                pass
-    
-    if not all_errors:
-        print(f"{GREEN}   ✅ All cards have valid structure{RESET}")
+    if structure_errors:
+        print(f"{RED}   ❌ {len(structure_errors)} structure error(s) found{RESET}")
+        print_findings(structure_errors, limit=10)
     else:
-        structure_errors = [e for e in all_errors if e not in syntax_errors]
-        if structure_errors:
-            print(f"{RED}   ❌ {len(structure_errors)} structure error(s) found{RESET}")
-            for error in structure_errors[:10]:  # Show first 10
-                print(f"      {error}")
-            if len(structure_errors) > 10:
-                print(f"      ... and {len(structure_errors) - 10} more")
+        print(f"{GREEN}   ✅ All cards have valid structure{RESET}")
     
     print("\n3️⃣  Checking for duplicate IDs...")
-    duplicate_errors = validate_card_ids(cards)
     if duplicate_errors:
-        all_errors.extend(duplicate_errors)
         print(f"{YELLOW}   ⚠️  {len(duplicate_errors)} duplicate ID(s) found{RESET}")
-        for error in duplicate_errors:
-            print(f"      {error}")
+        print_findings(duplicate_errors)
     else:
         print(f"{GREEN}   ✅ All IDs are unique{RESET}")
     
-    print(f"\n{BLUE}📊 Summary{RESET}")
-    print(f"   Total cards: {len(cards)}")
+    if stats.stopped_at is not None:
+        print(f"\n{YELLOW}⚠️  Stopped at line {stats.stopped_at} after {error_count} error(s) (--max-errors){RESET}")
     
-    type_counts = {}
-    for _, card in cards:
-        card_type = card.get('type', 'UNKNOWN')
-        type_counts[card_type] = type_counts.get(card_type, 0) + 1
+    print(f"\n{BLUE}📊 Summary{RESET}")
+    print(f"   Total cards: {stats.cards}")
     
     print(f"   By type:")
-    for card_type, count in sorted(type_counts.items(), key=lambda x: -x[1]):
+    for card_type, count in sorted(stats.type_counts.items(), key=lambda x: -x[1]):
         print(f"     - {card_type}: {count}")
     
     print()
-    if all_errors:
-        print(f"{RED}❌ Validation FAILED with {len(all_errors)} error(s){RESET}")
+    if error_count:
+        print(f"{RED}❌ Validation FAILED with {error_count} error(s){RESET}")
         sys.exit(1)
     else:
         print(f"{GREEN}✅ All validations PASSED{RESET}")
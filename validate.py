@@ -2,85 +2,153 @@
 """
 Simple validator for Project Bible (bible.jsonl).
 
+The file is memory-mapped and streamed (biblelib.jsonl): each record is
+parsed exactly once, decoded a block at a time, errors are reported as they
+are found and only the set of seen IDs is kept, so memory does not grow
+with the size of the bible. With --jobs the file is split
+into newline-aligned chunks validated in parallel; each worker returns its
+errors and the IDs it saw, and duplicates across chunks are found when the
+results are merged in file order, so the report is identical.
+
 Usage:
     python3 validate.py bible.jsonl
+    python3 validate.py --jobs 8 merged.jsonl   # split across 8 processes
     
 Returns exit code 0 if valid, 1 if invalid.
 """
 
+import argparse
+import heapq
 import json
+import os
+import pathlib
 import sys
-from typing import Dict, List, Set
-
-REQUIRED_FIELDS = {
-    "PRINCIPLE": ["type", "id", "text", "tags"],
-    "PATTERN": ["type", "id", "name", "when", "steps", "tags"],
-    "MISTAKE": ["type", "id", "symptom", "root_cause", "fix_steps", "tags"],
-    "RUNBOOK": ["type", "id", "title", "steps", "tags"],
-    "DECISION": ["type", "id", "question", "decision", "reason", "tags"],
-}
+import time
+from operator import itemgetter
+from typing import Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent / "dev_bibles"))
 
-VALID_TYPES = set(REQUIRED_FIELDS.keys())
+from biblelib import chunks, jsonl, schema  # noqa: E402
+
+ISSUE_MESSAGES = {
+    schema.NOT_STRING: "Field '{field}' must be a string",
+    schema.NOT_LIST: "Field '{field}' must be an array",
+    schema.NOT_STRING_ITEMS: "All {field} must be strings",
+}
 
 
 def validate_lesson(line_num: int, line: str) -> List[str]:
-    errors = []
-    
     try:
         lesson = json.loads(line)
     except json.JSONDecodeError as e:
         return [f"Line {line_num}: Invalid JSON - {e}"]
+    return check_lesson(line_num, lesson)
+
+
+def check_lesson(line_num: int, lesson) -> List[str]:
+    """Schema errors for an already-parsed lesson"""
+    errors = []
+    lesson_type = lesson.get("type") if isinstance(lesson, dict) else None
+    if not isinstance(lesson_type, str):  # e.g. ["X"]: reported as an invalid type, never looked up
+        lesson_type = None
+    for issue in schema.check(lesson):
+        if issue.code == schema.NOT_OBJECT:
+            message = f"Expected JSON object, got {issue.field}"
+        elif issue.code == schema.UNKNOWN_TYPE:
+            message = f"Invalid type '{issue.field}'. Must be one of: {', '.join(schema.CARD_TYPES)}"
+        elif issue.code == schema.MISSING and issue.field == "type":
+            message = "Missing 'type' field"
+        elif issue.code == schema.MISSING:
+            if lesson_type not in schema.SCHEMA:
+                continue  # only the type problem is worth reporting
+            message = f"Missing required field '{issue.field}' for type {lesson_type}"
+        else:
+            message = ISSUE_MESSAGES[issue.code].format(field=issue.field)
+        errors.append(f"Line {line_num}: {message}")
+    return errors
+
+
+def check_record(line_num: int, raw: str, seen_ids: Dict) -> List[str]:
+    """Errors for one raw (non-blank) record; records the lesson's ID in `seen_ids`"""
+    try:
+        lesson = json.loads(raw)
+    except json.JSONDecodeError as e:
+        return [f"Line {line_num}: Invalid JSON - {e}"]
     
-    if not isinstance(lesson, dict):
-        return [f"Line {line_num}: Expected JSON object, got {type(lesson).__name__}"]
-    
-    lesson_type = lesson.get("type")
-    if not lesson_type:
-        errors.append(f"Line {line_num}: Missing 'type' field")
-        return errors
-    
-    if lesson_type not in VALID_TYPES:
-        errors.append(f"Line {line_num}: Invalid type '{lesson_type}'. Must be one of: {', '.join(VALID_TYPES)}")
-        return errors
-    
-    required = REQUIRED_FIELDS[lesson_type]
-    for field in required:
-        if field not in lesson:
-            errors.append(f"Line {line_num}: Missing required field '{field}' for type {lesson_type}")
-    
-    if "id" in lesson and not isinstance(lesson["id"], str):
-        errors.append(f"Line {line_num}: Field 'id' must be a string")
-    
-    if "tags" in lesson:
-        if not isinstance(lesson["tags"], list):
-            errors.append(f"Line {line_num}: Field 'tags' must be an array")
-        elif not all(isinstance(tag, str) for tag in lesson["tags"]):
-            errors.append(f"Line {line_num}: All tags must be strings")
-    
-    if lesson_type == "PATTERN" or lesson_type == "RUNBOOK":
-        steps_field = "steps"
-        if steps_field in lesson:
-            if not isinstance(lesson[steps_field], list):
-                errors.append(f"Line {line_num}: Field '{steps_field}' must be an array")
-            elif not all(isinstance(step, str) for step in lesson[steps_field]):
-                errors.append(f"Line {line_num}: All {steps_field} must be strings")
-    
-    if lesson_type == "MISTAKE" and "fix_steps" in lesson:
-        if not isinstance(lesson["fix_steps"], list):
-            errors.append(f"Line {line_num}: Field 'fix_steps' must be an array")
-        elif not all(isinstance(step, str) for step in lesson["fix_steps"]):
-            errors.append(f"Line {line_num}: All fix_steps must be strings")
-    
+    errors = check_lesson(line_num, lesson)
+    lesson_id = lesson.get("id") if isinstance(lesson, dict) else None
+    if lesson_id and not isinstance(lesson_id, (list, dict)):
+        if lesson_id in seen_ids:
+            errors.append(f"Line {line_num}: Duplicate ID '{lesson_id}'")
+        else:
+            seen_ids[lesson_id] = line_num
     return errors
 
 
-def validate_file(filepath: str) -> bool:
-    all_errors = []
-    seen_ids: Set[str] = set()
+class Tally:
+    """Counts gathered while validating, for the summary"""
+    
+    def __init__(self):
+        self.lines = 0
+        self.records = 0
+        self.unique_ids = 0
+
+
+def iter_errors(filepath: str, tally: Tally) -> Iterator[str]:
+    """Stream the file and yield its errors in line order"""
+    seen_ids: Dict = {}
+    with jsonl.JsonlMap(filepath) as bible:
+        tally.lines = bible.count_lines()
+        for line_num, raw in bible.lines():
+            tally.records += 1
+            yield from check_record(line_num, raw, seen_ids)
+    tally.unique_ids = len(seen_ids)
+
+
+def validate_chunk(task) -> Tuple[List[Tuple[int, str]], Dict, int]:
+    """Worker for --jobs: (errors with their line numbers, first line of each ID, records)"""
+    filepath, chunk = task
+    seen_ids: Dict = {}
+    errors = []
+    records = 0
+    for line_num, raw in chunks.iter_lines(filepath, chunk):
+        records += 1
+        errors.extend((line_num, error) for error in check_record(line_num, raw, seen_ids))
+    return errors, seen_ids, records
+
+
+def iter_errors_parallel(filepath: str, jobs: int, tally: Tally) -> Iterator[str]:
+    """Validate newline-aligned chunks on `jobs` processes; same errors, same order as iter_errors"""
+    seen_ids: Dict = {}
+    with jsonl.JsonlMap(filepath) as bible:
+        tally.lines = bible.count_lines()
+    for errors, chunk_ids, records in chunks.map_chunks(validate_chunk, filepath, jobs):
+        tally.records += records
+        # An ID first seen in this chunk may already be in an earlier one.
+        # chunk_ids is in line order, and so are the duplicates built from it.
+        duplicates = [(line_num, f"Line {line_num}: Duplicate ID '{lesson_id}'")
+                      for lesson_id, line_num in chunk_ids.items() if lesson_id in seen_ids]
+        for lesson_id, line_num in chunk_ids.items():
+            seen_ids.setdefault(lesson_id, line_num)
+        for _, error in heapq.merge(errors, duplicates, key=itemgetter(0)):
+            yield error
+    tally.unique_ids = len(seen_ids)
+
+
+def validate_file(filepath: str, jobs: int = 1) -> bool:
+    tally = Tally()
+    error_count = 0
+    start = time.perf_counter()
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+        size = os.path.getsize(filepath)
+        errors = iter_errors_parallel(filepath, jobs, tally) if jobs > 1 else iter_errors(filepath, tally)
+        for error in errors:
+            if not error_count:
+                print("Validation failed:\n", file=sys.stderr)
+            error_count += 1
+            print(f"  ✗ {error}", file=sys.stderr)
     except FileNotFoundError:
         print(f"Error: File '{filepath}' not found", file=sys.stderr)
         return False
@@ -88,46 +156,34 @@ def validate_file(filepath: str) -> bool:
         print(f"Error reading file: {e}", file=sys.stderr)
         return False
     
-    if not lines:
+    if not tally.lines:
         print(f"Warning: File '{filepath}' is empty")
         return True
     
-    for line_num, line in enumerate(lines, start=1):
-        line = line.strip()
-        if not line:
-            continue
-        
-        errors = validate_lesson(line_num, line)
-        all_errors.extend(errors)
-        
-        try:
-            lesson = json.loads(line)
-            lesson_id = lesson.get("id")
-            if lesson_id:
-                if lesson_id in seen_ids:
-                    all_errors.append(f"Line {line_num}: Duplicate ID '{lesson_id}'")
-                seen_ids.add(lesson_id)
-        except:
-            pass
-    
-    if all_errors:
-        print("Validation failed:\n", file=sys.stderr)
-        for error in all_errors:
-            print(f"  ✗ {error}", file=sys.stderr)
+    throughput = format_throughput(tally.records, size, time.perf_counter() - start)
+    if error_count:
+        print(f"\n  {error_count} errors; {throughput}", file=sys.stderr)
         return False
     
-    print(f"✓ Validation passed! {len(lines)} lessons validated.")
-    print(f"  - {len(seen_ids)} unique IDs")
+    print(f"✓ Validation passed! {tally.lines} lessons validated.")
+    print(f"  - {tally.unique_ids} unique IDs")
+    print(f"  - {throughput}")
     return True
 
 
+def format_throughput(records: int, size: int, elapsed: float) -> str:
+    elapsed = max(elapsed, 1e-9)
+    return f"{records / elapsed:,.0f} records/s, {size / elapsed / 1e6:.1f} MB/s"
+
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 validate.py <bible.jsonl>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Validate a Project Bible (bible.jsonl)")
+    parser.add_argument("filepath", help="Bible file to validate")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Validate chunks of the file on N processes (default: 1)")
+    args = parser.parse_args()
     
-    filepath = sys.argv[1]
-    success = validate_file(filepath)
+    success = validate_file(args.filepath, max(1, args.jobs))
     sys.exit(0 if success else 1)
 
 